@@ -16,3 +16,4 @@ except ImportError:
     import gdal
 
 GDAL_DEFAULT_DRIVER = gdal.GetDriverByName("Gtiff")
+GDAL_MEM_DRIVER = gdal.GetDriverByName("MEM")
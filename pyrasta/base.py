@@ -7,10 +7,10 @@ More detailed description.
 
 import multiprocessing as mp
 
-import numpy as np
 import pyproj
 from pyrasta.io_ import GEOJSON_DRIVER
 from pyrasta.io_.files import _copy_to_file
+from pyrasta.io_.metadata import read_metadata
 from pyrasta.tools.calculator import _op, _raster_calculation, _log, _log10
 from pyrasta.tools.clip import _clip_raster_by_extent, _clip_raster_by_mask
 from pyrasta.tools.conversion import _resample_raster, _padding, _rescale_raster, \
@@ -18,13 +18,17 @@ from pyrasta.tools.conversion import _resample_raster, _padding, _rescale_raster
     _project_raster, _array_to_raster, _set_no_data, _set_data_type
 from pyrasta.exceptions import RasterBaseError
 from pyrasta.tools.filters import _sieve
+from pyrasta.tools.labeling import _label, _region_statistics
 from pyrasta.tools.mask import _raster_mask
-from pyrasta.tools.merge import _merge
+from pyrasta.tools.merge import _merge, _merge_vrt, _materialize, GDAL_VRT_DRIVER
 from pyrasta.tools.polygonize import _polygonize
+from pyrasta.tools.proximity import _proximity
 from pyrasta.tools.rasterize import _rasterize
-from pyrasta.tools.stats import _histogram, _zonal_stats
+from pyrasta.tools.sampling import _sample
+from pyrasta.tools.overviews import _build_overviews
+from pyrasta.tools.stats import _histogram, _statistics, _zonal_stats
 from pyrasta.tools.windows import _windowing
-from pyrasta.utils import lazyproperty, grid, MP_CHUNK_SIZE
+from pyrasta.utils import lazyproperty, grid, MP_CHUNK_SIZE, WARP_MEMORY_LIMIT
 
 try:
     from osgeo import gdal, ogr
@@ -63,6 +67,7 @@ class RasterBase:
 
         self._gdal_driver = self._gdal_dataset.GetDriver()
         self._file = src_file
+        self._metadata = read_metadata(self._gdal_dataset)
 
     def __add__(self, other):
         return _op(self, other, "add")
@@ -102,7 +107,7 @@ class RasterBase:
     def __del__(self):
         self._gdal_dataset = None
 
-    def align_raster(self, other):
+    def align_raster(self, other, nb_threads=mp.cpu_count(), warp_memory=WARP_MEMORY_LIMIT):
         """ Align raster on other
 
         Description
@@ -112,12 +117,49 @@ class RasterBase:
         ----------
         other: RasterBase
             other RasterBase instance
+        nb_threads: int
+            number of threads used for warping
+        warp_memory: int
+            warp working buffer size in MB
 
         """
 
-        return _align_raster(self, other)
+        return _align_raster(self, other, nb_threads, warp_memory)
 
-    def clip(self, bounds=None, mask=None, no_data=-999, all_touched=True, driver=GEOJSON_DRIVER):
+    def build_overviews(self, levels=None, resampling="nearest",
+                        nb_threads=mp.cpu_count(), progress_bar=False):
+        """ Build overviews (pyramids)
+
+        Description
+        -----------
+        Build raster overviews, which are then used by GDAL
+        whenever data are read at a coarser resolution
+        (resample with factor < 1, read_array with smaller
+        buffer shape, approximate statistics, etc.)
+
+        Parameters
+        ----------
+        levels: list[int], default None
+            Overview decimation factors (e.g. [2, 4, 8, 16]).
+            If None, powers of 2 until the smallest overview
+            is about 256 pixels wide
+        resampling: str
+            Resampling algorithm
+            'nearest', 'average', 'gauss', 'cubic', 'cubicspline',
+            'lanczos', 'average_magphase', 'mode', 'rms', 'bilinear'
+        nb_threads: int
+            Number of threads used to compute overviews
+        progress_bar: bool
+            If True, display progress bar
+
+        Returns
+        -------
+
+        """
+        return _build_overviews(self, levels, resampling, nb_threads, progress_bar)
+
+    def clip(self, bounds=None, mask=None, no_data=-999, all_touched=True, driver=GEOJSON_DRIVER,
+             window_size=500, nb_processes=mp.cpu_count()):
         """ Clip raster
 
         Parameters
@@ -132,7 +174,11 @@ class RasterBase:
             if True, all touched pixels within layer boundaries are burnt,
             when clipping raster by mask
         driver: str
-
+            Deprecated, mask is no longer written to file
+        window_size: int or list[int, int]
+            Size of blocks masked in parallel, when clipping raster by mask
+        nb_processes: int
+            number of processes for multiprocessing, when clipping raster by mask
 
         Returns
         -------
@@ -143,7 +189,8 @@ class RasterBase:
         if bounds is not None:
             return _clip_raster_by_extent(self, bounds, no_data)
         elif mask is not None:
-            return _clip_raster_by_mask(self, mask, no_data, all_touched, driver)
+            return _clip_raster_by_mask(self, mask, no_data, all_touched,
+                                        window_size, nb_processes)
         else:
             raise ValueError("Either bounds or mask must be set")
 
@@ -203,6 +250,42 @@ class RasterBase:
         """
         return _histogram(self, nb_bins, normalized)
 
+    def label(self, connectivity=4, band=1, values=None, window_size=1000,
+              nb_processes=mp.cpu_count()):
+        """ Label connected regions of equal value
+
+        Description
+        -----------
+        Label regions (e.g. of a classified raster) and compute
+        their statistics without polygonizing the raster
+
+        Parameters
+        ----------
+        connectivity: int
+            4 or 8
+        band: int
+            band number
+        values: RasterBase, default None
+            raster (same size) used to compute mean of each
+            region. If None, mean of raster values
+        window_size: int or (int, int)
+            size of tiles (in pixels) processed in parallel
+        nb_processes: int
+            number of processes for multiprocessing pool
+
+        Returns
+        -------
+        tuple
+            label raster (UInt32, regions labeled from 1, no data 0)
+            and region statistics as a dict of numpy arrays with keys
+            "label", "value", "count", "area", "perimeter" (map
+            units) and "mean"
+        """
+        statistics, tiles = _region_statistics(self, band, connectivity, values,
+                                               window_size, nb_processes)
+
+        return _label(self, band, connectivity, tiles, nb_processes), statistics
+
     def log(self):
         """ Return logarithm of raster data
 
@@ -223,7 +306,8 @@ class RasterBase:
 
     def mask(self, mask, gdal_driver=gdal.GetDriverByName("Gtiff"),
              output_type=gdal.GetDataTypeByName('Float32'),
-             all_touched=True, no_data=-999, window_size=500):
+             all_touched=True, no_data=-999, window_size=500,
+             nb_processes=mp.cpu_count()):
         """ Apply mask to raster
 
         Parameters
@@ -240,14 +324,16 @@ class RasterBase:
         no_data: int or float
             output no data value in masked raster
         window_size: int or list[int, int]
-            Size of window for raster calculation
+            Size of blocks read and masked in the same pass
+        nb_processes: int
+            number of processes for multiprocessing
 
         Returns
         -------
 
         """
         return _raster_mask(self, mask, gdal_driver, output_type,
-                            no_data, all_touched, window_size)
+                            no_data, all_touched, window_size, nb_processes)
 
     @classmethod
     def merge(cls, rasters, bounds=None,
@@ -255,7 +341,10 @@ class RasterBase:
               data_type=gdal.GetDataTypeByName('Float32'),
               input_no_data=None,
               output_no_data=-999,
-              resampling_mode=None):
+              resampling_mode=None,
+              nb_threads=mp.cpu_count(),
+              warp_memory=WARP_MEMORY_LIMIT,
+              lazy=False):
         """ Merge multiple rasters
 
         Description
@@ -280,6 +369,15 @@ class RasterBase:
             'average', 'rms', 'mode', 'max', 'min', 'med', 'q1',
             'q3', 'sum'
             See GDAL API for more information
+        nb_threads: int
+            number of threads used for warping
+        warp_memory: int
+            warp working buffer size in MB
+        lazy: bool
+            If True, build a virtual (VRT) mosaic instead of warping
+            sources into a new file (rasters must share the same CRS).
+            gdal_driver, data_type, nb_threads and warp_memory are then
+            not used: see materialize to write the mosaic to file
 
         Returns
         -------
@@ -289,8 +387,45 @@ class RasterBase:
         if input_no_data is None:
             input_no_data = [src.no_data for src in rasters]
 
+        if lazy:
+            mosaic = _merge_vrt(cls, GDAL_VRT_DRIVER, rasters, bounds, input_no_data,
+                                output_no_data, resampling_mode)
+            # VRT only references sources: keep them (and their temp files) alive
+            mosaic._sources = rasters
+            return mosaic
+
         return _merge(cls, rasters, gdal_driver, bounds, data_type,
-                      input_no_data, output_no_data, resampling_mode)
+                      input_no_data, output_no_data, resampling_mode,
+                      nb_threads, warp_memory)
+
+    def materialize(self, gdal_driver=gdal.GetDriverByName("Gtiff"), data_type=None,
+                    window_size=1000, nb_processes=mp.cpu_count()):
+        """ Write raster to new dataset in parallel
+
+        Description
+        -----------
+        Copy raster into a new dataset by reading (and computing, e.g.
+        for a lazy VRT mosaic) tiles concurrently in worker processes
+
+        Parameters
+        ----------
+        gdal_driver: osgeo.gdal.Driver
+            GDAL driver (output format)
+        data_type: int, default None
+            GDAL output data type. If None, use raster data type
+        window_size: int or (int, int)
+            size of tiles
+        nb_processes: int
+            number of processes for multiprocessing pool
+
+        Returns
+        -------
+        RasterBase
+            New temporary instance
+
+        """
+        return _materialize(self.__class__, gdal_driver, self, data_type,
+                            window_size, nb_processes)
 
     @classmethod
     def merge_bands(cls, rasters, resolution="highest",
@@ -317,7 +452,8 @@ class RasterBase:
         """
         return _merge_bands(cls, rasters, resolution, gdal_driver, data_type, no_data)
 
-    def pad_extent(self, pad_x, pad_y, value):
+    def pad_extent(self, pad_x, pad_y, value, nb_threads=mp.cpu_count(),
+                   warp_memory=WARP_MEMORY_LIMIT):
         """ Pad raster extent with given values
 
         Description
@@ -332,43 +468,103 @@ class RasterBase:
             y padding size (new height will therefore be RasterYSize + 2 * pad_y)
         value: int or float
             value to set to pad area around raster
+        nb_threads: int
+            number of threads used for warping
+        warp_memory: int
+            warp working buffer size in MB
 
         Returns
         -------
         RasterBase
             A padded RasterBase
         """
-        return _padding(self, pad_x, pad_y, value)
+        return _padding(self, pad_x, pad_y, value, nb_threads, warp_memory)
 
-    def polygonize(self, filename, band=1, layer_name="layer", field_name="unknown",
+    def polygonize(self, filename=None, band=1, layer_name="layer", field_name="unknown",
                    ogr_driver=ogr.GetDriverByName("ESRI Shapefile"),
-                   is_8_connected=False, progress_bar=False):
+                   is_8_connected=False, progress_bar=False, window_size=None,
+                   nb_processes=mp.cpu_count(), as_geodataframe=False):
         """ Polygonize raster
 
         Parameters
         ----------
-        filename: str
+        filename: str, default None
+            output file. If None, polygons are returned
         band: int
         layer_name: str
         field_name: str
         ogr_driver: ogr.Driver
         is_8_connected: bool
         progress_bar: bool
+        window_size: int or (int, int), default None
+            If not None, raster is polygonized by tiles of window_size
+            in parallel, and polygons crossing tile borders are merged.
+            Unlike the whole band mode, 8-connected regions may then be
+            multipolygons (written as a MultiPolygon layer). In both
+            modes, pixel values are read as 32-bit integers, i.e.
+            floating point values are rounded
+        nb_processes: int
+            number of processes for multiprocessing pool (tiled mode)
+        as_geodataframe: bool, default False
+            if filename is None, return polygons as a GeoDataFrame
+            instead of WKB geometries and values
 
         Returns
         -------
-
+        tuple or geopandas.GeoDataFrame
+            if filename is None, WKB geometries and values
+            as numpy arrays (or GeoDataFrame)
         """
         return _polygonize(self, filename, band, layer_name,
                            field_name, ogr_driver, is_8_connected,
-                           progress_bar)
+                           progress_bar, window_size, nb_processes,
+                           as_geodataframe)
+
+    def proximity(self, target_values=None, max_distance=None, band=1, method="gdal",
+                  no_data=-1, window_size=1000, nb_processes=mp.cpu_count()):
+        """ Compute distance to target pixels
+
+        Description
+        -----------
+        Raster is processed by tiles in parallel, each tile being read
+        with a halo of max distance, so that results are the same as
+        over the whole raster
+
+        Parameters
+        ----------
+        target_values: int or float or list, default None
+            target pixel values. If None, non-zero pixels are targets
+        max_distance: int or float, default None
+            maximum distance (in CRS units) to compute. If None,
+            raster is processed as one single tile
+        band: int
+            raster band
+        method: str
+            'gdal' (gdal.ComputeProximity) or 'exact' (exact
+            Euclidean distance transform)
+        no_data: int or float
+            value of pixels farther than max distance from any target
+        window_size: int or (int, int)
+            size of tiles (in pixels)
+        nb_processes: int
+            number of processes for multiprocessing pool
+
+        Returns
+        -------
+        RasterBase
+            New temporary instance (Float32)
+
+        """
+        return _proximity(self, band, target_values, max_distance, method, no_data,
+                          window_size, nb_processes)
 
     @classmethod
     def rasterize(cls, layer, projection, x_size, y_size, geo_transform,
                   burn_values=None, attribute=None,
                   gdal_driver=gdal.GetDriverByName("Gtiff"), nb_band=1,
                   data_type=gdal.GetDataTypeByName("Float32"), no_data=-999,
-                  all_touched=True, progress_bar=False):
+                  all_touched=True, progress_bar=False, window_size=None,
+                  nb_processes=mp.cpu_count()):
         """ Rasterize geographic layer
 
         Parameters
@@ -398,6 +594,12 @@ class RasterBase:
         all_touched: bool
         progress_bar: bool
             Is progress bar displayed ?
+        window_size: int or (int, int), default None
+            If not None, the output grid is split into blocks of
+            this size (width, height) which are rasterized in parallel,
+            each block only burning the features intersecting it
+        nb_processes: int
+            number of processes for multiprocessing (tiled mode only)
 
         Returns
         -------
@@ -405,7 +607,7 @@ class RasterBase:
         """
         return _rasterize(cls, layer, burn_values, attribute, gdal_driver, projection,
                           x_size, y_size, nb_band, geo_transform, data_type, no_data,
-                          all_touched, progress_bar)
+                          all_touched, progress_bar, window_size, nb_processes)
 
     @classmethod
     def raster_calculation(cls, rasters, fhandle, window_size=100,
@@ -457,7 +659,8 @@ class RasterBase:
                                    gdal_driver, input_type, output_type,
                                    no_data, nb_processes, chunksize, description)
 
-    def read_array(self, band=None, bounds=None):
+    def read_array(self, band=None, bounds=None, out=None, buf_shape=None, resampling=None,
+                   boundless=False, fill=None):
         """ Write raster to numpy array
 
         Parameters
@@ -467,15 +670,33 @@ class RasterBase:
         bounds: tuple
             tuple as (x_min, y_min, x_max, y_max) in map units. If None, read
             the whole raster into array
+        out: numpy.ndarray, default None
+            Pre-allocated array to read data into (no new allocation),
+            as (height, width) for one band or (nb_band, height, width)
+        buf_shape: tuple, default None
+            Output shape (height, width) when different from the window
+            size, e.g. to downsample on read (overviews are used
+            when available). Ignored if out is set
+        resampling: str, default None
+            Resampling algorithm used when buffer and window sizes differ
+            'nearest', 'bilinear', 'cubic', 'cubicspline', 'lanczos',
+            'average', 'mode', 'gauss'. If None, nearest neighbour
+        boundless: bool, default False
+            If True, bounds may extend beyond raster extent: the returned
+            array has the exact requested shape, only the overlapping part
+            is read and the rest is set to fill value
+        fill: int or float or list, default None
+            Fill value(s) (one per band) outside raster when boundless.
+            If None, band(s) no data value
 
         Returns
         -------
         numpy.ndarray
 
         """
-        return _read_array(self, band, bounds)
+        return _read_array(self, band, bounds, out, buf_shape, resampling, boundless, fill)
 
-    def read_value_at(self, x, y):
+    def read_value_at(self, x, y, crs=None):
         """ Read value in raster at x/y map coordinates
 
         Parameters
@@ -484,12 +705,15 @@ class RasterBase:
             lat coordinates in map units
         y: float
             lon coordinates in map units
+        crs: int or str or pyproj.CRS, default None
+            CRS of x/y coordinates. If None, coordinates
+            are assumed to be in raster CRS
 
         Returns
         -------
 
         """
-        return _read_value_at(self, x, y)
+        return _read_value_at(self, x, y, crs)
 
     def resample(self, factor):
         """ Resample raster
@@ -498,6 +722,8 @@ class RasterBase:
         -----------
         Resample raster with respect to resampling factor.
         The higher the factor, the higher the resampling.
+        When downsampling (factor < 1), overviews are used
+        if any (see build_overviews)
 
         Parameters
         ----------
@@ -529,6 +755,40 @@ class RasterBase:
         """
         return _rescale_raster(self, r_min, r_max)
 
+    def sample(self, x, y, bands=None, method="nearest", crs=None):
+        """ Sample raster values at multiple x/y map coordinates
+
+        Description
+        -----------
+        Coordinates are converted to pixels in one vectorized
+        operation and points are grouped by native raster block,
+        so that each block is read only once
+
+        Parameters
+        ----------
+        x: numpy.ndarray or Collection
+            x coordinates in map units
+        y: numpy.ndarray or Collection
+            y coordinates in map units
+        bands: int or list[int], default None
+            band number(s) to sample. If None, sample all bands
+        method: str
+            sampling method ('nearest' or 'bilinear')
+        crs: int or str or pyproj.CRS, default None
+            CRS of x/y coordinates. If None, coordinates are
+            assumed to be in raster CRS. Otherwise, they are
+            transformed in bulk with a cached transformer
+
+        Returns
+        -------
+        numpy.ndarray
+            values as an array of shape (nb_bands, nb_points),
+            or (nb_points,) if bands is an integer. Points out
+            of raster are set to no data
+
+        """
+        return _sample(self, x, y, bands, method, crs)
+
     def set_no_data(self, no_data):
         """ Set no data value in raster
 
@@ -558,7 +818,8 @@ class RasterBase:
     #     """
     #     return _set_data_type(self, gdal.GetDataTypeByName(data_type))
 
-    def sieve_filter(self, threshold=1, connectedness=4, progress_bar=False):
+    def sieve_filter(self, threshold=1, connectedness=4, progress_bar=False,
+                     window_size=None, nb_processes=mp.cpu_count()):
         """ Apply sieve filter
 
         Parameters
@@ -566,32 +827,102 @@ class RasterBase:
         threshold: int
         connectedness: int
         progress_bar: bool
+        window_size: int or (int, int), default None
+            If not None, raster is sieved by tiles of window_size
+            (read with an overlap of threshold pixels) in parallel
+        nb_processes: int
+            number of processes for multiprocessing pool (tiled mode)
 
         Returns
         -------
 
         """
-        return _sieve(self, threshold, connectedness, progress_bar)
+        return _sieve(self, threshold, connectedness, progress_bar, window_size, nb_processes)
 
-    def to_crs(self, crs, resampling_mode=None):
+    def statistics(self, approximate=False):
+        """ Compute statistics of each band
+
+        Parameters
+        ----------
+        approximate: bool
+            If True, statistics may be computed from overviews
+            or a subset of tiles, which is much faster
+
+        Returns
+        -------
+        list
+            [min, max, mean, std] for each band
+
+        """
+        return _statistics(self, approximate)
+
+    def to_crs(self, crs=None, resampling_mode=None, nb_threads=mp.cpu_count(),
+               warp_memory=WARP_MEMORY_LIMIT, window_size=None,
+               nb_processes=mp.cpu_count(), resolution=None, bounds=None,
+               target_aligned_pixels=False, on_raster=None):
         """ Re-project raster onto new CRS
 
+        Description
+        -----------
+        Re-project raster, possibly onto a given output grid
+        (resolution, bounds, aligned pixels or reference raster
+        grid), so that re-projection and alignment are done
+        within one single warp
+
         Parameters
         ----------
         crs: int or str or pyproj.CRS
             valid CRS (Valid pyproj CRS, EPSG code, proj string, etc.)
+            Not required if on_raster is set (must then be the CRS
+            of on_raster)
         resampling_mode: str
             algorithm used for resampling
             'near', 'bilinear', 'cubic', 'cubicspline', 'lanczos',
             'average', 'rms', 'mode', 'max', 'min', 'med', 'q1',
             'q3', 'sum'
             See GDAL API for more information
+        nb_threads: int
+            number of threads used for warping
+        warp_memory: int
+            warp working buffer size in MB
+        window_size: int or (int, int), default None
+            If not None, output grid is split into tiles of this
+            size (width, height) which are warped in parallel processes
+            (nb_threads and warp_memory are then not used)
+        nb_processes: int
+            number of processes for multiprocessing (tiled mode only)
+        resolution: float or (float, float), default None
+            output (x, y) resolution in output CRS units
+        bounds: tuple, default None
+            output bounds as (x_min, y_min, x_max, y_max) in output CRS units
+        target_aligned_pixels: bool
+            if True, output bounds are aligned on resolution
+            (requires resolution)
+        on_raster: RasterBase, default None
+            reference raster whose grid (CRS, bounds, size) is used
+            as output grid (exclusive with resolution, bounds and
+            target_aligned_pixels)
 
         Returns
         -------
 
         """
-        return _project_raster(self, pyproj.CRS(crs), resampling_mode)
+        if crs is None and on_raster is None:
+            raise ValueError("Either crs or on_raster must be set")
+
+        if crs is not None:
+            crs = pyproj.CRS(crs)
+
+        if on_raster is not None:
+            if resolution is not None or bounds is not None or target_aligned_pixels:
+                raise ValueError("Reference raster grid is exclusive with resolution, "
+                                 "bounds and target aligned pixels")
+            if crs is not None and crs != on_raster.crs:
+                raise ValueError("CRS differs from reference raster CRS")
+
+        return _project_raster(self, crs, resampling_mode, nb_threads, warp_memory,
+                               window_size, nb_processes, resolution, bounds,
+                               target_aligned_pixels, on_raster)
 
     def to_file(self, filename):
         """ Write raster copy to file
@@ -646,28 +977,31 @@ class RasterBase:
             band = 1
 
         if no_data is None:
-            no_data = self.no_data
+            no_data = self.no_data_values[band - 1]
 
         return _windowing(self, f_handle, band, window_size, method,
                           data_type, no_data, chunk_size, nb_processes)
 
-    def xy_to_2d_index(self, x, y):
+    def xy_to_2d_index(self, x, y, crs=None):
         """ Convert x/y map coordinates into 2d index
 
         Parameters
         ----------
-        x: float
+        x: float or numpy.ndarray
             x coordinates in map units
-        y: float
+        y: float or numpy.ndarray
             y coordinates in map units
+        crs: int or str or pyproj.CRS, default None
+            CRS of x/y coordinates. If None, coordinates
+            are assumed to be in raster CRS
 
         Returns
         -------
         tuple
-            (px, py) index
+            (px, py) index (as arrays if x/y are arrays)
 
         """
-        return _xy_to_2d_index(self, x, y)
+        return _xy_to_2d_index(self, x, y, crs)
 
     def zonal_stats(self, layer, band=1, stats=None, customized_stats=None,
                     all_touched=True, show_progressbar=True,
@@ -712,7 +1046,7 @@ class RasterBase:
         """ Return Coordinate Reference System
 
         """
-        return pyproj.CRS(self._gdal_dataset.GetProjection())
+        return self._metadata.crs
 
     @lazyproperty
     def bounds(self):
@@ -767,18 +1101,30 @@ class RasterBase:
         """
         return self._gdal_dataset.RasterCount
 
+    @property
+    def metadata(self):
+        """ Return metadata record (CRS and per-band information)
+
+        """
+        return self._metadata
+
     @property
     def no_data(self):
-        no_data = self._gdal_dataset.GetRasterBand(1).GetNoDataValue()
-        if no_data is None:
-            return np.nan
-        else:
-            return no_data
-        # return self._gdal_dataset.GetRasterBand(1).GetNoDataValue()
+        """ Return no data value of first band
 
-    @lazyproperty
+        """
+        return self._metadata.bands[0].no_data
+
+    @property
+    def no_data_values(self):
+        """ Return no data value of each band
+
+        """
+        return [band.no_data for band in self._metadata.bands]
+
+    @property
     def data_type(self):
-        return self._gdal_dataset.GetRasterBand(1).DataType
+        return self._metadata.bands[0].data_type
 
     @lazyproperty
     def resolution(self):
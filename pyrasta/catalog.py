@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+
+""" Raster catalog
+
+Footprint, CRS, resolution and data type of many raster files are
+stored in an on-disk SQLite index with an R-tree, so that files
+intersecting a given extent can be found without opening them all.
+"""
+import glob
+import multiprocessing as mp
+import os
+import sqlite3
+
+from tqdm import tqdm
+
+from pyrasta.crs import transform_bounds
+from pyrasta.raster import Raster
+
+try:
+    from osgeo import gdal
+except ImportError:
+    import gdal
+
+
+RASTER_FILE_PATTERN = "*.tif"
+
+CATALOG_SCHEMA = ("CREATE TABLE IF NOT EXISTS rasters ("
+                  "id INTEGER PRIMARY KEY, "
+                  "path TEXT UNIQUE NOT NULL, "
+                  "crs TEXT, "
+                  "x_size INTEGER, "
+                  "y_size INTEGER, "
+                  "nb_band INTEGER, "
+                  "x_res REAL, "
+                  "y_res REAL, "
+                  "data_type INTEGER, "
+                  "no_data REAL)",
+                  "CREATE VIRTUAL TABLE IF NOT EXISTS footprints "
+                  "USING rtree(id, x_min, x_max, y_min, y_max)")
+
+
+def _read_footprint(path):
+    """ Read footprint and properties of raster file
+
+    Parameters
+    ----------
+    path: str
+        path to raster file
+
+    Returns
+    -------
+    tuple or None
+        (path, crs, x_size, y_size, nb_band, x_res, y_res,
+        data_type, no_data, bounds), or None if file cannot
+        be opened as a raster
+    """
+    try:
+        dataset = gdal.Open(path)
+    except RuntimeError:
+        return None
+
+    if dataset is None or dataset.RasterCount == 0:
+        return None
+
+    geo_transform = dataset.GetGeoTransform()
+    x_size, y_size = dataset.RasterXSize, dataset.RasterYSize
+    x_min = geo_transform[0]
+    y_max = geo_transform[3]
+    x_max = x_min + geo_transform[1] * x_size
+    y_min = y_max + geo_transform[5] * y_size
+    band = dataset.GetRasterBand(1)
+
+    return (path,
+            dataset.GetProjection() or None,
+            x_size,
+            y_size,
+            dataset.RasterCount,
+            geo_transform[1],
+            abs(geo_transform[5]),
+            band.DataType,
+            band.GetNoDataValue(),
+            (min(x_min, x_max), min(y_min, y_max), max(x_min, x_max), max(y_min, y_max)))
+
+
+class RasterCatalog:
+    """ Spatial index over many raster files
+
+    """
+
+    def __init__(self, index_file, raster_class=Raster):
+        """ RasterCatalog constructor
+
+        Parameters
+        ----------
+        index_file: str
+            path to SQLite index file (created if it does not exist)
+        raster_class: RasterBase
+            class of rasters returned by queries
+        """
+        self.index_file = index_file
+        self.raster_class = raster_class
+        self._connection = sqlite3.connect(index_file)
+
+        with self._connection:
+            for statement in CATALOG_SCHEMA:
+                self._connection.execute(statement)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return self._connection.execute("SELECT COUNT(*) FROM rasters").fetchone()[0]
+
+    def add(self, paths, nb_processes=mp.cpu_count(), progress_bar=True):
+        """ Add raster files to catalog
+
+        Description
+        -----------
+        Files are opened concurrently in worker processes to
+        read their footprint. Files already in catalog are
+        updated, files that cannot be opened are skipped
+
+        Parameters
+        ----------
+        paths: list[str]
+            paths to raster files
+        nb_processes: int
+            number of processes for multiprocessing pool
+        progress_bar: bool
+            if True, display progress bar
+
+        Returns
+        -------
+        int
+            number of files added to catalog
+        """
+        paths = [os.path.abspath(path) for path in paths]
+        nb_added = 0
+
+        with mp.Pool(processes=nb_processes) as pool, self._connection:
+            for footprint in tqdm(pool.imap_unordered(_read_footprint, paths),
+                                  total=len(paths),
+                                  desc="Index rasters",
+                                  disable=not progress_bar):
+                if footprint is None:
+                    continue
+
+                self._remove(footprint[0])
+                cursor = self._connection.execute("INSERT INTO rasters (path, crs, x_size, "
+                                                  "y_size, nb_band, x_res, y_res, data_type, "
+                                                  "no_data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                                  footprint[:-1])
+                x_min, y_min, x_max, y_max = footprint[-1]
+                self._connection.execute("INSERT INTO footprints VALUES (?, ?, ?, ?, ?)",
+                                         (cursor.lastrowid, x_min, x_max, y_min, y_max))
+                nb_added += 1
+
+        return nb_added
+
+    def close(self):
+        """ Close catalog index
+
+        """
+        self._connection.close()
+
+    @classmethod
+    def from_directory(cls, directory, index_file, pattern=RASTER_FILE_PATTERN,
+                       recursive=True, raster_class=Raster,
+                       nb_processes=mp.cpu_count(), progress_bar=True):
+        """ Build catalog by scanning directory
+
+        Parameters
+        ----------
+        directory: str
+            directory to scan
+        index_file: str
+            path to SQLite index file
+        pattern: str
+            file name pattern of rasters
+        recursive: bool
+            if True, also scan subdirectories
+        raster_class: RasterBase
+            class of rasters returned by queries
+        nb_processes: int
+            number of processes for multiprocessing pool
+        progress_bar: bool
+            if True, display progress bar
+
+        Returns
+        -------
+        RasterCatalog
+        """
+        if recursive:
+            paths = glob.glob(os.path.join(directory, "**", pattern), recursive=True)
+        else:
+            paths = glob.glob(os.path.join(directory, pattern))
+
+        catalog = cls(index_file, raster_class)
+        catalog.add(paths, nb_processes, progress_bar)
+
+        return catalog
+
+    @property
+    def paths(self):
+        """ Return paths of all files in catalog
+
+        """
+        return [row[0] for row in self._connection.execute("SELECT path FROM rasters")]
+
+    def query(self, bounds, crs=None, mosaic=False, **kwargs):
+        """ Return rasters intersecting bounds
+
+        Parameters
+        ----------
+        bounds: tuple
+            (x_min, y_min, x_max, y_max)
+        crs: int or str or pyproj.CRS, default None
+            CRS of bounds. If None, bounds are compared to raster
+            footprints as they are. Otherwise, bounds are
+            transformed into the CRS of each group of rasters
+        mosaic: bool
+            if True, return VRT mosaic of rasters (see RasterBase.merge
+            with lazy=True) cropped to bounds. Rasters must share the same CRS
+        kwargs:
+            keyword arguments passed to RasterBase.merge when mosaic is True
+
+        Returns
+        -------
+        list[RasterBase] or RasterBase
+        """
+        rows = self._query(bounds, crs)
+        paths = sorted(path for path, _ in rows)
+
+        if mosaic:
+            if not paths:
+                raise ValueError("No raster intersects bounds")
+            crs_list = {raster_crs for _, raster_crs in rows}
+            if crs is not None and len(crs_list) == 1 and None not in crs_list:
+                bounds = transform_bounds(bounds, crs, crs_list.pop())
+            return self.raster_class.merge([self.raster_class(path) for path in paths],
+                                           bounds=bounds,
+                                           lazy=True,
+                                           **kwargs)
+
+        return [self.raster_class(path) for path in paths]
+
+    def query_paths(self, bounds, crs=None):
+        """ Return paths of raster files intersecting bounds
+
+        Parameters
+        ----------
+        bounds: tuple
+            (x_min, y_min, x_max, y_max)
+        crs: int or str or pyproj.CRS, default None
+            CRS of bounds (see query)
+
+        Returns
+        -------
+        list[str]
+        """
+        return sorted(path for path, _ in self._query(bounds, crs))
+
+    def _query(self, bounds, crs):
+        """ Return (path, crs) of raster files intersecting bounds
+
+        """
+        if crs is None:
+            groups = [(None, bounds)]
+        else:
+            groups = [(raster_crs, transform_bounds(bounds, crs, raster_crs)
+                       if raster_crs else bounds) for raster_crs, in
+                      self._connection.execute("SELECT DISTINCT crs FROM rasters")]
+
+        rows = []
+        for raster_crs, (x_min, y_min, x_max, y_max) in groups:
+            statement = "SELECT rasters.path, rasters.crs FROM rasters JOIN footprints " \
+                        "ON rasters.id = footprints.id " \
+                        "WHERE footprints.x_max >= ? AND footprints.x_min <= ? " \
+                        "AND footprints.y_max >= ? AND footprints.y_min <= ?"
+            parameters = [x_min, x_max, y_min, y_max]
+            if crs is not None:
+                statement += " AND rasters.crs IS ?"
+                parameters.append(raster_crs)
+            rows.extend(self._connection.execute(statement, parameters))
+
+        return rows
+
+    def _remove(self, path):
+        """ Remove file from catalog
+
+        """
+        row = self._connection.execute("SELECT id FROM rasters WHERE path = ?",
+                                       (path,)).fetchone()
+        if row is not None:
+            self._connection.execute("DELETE FROM footprints WHERE id = ?", row)
+            self._connection.execute("DELETE FROM rasters WHERE id = ?", row)
@@ -5,14 +5,20 @@
 More detailed description.
 """
 
+from functools import lru_cache
+
 try:
     from osgeo import osr
 except ImportError:
     import osr
 
+import numpy as np
 import pyproj
 
 
+TRANSFORMER_CACHE_SIZE = 32
+
+
 def is_equal_proj(proj1, proj2):
     """ Compare 2 projections
 
@@ -111,3 +117,70 @@ def srs_from(crs):
     srs.ImportFromWkt(crs.to_wkt())
 
     return srs
+
+
+@lru_cache(maxsize=TRANSFORMER_CACHE_SIZE)
+def transformer_from(src_crs, dst_crs):
+    """ Get (cached) transformer between two CRS
+
+    Description
+    -----------
+    Transformers are cached with respect to the
+    (source CRS, destination CRS) pair, so that
+    they are only built once
+
+    Parameters
+    ----------
+    src_crs: int or str or pyproj.CRS
+        valid source CRS (pyproj CRS, EPSG code, WKT, etc.)
+    dst_crs: int or str or pyproj.CRS
+        valid destination CRS (pyproj CRS, EPSG code, WKT, etc.)
+
+    Returns
+    -------
+    pyproj.Transformer
+    """
+    return pyproj.Transformer.from_crs(pyproj.CRS(src_crs),
+                                       pyproj.CRS(dst_crs),
+                                       always_xy=True)
+
+
+def transform_xy(x, y, src_crs, dst_crs):
+    """ Transform x/y coordinates (scalars or arrays) between CRS
+
+    Parameters
+    ----------
+    x: float or numpy.ndarray
+    y: float or numpy.ndarray
+    src_crs: int or str or pyproj.CRS
+    dst_crs: int or str or pyproj.CRS
+
+    Returns
+    -------
+    tuple
+        transformed (x, y) coordinates
+    """
+    return transformer_from(src_crs, dst_crs).transform(np.asarray(x, dtype="float64"),
+                                                        np.asarray(y, dtype="float64"))
+
+
+def transform_bounds(bounds, src_crs, dst_crs, densify_points=21):
+    """ Transform bounding box between CRS
+
+    Parameters
+    ----------
+    bounds: tuple
+        (x_min, y_min, x_max, y_max) in source CRS
+    src_crs: int or str or pyproj.CRS
+    dst_crs: int or str or pyproj.CRS
+    densify_points: int
+        number of points added along each box edge,
+        to account for curved edges in destination CRS
+
+    Returns
+    -------
+    tuple
+        (x_min, y_min, x_max, y_max) in destination CRS
+    """
+    return transformer_from(src_crs, dst_crs).transform_bounds(*bounds,
+                                                               densify_pts=densify_points)
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+""" Persistent tile cache
+
+Remote files (e.g. DEM tiles) are downloaded once into a cache
+directory and reused across runs. Files are named by the SHA-1 of
+their URL rather than of their content, so that a cache hit needs
+no download (tile archives at a given URL are immutable). Least
+recently used files are evicted when the cache exceeds its size,
+except files pinned by objects still using them (e.g. lazy mosaics).
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import weakref
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import URLError
+from urllib.request import urlretrieve
+
+from tqdm import tqdm
+
+
+TILE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pyrasta")
+TILE_CACHE_SIZE = 10 * 1024 ** 3
+TILE_CACHE_THREADS = 4
+
+PARTIAL_FILE_SUFFIX = ".part"
+
+# Number of objects using each cached file (within this process)
+_PINNED_FILES = Counter()
+_PINNED_FILES_LOCK = threading.Lock()
+
+
+def _unpin(paths):
+    """ Release cached files pinned by an object
+
+    """
+    with _PINNED_FILES_LOCK:
+        _PINNED_FILES.subtract(paths)
+        for path in paths:
+            if _PINNED_FILES[path] <= 0:
+                del _PINNED_FILES[path]
+
+
+class TileCache:
+    """ Persistent cache of downloaded files
+
+    """
+
+    def __init__(self, cache_dir=None, max_size=TILE_CACHE_SIZE):
+        """ TileCache constructor
+
+        Parameters
+        ----------
+        cache_dir: str, default None
+            cache directory. If None, use TILE_CACHE_DIR
+        max_size: int, default TILE_CACHE_SIZE
+            maximum cache size in bytes (None for no limit)
+        """
+        self.cache_dir = cache_dir if cache_dir is not None else TILE_CACHE_DIR
+        self.max_size = max_size
+        self._lock = threading.Lock()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def __contains__(self, url):
+        return os.path.isfile(self.path(url))
+
+    def _files(self):
+        """ Return cached files as (path, size, last access time)
+
+        """
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and not entry.name.endswith(PARTIAL_FILE_SUFFIX):
+                stat = entry.stat()
+                files.append((entry.path, stat.st_size, stat.st_mtime))
+
+        return files
+
+    def clear(self):
+        """ Remove all cached files
+
+        """
+        with self._lock:
+            for path, _, _ in self._files():
+                os.remove(path)
+
+    def evict(self, keep=()):
+        """ Remove least recently used files until cache fits max size
+
+        Parameters
+        ----------
+        keep: Collection
+            paths that must not be removed (pinned
+            files are never removed either)
+
+        Returns
+        -------
+        """
+        if self.max_size is None:
+            return
+
+        with _PINNED_FILES_LOCK:
+            keep = set(keep).union(_PINNED_FILES)
+
+        with self._lock:
+            files = sorted(self._files(), key=lambda file: file[2])
+            size = sum(file[1] for file in files)
+            for path, file_size, _ in files:
+                if size <= self.max_size:
+                    break
+                if path not in keep:
+                    os.remove(path)
+                    size -= file_size
+
+    def fetch(self, urls, nb_threads=TILE_CACHE_THREADS, progress_bar=True):
+        """ Return local paths of files, downloading missing ones
+
+        Description
+        -----------
+        Missing files are downloaded concurrently in a thread
+        pool, then the cache is trimmed to its maximum size
+        (files of this request are kept)
+
+        Parameters
+        ----------
+        urls: list[str]
+            file URLs
+        nb_threads: int
+            number of concurrent downloads
+        progress_bar: bool
+            if True, display progress bar
+
+        Returns
+        -------
+        list[str]
+            local file paths, in the same order as urls
+        """
+        with ThreadPoolExecutor(max_workers=nb_threads) as executor:
+            paths = list(tqdm(executor.map(self.get, urls),
+                              total=len(urls),
+                              desc="Fetching tile(s)",
+                              disable=not progress_bar))
+
+        self.evict(keep=paths)
+
+        return paths
+
+    def get(self, url):
+        """ Return local path of file, downloading it if not cached
+
+        Parameters
+        ----------
+        url: str
+            file URL
+
+        Returns
+        -------
+        str
+            local file path
+        """
+        path = self.path(url)
+
+        if os.path.isfile(path):
+            # Cache hit: mark file as recently used
+            os.utime(path)
+            return path
+
+        # Download into partial file first, so that the
+        # cache never exposes incomplete files
+        fid, partial_path = tempfile.mkstemp(suffix=PARTIAL_FILE_SUFFIX, dir=self.cache_dir)
+        os.close(fid)
+        try:
+            urlretrieve(url, partial_path)
+            os.replace(partial_path, path)
+        except URLError as e:
+            raise RuntimeError("Unable to fetch data at '%s': %s" % (url, e))
+        finally:
+            if os.path.isfile(partial_path):
+                os.remove(partial_path)
+
+        return path
+
+    def pin(self, paths, owner):
+        """ Protect cached files from eviction while owner is alive
+
+        Parameters
+        ----------
+        paths: list[str]
+            local file paths
+        owner: object
+            object using files (e.g. a raster reading them
+            through a VRT). Files are released when it is
+            garbage collected
+
+        Returns
+        -------
+        """
+        paths = list(paths)
+        with _PINNED_FILES_LOCK:
+            _PINNED_FILES.update(paths)
+        weakref.finalize(owner, _unpin, paths)
+
+    def path(self, url):
+        """ Return local path of file in cache
+
+        Parameters
+        ----------
+        url: str
+            file URL
+
+        Returns
+        -------
+        str
+        """
+        extension = os.path.splitext(url)[1]
+
+        return os.path.join(self.cache_dir,
+                            hashlib.sha1(url.encode("utf-8")).hexdigest() + extension)
+
+    @property
+    def size(self):
+        """ Return cache size in bytes
+
+        """
+        return sum(file[1] for file in self._files())
@@ -8,12 +8,33 @@ import os
 import uuid
 from tempfile import mkstemp, gettempdir
 
+from pyrasta import GDAL_DEFAULT_DRIVER
+
+try:
+    from osgeo import gdal
+except ImportError:
+    import gdal
+
 
 def _copy_to_file(raster, out_file):
     """
 
+    Description
+    -----------
+    Rasters backed by a VRT (e.g. lazy mosaics) are
+    translated, so that pixels are written rather than
+    the VRT description (unless out_file is a VRT)
+
     """
     try:
+        if raster._gdal_driver.ShortName == "VRT" and \
+                not out_file.lower().endswith(".vrt"):
+            out_ds = gdal.Translate(out_file, raster._gdal_dataset,
+                                    format=GDAL_DEFAULT_DRIVER.ShortName)
+            if out_ds is None:
+                return 1
+            out_ds = None
+            return 0
         raster._gdal_driver.CopyFiles(out_file, raster._file)
         # out_ds = raster._gdal_driver.CreateCopy(out_file, raster._gdal_dataset, strict=0)
         # out_ds = None
@@ -81,6 +102,10 @@ class RasterTempFile(TempFile):
     def __del__(self):
         os.close(self.fid)
         super().__del__()
+        try:
+            os.remove(self.path + ".ovr")
+        except FileNotFoundError:
+            pass
 
 
 class VrtTempFile(TempFile):
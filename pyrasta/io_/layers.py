@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+""" In-memory vector layers
+
+Build OGR layers in memory from WKB geometries, so that vector
+data can be handed to GDAL algorithms without writing any file.
+"""
+import numpy as np
+
+try:
+    from osgeo import gdal, ogr, osr
+except ImportError:
+    import gdal
+    import ogr
+    import osr
+
+
+OGR_MEMORY_DRIVER = "Memory"
+
+
+def _memory_driver():
+    """ Return GDAL in-memory vector driver
+
+    """
+    driver = gdal.GetDriverByName(OGR_MEMORY_DRIVER)
+    if driver is None:
+        driver = gdal.GetDriverByName("MEM")
+
+    return driver
+
+
+def _ogr_field_type(values):
+    """ Return OGR field type corresponding to values
+
+    """
+    kind = values.dtype.kind
+    if kind in "iub":
+        return ogr.OFTInteger64
+    elif kind == "f":
+        return ogr.OFTReal
+    else:
+        return ogr.OFTString
+
+
+def geometries_to_wkb(geodataframe):
+    """ Return geometries of geographic layer as list of WKB
+
+    """
+    return [geom.wkb if geom is not None else None for geom in geodataframe.geometry]
+
+
+def projection_of(geodataframe):
+    """ Return projection of geographic layer as a WKT string
+
+    """
+    try:
+        return geodataframe.crs.to_wkt()
+    except AttributeError:
+        return None
+
+
+class MemoryLayer:
+    """ OGR layer stored in memory
+
+    """
+
+    def __init__(self, geometries, projection=None, values=None, field_name=None):
+        """ MemoryLayer constructor
+
+        Parameters
+        ----------
+        geometries: Collection
+            collection of geometries as WKB (None for empty geometry)
+        projection: str, default None
+            projection of geometries as a WKT string
+        values: Collection, default None
+            value of field "field_name" for each geometry
+        field_name: str, default None
+            name of the attribute field storing values
+        """
+        if projection:
+            srs = osr.SpatialReference()
+            srs.ImportFromWkt(projection)
+            srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        else:
+            srs = None
+
+        self.dataset = _memory_driver().Create("", 0, 0, 0, gdal.GDT_Unknown)
+        self.layer = self.dataset.CreateLayer("layer", srs=srs)
+
+        if field_name is not None:
+            values = np.asarray(values)
+            self.layer.CreateField(ogr.FieldDefn(field_name, _ogr_field_type(values)))
+            values = values.tolist()
+
+        definition = self.layer.GetLayerDefn()
+        for idx, wkb in enumerate(geometries):
+            feature = ogr.Feature(definition)
+            if wkb is not None:
+                feature.SetGeometryDirectly(ogr.CreateGeometryFromWkb(bytes(wkb)))
+            if field_name is not None:
+                feature.SetField(field_name, values[idx])
+            self.layer.CreateFeature(feature)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.layer = None
+        self.dataset = None
+
+    @classmethod
+    def from_geodataframe(cls, geodataframe, attribute=None):
+        """ Build memory layer from geographic layer
+
+        Parameters
+        ----------
+        geodataframe: geopandas.GeoDataFrame or gistools.layer.GeoLayer
+            geographic layer
+        attribute: str, default None
+            layer's attribute to be copied into memory layer
+
+        Returns
+        -------
+        MemoryLayer
+        """
+        geometries = geometries_to_wkb(geodataframe)
+        projection = projection_of(geodataframe)
+
+        if attribute is not None:
+            return cls(geometries, projection, geodataframe[attribute].to_numpy(), attribute)
+        else:
+            return cls(geometries, projection)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+""" Raster metadata
+
+Compact metadata records read once when a dataset is opened,
+so that tools do not query GDAL (or build CRS objects) repeatedly.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pyproj
+
+
+BandInfo = namedtuple("BandInfo", ["no_data", "data_type", "block_size", "scale", "offset"])
+RasterMetadata = namedtuple("RasterMetadata", ["crs", "bands"])
+
+
+def _band_info(gdal_band):
+    """ Read band metadata
+
+    Parameters
+    ----------
+    gdal_band: gdal.Band
+
+    Returns
+    -------
+    BandInfo
+    """
+    no_data = gdal_band.GetNoDataValue()
+    scale = gdal_band.GetScale()
+    offset = gdal_band.GetOffset()
+
+    return BandInfo(np.nan if no_data is None else no_data,
+                    gdal_band.DataType,
+                    tuple(gdal_band.GetBlockSize()),
+                    1 if scale is None else scale,
+                    0 if offset is None else offset)
+
+
+def read_metadata(gdal_dataset):
+    """ Read raster metadata
+
+    Parameters
+    ----------
+    gdal_dataset: gdal.Dataset
+
+    Returns
+    -------
+    RasterMetadata
+        record with CRS (None if not defined) and
+        information of each band (no data, data type,
+        block size, scale and offset)
+    """
+    projection = gdal_dataset.GetProjection()
+
+    return RasterMetadata(pyproj.CRS(projection) if projection else None,
+                          tuple(_band_info(gdal_dataset.GetRasterBand(band + 1))
+                                for band in range(gdal_dataset.RasterCount)))
@@ -5,8 +5,11 @@
 More detailed description.
 """
 
+import multiprocessing as mp
+
 from pyrasta.base import RasterBase
-from pyrasta.tools.dem import _slope, _aspect
+from pyrasta.tools.dem import _slope, _aspect, _ellipsoid, _profile, _terrain, _viewshed
+from pyrasta.tools.hydrology import _fill_depressions, _flow_accumulation, _flow_direction
 
 
 class Raster(RasterBase):
@@ -15,32 +18,231 @@ class Raster(RasterBase):
 
 class DigitalElevationModel(Raster):
 
-    def aspect(self, scale=1):
+    def aspect(self, scale=None):
         """ Compute DEM aspect
 
         Parameters
         ----------
-        scale: float or int
-            Ratio of vertical units to horizontal
+        scale: float or int, default None
+            Ratio of vertical units to horizontal. If None, 1, or, for
+            DEM in geographic coordinates, latitude-dependent pixel sizes
+            in meters (no reprojection needed, see terrain)
+
+        Returns
+        -------
+
+        """
+        if scale is None and _ellipsoid(self) is not None:
+            return self.terrain("aspect")
+
+        return _aspect(self, 1 if scale is None else scale)
+
+    def fill_depressions(self, window_size=1000, nb_processes=mp.cpu_count()):
+        """ Fill DEM depressions
+
+        Description
+        -----------
+        Tiled priority-flood: each depression is raised to
+        the elevation at which it spills out of DEM
+
+        Parameters
+        ----------
+        window_size: int or (int, int)
+            size of tiles (in pixels) processed in parallel
+        nb_processes: int
+            number of processes for multiprocessing pool
+
+        Returns
+        -------
+        DigitalElevationModel
+            New temporary instance
+
+        """
+        return _fill_depressions(self, window_size, nb_processes)
+
+    def flow_accumulation(self, flow_direction=None, no_data=-1, window_size=1000,
+                          nb_processes=mp.cpu_count()):
+        """ Compute D8 flow accumulation
+
+        Description
+        -----------
+        Number of upstream cells flowing into each cell (Float64)
+
+        Parameters
+        ----------
+        flow_direction: RasterBase, default None
+            D8 flow directions (ESRI codes). If None,
+            compute flow directions of DEM
+        no_data: int or float
+            output no data value
+        window_size: int or (int, int)
+            size of tiles (in pixels) processed in parallel
+        nb_processes: int
+            number of processes for multiprocessing pool
+
+        Returns
+        -------
+        DigitalElevationModel
+            New temporary instance
+
+        """
+        if flow_direction is None:
+            flow_direction = self.flow_direction(window_size, nb_processes)
+
+        return _flow_accumulation(flow_direction, no_data, window_size, nb_processes)
+
+    def flow_direction(self, window_size=1000, nb_processes=mp.cpu_count()):
+        """ Compute D8 flow directions
+
+        Description
+        -----------
+        Flow directions are coded as ESRI does (1: E, 2: SE, 4: S,
+        8: SW, 16: W, 32: NW, 64: N, 128: NE) in a Byte raster (no
+        data: 255). Cells next to DEM border or no data flow out of
+        DEM, flats drain toward their outlet and undrained cells
+        (pits, see fill_depressions) get 0
+
+        Parameters
+        ----------
+        window_size: int or (int, int)
+            size of tiles (in pixels) processed in parallel
+        nb_processes: int
+            number of processes for multiprocessing pool
 
         Returns
         -------
+        DigitalElevationModel
+            New temporary instance
 
         """
-        return _aspect(self, scale)
+        return _flow_direction(self, window_size, nb_processes)
 
-    def slope(self, slope_format="percent", scale=1):
+    def profile(self, lines, spacing, method="bilinear", crs=None):
+        """ Extract elevation profiles along lines
+
+        Parameters
+        ----------
+        lines: geopandas.GeoDataFrame or geopandas.GeoSeries or list
+            (multi)line geometries
+        spacing: float
+            distance between consecutive profile points (in line CRS units)
+        method: str
+            sampling method ('nearest' or 'bilinear')
+        crs: int or str or pyproj.CRS, default None
+            CRS of lines. If None, use lines CRS if any, otherwise DEM CRS
+
+        Returns
+        -------
+        list[tuple]
+            (distance, elevation) arrays for each line
+
+        """
+        return _profile(self, lines, spacing, method, crs)
+
+    def slope(self, slope_format="percent", scale=None):
         """ Compute DEM slope
 
         Parameters
         ----------
         slope_format: str
             Slope format {'percent', 'degree'}
-        scale: int or float
-            Ratio of vertical units to horizontal
+        scale: int or float, default None
+            Ratio of vertical units to horizontal. If None, 1, or, for
+            DEM in geographic coordinates, latitude-dependent pixel sizes
+            in meters (no reprojection needed, see terrain)
+
+        Returns
+        -------
+
+        """
+        if scale is None and _ellipsoid(self) is not None:
+            return self.terrain("slope", slope_format=slope_format)
+
+        return _slope(self, slope_format, 1 if scale is None else scale)
+
+    def terrain(self, attributes, slope_format="degree", scale=None, azimuth=315,
+                altitude=45, band=1, no_data=-9999, window_size=1000,
+                nb_processes=mp.cpu_count()):
+        """ Compute terrain attributes in one pass
+
+        Description
+        -----------
+        Each attribute is written to one band of the output
+        (Float32) raster, in the order of attributes
+
+        Parameters
+        ----------
+        attributes: str or list[str]
+            terrain attribute(s) among 'slope', 'aspect', 'hillshade',
+            'tri' (terrain ruggedness index), 'tpi' (topographic position
+            index), 'roughness' and 'curvature'
+        slope_format: str
+            Slope format {'percent', 'degree'}
+        scale: int or float, default None
+            Ratio of vertical units to horizontal. If None, 1, or, for
+            DEM in geographic coordinates, pixel sizes are computed in
+            meters from the latitude of each row (vertical units must
+            then be meters)
+        azimuth: int or float
+            hillshade light azimuth in degrees (clockwise from north)
+        altitude: int or float
+            hillshade light altitude in degrees
+        band: int
+            DEM band
+        no_data: int or float
+            output no data value
+        window_size: int or (int, int)
+            size of tiles processed in parallel
+        nb_processes: int
+            number of processes for multiprocessing pool
+
+        Returns
+        -------
+        DigitalElevationModel
+            New temporary instance
+
+        """
+        return _terrain(self, attributes, band, slope_format, scale, azimuth,
+                        altitude, no_data, window_size, nb_processes)
+
+    def viewshed(self, observers, height, max_distance, target_height=0,
+                 curvature_coefficient=0.85714, band=1, crs=None,
+                 nb_processes=mp.cpu_count()):
+        """ Compute cumulative viewshed of observers
+
+        Description
+        -----------
+        Output (UInt32) is the number of observers from which
+        each cell is visible (i.e. a visibility mask for a
+        single observer). Observers out of the DEM extent are
+        ignored, with a warning giving their number
+
+        Parameters
+        ----------
+        observers: geopandas.GeoDataFrame or geopandas.GeoSeries or list
+            observer points (point geometries or (x, y) tuples)
+        height: int or float or list
+            observer height above DEM (or height of each observer)
+        max_distance: int or float
+            maximum visibility distance (in DEM CRS units)
+        target_height: int or float
+            target height above DEM
+        curvature_coefficient: float
+            coefficient for atmospheric refraction and earth
+            curvature (1 - refraction coefficient)
+        band: int
+            DEM band
+        crs: int or str or pyproj.CRS, default None
+            CRS of observers. If None, use observers CRS if any,
+            otherwise DEM CRS
+        nb_processes: int
+            number of processes for multiprocessing pool
 
         Returns
         -------
+        DigitalElevationModel
+            New temporary instance
 
         """
-        return _slope(self, slope_format, scale)
+        return _viewshed(self, observers, height, target_height, max_distance,
+                         curvature_coefficient, band, crs, nb_processes)
@@ -18,17 +18,26 @@ except ImportError:
 
 def driver_authorizes_creation(gdal_driver):
 
-    return True if 'DCAP_CREATE' in gdal_driver.GetMetadata().keys() else False
+    # VRT datasets cannot store pixel values written to them
+    return True if 'DCAP_CREATE' in gdal_driver.GetMetadata().keys() \
+        and gdal_driver.ShortName != "VRT" else False
+
+
+def _output_driver(raster):
+    """ Return driver used to write new rasters from raster
+
+    """
+    if driver_authorizes_creation(raster._gdal_driver):
+        return raster._gdal_driver
+    else:
+        return GDAL_DEFAULT_DRIVER
 
 
 def _return_raster(function):
     @wraps(function)
     def return_raster(raster, *args, **kwargs):
         try:
-            if driver_authorizes_creation(raster._gdal_driver):
-                gdal_driver = raster._gdal_driver
-            else:
-                gdal_driver = GDAL_DEFAULT_DRIVER
+            gdal_driver = _output_driver(raster)
             with RasterTempFile(gdal_driver.GetMetadata()['DMD_EXTENSION']) as out_file:
                 function(raster, out_file.path, *args, **kwargs)
                 new_raster = raster.__class__(out_file.path)
@@ -53,6 +62,9 @@ def _gdal_temp_dataset(out_file, gdal_driver, projection, x_size, y_size,
     """ Create gdal temporary dataset
 
     """
+    if not driver_authorizes_creation(gdal_driver):
+        gdal_driver = GDAL_DEFAULT_DRIVER
+
     try:
         out_ds = gdal_driver.Create(out_file, x_size, y_size, nb_band, data_type)
     except RuntimeError:
@@ -66,6 +78,50 @@ def _gdal_temp_dataset(out_file, gdal_driver, projection, x_size, y_size,
     return out_ds
 
 
+def _warp_options(nb_threads, warp_memory):
+    """ Return multithreading keyword arguments for gdal.Warp
+
+    Parameters
+    ----------
+    nb_threads: int
+        number of threads used for warping
+    warp_memory: int
+        working buffer size in MB
+
+    """
+    return dict(multithread=True,
+                warpOptions=["NUM_THREADS=%d" % nb_threads],
+                warpMemoryLimit=warp_memory)
+
+
+def _window_geo_transform(geo_transform, window):
+    """ Return geo transform of window within raster
+
+    Parameters
+    ----------
+    geo_transform: tuple
+        raster geo transform
+    window: tuple
+        window as (x offset, y offset, x size, y size)
+
+    """
+    return (geo_transform[0] + window[0] * geo_transform[1] + window[1] * geo_transform[2],
+            geo_transform[1],
+            geo_transform[2],
+            geo_transform[3] + window[0] * geo_transform[4] + window[1] * geo_transform[5],
+            geo_transform[4],
+            geo_transform[5])
+
+
+def _window_bounds(geo_transform, window):
+    """ Return (north up) window bounds as (x_min, y_min, x_max, y_max)
+
+    """
+    x_min, x_res, _, y_max, _, y_res = _window_geo_transform(geo_transform, window)
+
+    return x_min, y_max + window[3] * y_res, x_min + window[2] * x_res, y_max
+
+
 def _clone_gdal_dataset(raster, out_file, data_type=None):
 
     if data_type is None:
@@ -79,7 +135,7 @@ def _clone_gdal_dataset(raster, out_file, data_type=None):
                               raster.nb_band,
                               raster.geo_transform,
                               data_type,
-                              raster.no_data)
+                              raster.no_data_values)
 
 
 def _set_no_data(gdal_ds, no_data):
@@ -92,12 +148,16 @@ def _set_no_data(gdal_ds, no_data):
     ----------
     gdal_ds: gdal.Dataset
         gdal dataset
-    no_data: list or tuple
-        list of no data values corresponding to each raster band
+    no_data: int or float or list or tuple
+        no data value or list of no data values
+        corresponding to each raster band
 
     """
+    if not isinstance(no_data, (list, tuple)):
+        no_data = [no_data] * gdal_ds.RasterCount
+
     for band in range(gdal_ds.RasterCount):
         try:
-            gdal_ds.GetRasterBand(band + 1).SetNoDataValue(no_data)
+            gdal_ds.GetRasterBand(band + 1).SetNoDataValue(no_data[band])
         except TypeError:
             pass
@@ -104,6 +104,12 @@ def _op(raster1, out_file, raster2, op_type):
 
     for band in range(1, raster1.nb_band + 1):
 
+        no_data1 = raster1.no_data_values[band - 1]
+        try:
+            no_data2 = raster2.no_data_values[band - 1]
+        except AttributeError:
+            no_data2 = None
+
         for window in get_xy_block_windows((OP_WINDOW_SIZE, OP_WINDOW_SIZE),
                                            raster1.x_size,
                                            raster1.y_size):
@@ -128,7 +134,7 @@ def _op(raster1, out_file, raster2, op_type):
             elif op_type == "rpow":
                 result = arrays[1] ** arrays[0]
             elif op_type == "truediv":
-                result = np.full(arrays[0].shape, raster1.no_data)
+                result = np.full(arrays[0].shape, no_data1)
                 if not np.isscalar(arrays[1]):
                     result[arrays[1] != 0] = \
                         arrays[0][arrays[1] != 0] / arrays[1][arrays[1] != 0]
@@ -136,16 +142,15 @@ def _op(raster1, out_file, raster2, op_type):
                     if arrays[1] != 0:
                         result = arrays[0] / arrays[1]
             elif op_type == "rtruediv":
-                result = np.full(arrays[0].shape, raster1.no_data)
+                result = np.full(arrays[0].shape, no_data1)
                 result[arrays[0] != 0] = arrays[1] / arrays[0][arrays[0] != 0]
             else:
                 result = None
 
             if np.isscalar(arrays[1]):
-                result[arrays[0] == raster1.no_data] = raster1.no_data
+                result[arrays[0] == no_data1] = no_data1
             else:
-                result[(arrays[0] == raster1.no_data) | (arrays[1] == raster2.no_data)] = \
-                    raster1.no_data
+                result[(arrays[0] == no_data1) | (arrays[1] == no_data2)] = no_data1
 
             out_ds.GetRasterBand(band).WriteArray(result, window[0], window[1])
 
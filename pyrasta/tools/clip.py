@@ -4,11 +4,11 @@
 
 More detailed description.
 """
-from functools import partial
+import numpy as np
 
-from pyrasta.io_ import ESRI_DRIVER
-from pyrasta.io_.files import RasterTempFile, ShapeTempFile, GeojsonTempFile
-from pyrasta.tools import _return_raster, _gdal_temp_dataset
+from pyrasta import GDAL_DEFAULT_DRIVER
+from pyrasta.tools import _return_raster
+from pyrasta.tools.mask import _mask_by_layer, _check_no_data
 
 try:
     from osgeo import gdal
@@ -56,7 +56,8 @@ def _clip_raster_by_extent(raster, out_file, bounds, no_data):
     #           outputType=raster.data_type)
 
 
-def _clip_raster_by_mask(raster, geodataframe, no_data, all_touched, driver):
+def _clip_raster_by_mask(raster, geodataframe, no_data, all_touched,
+                         window_size, nb_processes):
     """ Clip raster by mask from geographic layer
 
     Parameters
@@ -69,52 +70,57 @@ def _clip_raster_by_mask(raster, geodataframe, no_data, all_touched, driver):
     all_touched: bool
         if True, clip all pixels that are touched, otherwise clip
         if pixel's centroids are within boundaries
+    window_size: int or (int, int)
+        Size of blocks read and masked in parallel
+    nb_processes: int
+        number of processes for multiprocessing pool
 
     Returns
     -------
     RasterBase
 
     """
-    clip_raster = raster.clip(bounds=geodataframe.total_bounds, no_data=no_data)
+    _check_no_data(no_data, gdal.GetDataTypeByName('Float32'))
 
-    if driver == "ESRI Shapefile":
-        temp_file = ShapeTempFile
-    else:
-        temp_file = GeojsonTempFile
+    return _mask_by_layer(raster.__class__,
+                          GDAL_DEFAULT_DRIVER,
+                          raster,
+                          geodataframe,
+                          _extent_window(raster, geodataframe.total_bounds),
+                          False,
+                          gdal.GetDataTypeByName('Float32'),
+                          no_data,
+                          all_touched,
+                          window_size,
+                          nb_processes,
+                          None)
 
-    with temp_file() as tempfile, \
-            RasterTempFile(clip_raster._gdal_driver.GetMetadata()['DMD_EXTENSION']) as r_file:
 
-        geodataframe.to_file(tempfile.path, driver=driver)
+def _extent_window(raster, bounds):
+    """ Return window covering extent within raster
 
-        out_ds = _gdal_temp_dataset(r_file.path,
-                                    clip_raster._gdal_driver,
-                                    clip_raster._gdal_dataset.GetProjection(),
-                                    clip_raster.x_size,
-                                    clip_raster.y_size,
-                                    clip_raster.nb_band,
-                                    clip_raster.geo_transform,
-                                    clip_raster.data_type,
-                                    clip_raster.no_data)
-
-        gdal.Rasterize(out_ds,
-                       tempfile.path,
-                       bands=list(range(1, clip_raster.nb_band + 1)),
-                       burnValues=[1] * clip_raster.nb_band,
-                       allTouched=all_touched)
-
-    out_ds = None
-
-    return clip_raster.__class__.raster_calculation([clip_raster,
-                                                     clip_raster.__class__(r_file.path)],
-                                                    partial(mask_clip, no_data=no_data),
-                                                    no_data=no_data,
-                                                    description=None)
+    Parameters
+    ----------
+    raster: pyrasta.raster.RasterBase
+    bounds: tuple
+        boundaries as (minx, miny, maxx, maxy)
 
+    Returns
+    -------
+    tuple
+        window as (x offset, y offset, x size, y size)
+    """
+    minx = max(bounds[0], raster.bounds[0])
+    miny = max(bounds[1], raster.bounds[1])
+    maxx = min(bounds[2], raster.bounds[2])
+    maxy = min(bounds[3], raster.bounds[3])
 
-def mask_clip(arrays, no_data):
+    if minx >= maxx or miny >= maxy:
+        raise ValueError("requested extent out of raster boundaries")
 
-    result = arrays[0] * arrays[1]
-    result[arrays[1] != 1] = no_data
+    x_min = int(np.floor((minx - raster.x_origin) / raster.resolution[0]))
+    x_max = int(np.ceil((maxx - raster.x_origin) / raster.resolution[0]))
+    y_min = int(np.floor((raster.y_origin - maxy) / raster.resolution[1]))
+    y_max = int(np.ceil((raster.y_origin - miny) / raster.resolution[1]))
 
-    return result
+    return x_min, y_min, min(x_max, raster.x_size) - x_min, min(y_max, raster.y_size) - y_min
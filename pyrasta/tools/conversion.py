@@ -4,12 +4,20 @@
 
 More detailed description.
 """
-from pyrasta.crs import srs_from
+import multiprocessing as mp
+from functools import partial
+
+from pyrasta.crs import srs_from, transform_xy
 from pyrasta.io_.files import VrtTempFile
-from pyrasta.tools import _gdal_temp_dataset, _return_raster
+from pyrasta.tools import _gdal_temp_dataset, _return_raster, _warp_options, _window_bounds
 
 import affine
-from pyrasta.tools.mapping import NUMPY_TO_GDAL
+import numpy as np
+from tqdm import tqdm
+
+from pyrasta.tools.calculator import get_xy_block_windows
+from pyrasta.tools.overviews import _has_overviews
+from pyrasta.tools.mapping import NUMPY_TO_GDAL, GDAL_TO_NUMPY, RESAMPLING_TO_GRIORA
 
 
 try:
@@ -19,16 +27,17 @@ except ImportError:
 
 
 @_return_raster
-def _align_raster(in_raster, out_file, on_raster):
+def _align_raster(in_raster, out_file, on_raster, nb_threads, warp_memory):
     """ Align raster on other raster
 
     """
     out_ds = _gdal_temp_dataset(out_file, in_raster._gdal_driver,
                                 on_raster._gdal_dataset.GetProjection(),
                                 on_raster.x_size, on_raster.y_size, in_raster.nb_band,
-                                on_raster.geo_transform, in_raster.data_type, in_raster.no_data)
+                                on_raster.geo_transform, in_raster.data_type,
+                                in_raster.no_data_values)
 
-    gdal.Warp(out_ds, in_raster._gdal_dataset)
+    gdal.Warp(out_ds, in_raster._gdal_dataset, **_warp_options(nb_threads, warp_memory))
 
     # Close dataset
     out_ds = None
@@ -96,15 +105,35 @@ def _extract_bands(raster, out_file, bands):
     out_ds = None
 
 
-def _xy_to_2d_index(raster, x, y):
+def _xy_to_pixel(geo_transform, x, y):
+    """ Convert x/y map coordinates to (float) pixel coordinates
+
+    Description
+    -----------
+    Apply the inverse affine transform to coordinates, which
+    may be either scalars or arrays (vectorized)
+
+    """
+    a, b, c, d, e, f = (~affine.Affine.from_gdal(*geo_transform))[:6]
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+
+    return a * x + b * y + c, d * x + e * y + f
+
+
+def _xy_to_2d_index(raster, x, y, crs=None):
     """ Convert x/y map coordinates to 2d index
 
     """
-    forward_transform = affine.Affine.from_gdal(*raster.geo_transform)
-    reverse_transform = ~forward_transform
-    px, py = reverse_transform * (x, y)
+    if crs is not None:
+        x, y = transform_xy(x, y, crs, raster.projection)
+
+    px, py = _xy_to_pixel(raster.geo_transform, x, y)
 
-    return int(px), int(py)
+    if px.ndim == 0:
+        return int(px), int(py)
+    else:
+        return px.astype("int64"), py.astype("int64")
 
 
 @_return_raster
@@ -121,7 +150,7 @@ def _merge_bands(raster_class, out_file, sources, resolution, data_type, no_data
 
 
 @_return_raster
-def _padding(raster, out_file, pad_x, pad_y, pad_value):
+def _padding(raster, out_file, pad_x, pad_y, pad_value, nb_threads, warp_memory):
     """ Add pad values around raster
 
     Description
@@ -139,6 +168,10 @@ def _padding(raster, out_file, pad_x, pad_y, pad_value):
         y padding size (new height will therefore be RasterYSize + 2 * pad_y)
     pad_value: int or float
         value to set to pad area around raster
+    nb_threads: int
+        number of threads used for warping
+    warp_memory: int
+        warp working buffer size in MB
 
     Returns
     -------
@@ -153,64 +186,345 @@ def _padding(raster, out_file, pad_x, pad_y, pad_value):
                                 raster.nb_band,
                                 geo_transform,
                                 raster.data_type,
-                                raster.no_data)
+                                raster.no_data_values)
 
     for band in range(1, raster.nb_band + 1):
         out_ds.GetRasterBand(band).Fill(pad_value)
-        gdal.Warp(out_ds, raster._gdal_dataset)
+
+    gdal.Warp(out_ds, raster._gdal_dataset, **_warp_options(nb_threads, warp_memory))
 
     # Close dataset
     out_ds = None
 
 
+def _output_grid_options(new_crs, resolution, bounds, target_aligned_pixels, on_raster):
+    """ Return gdal.Warp keyword arguments defining output grid
+
+    Parameters
+    ----------
+    new_crs: pyproj.CRS or None
+        output CRS (if None, on_raster's CRS)
+    resolution: None or float or (float, float)
+        output resolution (x, y) in output CRS units
+    bounds: None or tuple
+        output bounds as (x_min, y_min, x_max, y_max) in output CRS units
+    target_aligned_pixels: bool
+        if True, align output bounds on resolution
+    on_raster: None or RasterBase
+        reference raster whose grid (CRS, bounds and size) is used
+
+    Returns
+    -------
+    dict
+    """
+    if on_raster is not None:
+        if resolution is not None or bounds is not None:
+            raise ValueError("Reference raster grid is exclusive with resolution and bounds")
+        return dict(dstSRS=on_raster._gdal_dataset.GetProjection(),
+                    outputBounds=on_raster.bounds,
+                    width=on_raster.x_size,
+                    height=on_raster.y_size)
+
+    options = dict(dstSRS=srs_from(new_crs))
+
+    if resolution is not None:
+        if not hasattr(resolution, "__getitem__"):
+            resolution = (resolution, resolution)
+        options.update(xRes=resolution[0], yRes=resolution[1])
+
+    if bounds is not None:
+        options.update(outputBounds=bounds)
+
+    if target_aligned_pixels:
+        if resolution is None:
+            raise ValueError("Target aligned pixels require output resolution")
+        options.update(targetAlignedPixels=True)
+
+    return options
+
+
 @_return_raster
-def _project_raster(raster, out_file, new_crs, resampling_mode):
+def _project_raster(raster, out_file, new_crs, resampling_mode, nb_threads, warp_memory,
+                    window_size, nb_processes, resolution, bounds, target_aligned_pixels,
+                    on_raster):
     """ Project raster onto new CRS
 
     """
+    grid_options = _output_grid_options(new_crs, resolution, bounds,
+                                        target_aligned_pixels, on_raster)
+
+    if window_size is not None:
+        return _project_raster_by_tile(raster, out_file, grid_options, resampling_mode,
+                                       window_size, nb_processes)
+
     gdal.Warp(out_file,
               raster._gdal_dataset,
-              dstSRS=srs_from(new_crs),
-              resampleAlg=resampling_mode)
+              resampleAlg=resampling_mode,
+              **grid_options,
+              **_warp_options(nb_threads, warp_memory))
+
+
+def _warp_tile(window, src_file, projection, geo_transform, resampling_mode, no_data):
+    """ Warp source raster into output tile
+
+    Parameters
+    ----------
+    window: tuple
+        tile window within output grid as (x offset, y offset, x size, y size)
+    src_file: str
+        path to source raster
+    projection: str
+        output projection as a WKT string
+    geo_transform: tuple
+        output grid geo transform
+
+    Returns
+    -------
+    tuple
+        (window, numpy.ndarray)
+    """
+    tile_ds = gdal.Warp("",
+                        gdal.Open(src_file),
+                        format="MEM",
+                        dstSRS=projection,
+                        outputBounds=_window_bounds(geo_transform, window),
+                        width=window[2],
+                        height=window[3],
+                        resampleAlg=resampling_mode,
+                        dstNodata=no_data)
+
+    return window, tile_ds.ReadAsArray()
+
+
+def _project_raster_by_tile(raster, out_file, grid_options, resampling_mode,
+                            window_size, nb_processes):
+    """ Project raster onto new CRS tile by tile in parallel
+
+    Description
+    -----------
+    Output grid is computed once (warped VRT, no pixel processed),
+    then split into output tiles. Each tile is warped from the source
+    in a worker process (GDAL only reads the source window needed by
+    the tile) and written to the output dataset by the main process.
+
+    """
+    if not hasattr(window_size, "__getitem__"):
+        window_size = (window_size, window_size)
+
+    vrt_ds = gdal.Warp("",
+                       raster._gdal_dataset,
+                       format="VRT",
+                       resampleAlg=resampling_mode,
+                       **grid_options)
+    projection = vrt_ds.GetProjection()
+    geo_transform = vrt_ds.GetGeoTransform()
+    x_size, y_size = vrt_ds.RasterXSize, vrt_ds.RasterYSize
+    vrt_ds = None
+
+    out_ds = _gdal_temp_dataset(out_file,
+                                raster._gdal_driver,
+                                projection,
+                                x_size,
+                                y_size,
+                                raster.nb_band,
+                                geo_transform,
+                                raster.data_type,
+                                raster.no_data_values)
+
+    if np.isnan(raster.no_data_values).all():
+        no_data = None
+    else:
+        no_data = " ".join(str(value) for value in raster.no_data_values)
+
+    nb_tiles = len(range(0, x_size, window_size[0])) * len(range(0, y_size, window_size[1]))
+
+    with mp.Pool(processes=nb_processes) as pool:
+        for window, array in tqdm(pool.imap(partial(_warp_tile,
+                                                    src_file=raster._file,
+                                                    projection=projection,
+                                                    geo_transform=geo_transform,
+                                                    resampling_mode=resampling_mode,
+                                                    no_data=no_data),
+                                            get_xy_block_windows(window_size, x_size, y_size)),
+                                  total=nb_tiles,
+                                  desc="Re-project raster"):
+            if raster.nb_band == 1:
+                out_ds.GetRasterBand(1).WriteArray(array, window[0], window[1])
+            else:
+                for band in range(raster.nb_band):
+                    out_ds.GetRasterBand(band + 1).WriteArray(array[band, :, :],
+                                                              window[0], window[1])
+
+    # Close dataset
+    out_ds = None
+
 
+def _bounds_to_window(raster, bounds):
+    """ Convert bounds to pixel window
+
+    Parameters
+    ----------
+    raster: RasterBase
+    bounds: tuple
+        tuple as (x_min, y_min, x_max, y_max) in map units
 
-def _read_array(raster, band, bounds):
+    Returns
+    -------
+    tuple
+        window as (x offset, y offset, x size, y size)
+    """
+    x_min, y_min, x_max, y_max = bounds
+    forward_transform = affine.Affine.from_gdal(*raster.geo_transform)
+    reverse_transform = ~forward_transform
+    px_min, py_max = reverse_transform * (x_min, y_min)
+    px_max, py_min = reverse_transform * (x_max, y_max)
+    x_size = int(px_max - px_min)
+    y_size = int(py_max - py_min)
+    # x_size = min(int(px_max - px_min) + 1, raster.x_size)   # + 1 --> Do not add 1 as pixel number start at 0 !!
+    # y_size = min(int(py_max - py_min) + 1, raster.y_size)   # But use min() instead for the case bounds are the
+                                                            # original raster bounds
+
+    return int(np.floor(px_min)), int(np.floor(py_min)), x_size, y_size
+
+
+def _read_array(raster, band, bounds, out, buf_shape, resampling, boundless, fill):
     """ Read array from raster
 
+    Description
+    -----------
+    Read raster window into new array or into a
+    caller-provided buffer, possibly with a buffer
+    size different from the window size (GDAL then
+    uses the best available overview when downsampling).
+    If boundless, window may extend beyond raster
+    extent: only the overlapping part is read and the
+    rest of the array is set to fill value
+
     """
     if bounds is None:
-        if band is not None:
-            return raster._gdal_dataset.GetRasterBand(band).ReadAsArray()
-        else:
-            return raster._gdal_dataset.ReadAsArray()
+        window = (0, 0, raster.x_size, raster.y_size)
     else:
-        x_min, y_min, x_max, y_max = bounds
-        forward_transform = affine.Affine.from_gdal(*raster.geo_transform)
-        reverse_transform = ~forward_transform
-        px_min, py_max = reverse_transform * (x_min, y_min)
-        px_max, py_min = reverse_transform * (x_max, y_max)
-        x_size = int(px_max - px_min)
-        y_size = int(py_max - py_min)
-        # x_size = min(int(px_max - px_min) + 1, raster.x_size)   # + 1 --> Do not add 1 as pixel number start at 0 !!
-        # y_size = min(int(py_max - py_min) + 1, raster.y_size)   # But use min() instead for the case bounds are the
-                                                                # original raster bounds
+        window = _bounds_to_window(raster, bounds)
 
+    if out is not None:
+        buf_shape = out.shape[-2:]
+
+    if buf_shape is None:
+        buf_y_size, buf_x_size = None, None
+    else:
+        buf_y_size, buf_x_size = buf_shape
+
+    try:
+        resample_alg = RESAMPLING_TO_GRIORA[resampling or "nearest"]
+    except KeyError:
+        raise ValueError("resampling must be one of those: {}".format(
+            list(RESAMPLING_TO_GRIORA.keys())))
+
+    if boundless:
+        return _read_boundless_array(raster, band, window, out, buf_shape,
+                                     resample_alg, fill)
+
+    if band is not None:
+        return raster._gdal_dataset.GetRasterBand(band).ReadAsArray(*window,
+                                                                    buf_xsize=buf_x_size,
+                                                                    buf_ysize=buf_y_size,
+                                                                    buf_obj=out,
+                                                                    resample_alg=resample_alg)
+    else:
+        return raster._gdal_dataset.ReadAsArray(*window,
+                                                buf_obj=out,
+                                                buf_xsize=buf_x_size,
+                                                buf_ysize=buf_y_size,
+                                                resample_alg=resample_alg)
+
+
+def _read_boundless_array(raster, band, window, out, buf_shape, resample_alg, fill):
+    """ Read window possibly extending beyond raster extent
+
+    Parameters
+    ----------
+    raster: RasterBase
+    band: int or None
+        band number. If None, read all bands
+    window: tuple
+        window as (x offset, y offset, x size, y size)
+    out: numpy.ndarray or None
+        pre-allocated output array
+    buf_shape: tuple or None
+        output shape as (height, width)
+    resample_alg: int
+        GDAL resampling algorithm
+    fill: int or float or list or None
+        fill value(s) outside raster. If None, band(s) no data
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    x_off, y_off, x_size, y_size = window
+    bands = [band] if band is not None else list(range(1, raster.nb_band + 1))
+
+    if fill is None:
+        fill = [raster.no_data_values[bd - 1] for bd in bands]
+    elif np.isscalar(fill):
+        fill = [fill] * len(bands)
+
+    if buf_shape is None:
+        buf_shape = (y_size, x_size)
+
+    if out is None:
+        dtype = GDAL_TO_NUMPY[raster.data_type]
+        if np.isnan(fill).any() and np.dtype(dtype).kind in "iu":
+            dtype = "float64"
         if band is not None:
-            return raster._gdal_dataset.GetRasterBand(band).ReadAsArray(int(px_min),
-                                                                        int(py_min),
-                                                                        x_size,
-                                                                        y_size)
+            out = np.empty(buf_shape, dtype=dtype)
         else:
-            return raster._gdal_dataset.ReadAsArray(int(px_min),
-                                                    int(py_min),
-                                                    x_size,
-                                                    y_size)
+            out = np.empty((len(bands),) + tuple(buf_shape), dtype=dtype)
+
+    # 3D view of output array (one layer per band)
+    layers = out[np.newaxis] if band is not None else out
+
+    for n in range(len(bands)):
+        layers[n] = fill[n]
+
+    # Overlap between window and raster (pixels),
+    # and corresponding part of the output buffer
+    x_min, x_max = max(x_off, 0), min(x_off + x_size, raster.x_size)
+    y_min, y_max = max(y_off, 0), min(y_off + y_size, raster.y_size)
+
+    if x_min >= x_max or y_min >= y_max:
+        return out
 
+    x_scale = buf_shape[1] / x_size
+    y_scale = buf_shape[0] / y_size
+    buf_x_min = int(round((x_min - x_off) * x_scale))
+    buf_x_max = int(round((x_max - x_off) * x_scale))
+    buf_y_min = int(round((y_min - y_off) * y_scale))
+    buf_y_max = int(round((y_max - y_off) * y_scale))
 
-def _read_value_at(raster, x, y):
+    if buf_x_min >= buf_x_max or buf_y_min >= buf_y_max:
+        return out
+
+    for n, bd in enumerate(bands):
+        layers[n, buf_y_min:buf_y_max, buf_x_min:buf_x_max] = \
+            raster._gdal_dataset.GetRasterBand(bd).ReadAsArray(x_min,
+                                                               y_min,
+                                                               x_max - x_min,
+                                                               y_max - y_min,
+                                                               buf_xsize=buf_x_max - buf_x_min,
+                                                               buf_ysize=buf_y_max - buf_y_min,
+                                                               resample_alg=resample_alg)
+
+    return out
+
+
+def _read_value_at(raster, x, y, crs=None):
     """ Read value at lat/lon map coordinates
 
     """
+    if crs is not None:
+        x, y = transform_xy(x, y, crs, raster.projection)
+
     forward_transform = affine.Affine.from_gdal(*raster.geo_transform)
     reverse_transform = ~forward_transform
     xoff, yoff = reverse_transform * (x, y)
@@ -234,17 +548,26 @@ def _resample_raster(raster, out_file, factor):
     factor: int or float
         Resampling factor
     """
+    if factor < 1 and _has_overviews(raster):
+        # Downsampling: read from the best overview
+        gdal.Translate(out_file,
+                       raster._gdal_dataset,
+                       width=int(raster.x_size * factor),
+                       height=int(raster.y_size * factor),
+                       resampleAlg="mode")
+        return
+
     geo_transform = (raster.x_origin, raster.resolution[0] / factor, 0,
                      raster.y_origin, 0, -raster.resolution[1] / factor)
     out_ds = _gdal_temp_dataset(out_file,
                                 raster._gdal_driver,
                                 raster._gdal_dataset.GetProjection(),
-                                raster.x_size * factor,
-                                raster.y_size * factor,
+                                int(raster.x_size * factor),
+                                int(raster.y_size * factor),
                                 raster.nb_band,
                                 geo_transform,
                                 raster.data_type,
-                                raster.no_data)
+                                raster.no_data_values)
 
     for band in range(1, raster.nb_band+1):
         gdal.RegenerateOverview(raster._gdal_dataset.GetRasterBand(band),
@@ -4,7 +4,20 @@
 
 More detailed description.
 """
-from pyrasta.tools import _return_raster
+import multiprocessing as mp
+import warnings
+from functools import partial
+
+import numpy as np
+from numba import njit
+from tqdm import tqdm
+
+from pyrasta.crs import transform_xy
+from pyrasta.tools import _return_raster, _gdal_temp_dataset, _output_driver
+from pyrasta.tools.conversion import _xy_to_pixel
+from pyrasta.tools.sampling import _sample
+from pyrasta.tools.windows import get_halo_windows, _read_halo_window
+from pyrasta.utils import check_string
 
 try:
     from osgeo import gdal
@@ -12,6 +25,10 @@ except ImportError:
     import gdal
 
 
+TERRAIN_ATTRIBUTES = ("slope", "aspect", "hillshade", "tri", "tpi", "roughness", "curvature")
+TERRAIN_HALO = 1
+
+
 @_return_raster
 def _slope(dem, out_file, slope_format, scale):
     """ Compute DEM slope
@@ -28,7 +45,7 @@ def _slope(dem, out_file, slope_format, scale):
     -------
 
     """
-    options = gdal.DEMProcessingOptions(format=dem._gdal_driver.ShortName,
+    options = gdal.DEMProcessingOptions(format=_output_driver(dem).ShortName,
                                         slopeFormat=slope_format,
                                         scale=scale)
     gdal.DEMProcessing(out_file, dem._gdal_dataset, 'slope', options=options)
@@ -48,6 +65,498 @@ def _aspect(dem, out_file, scale):
     -------
 
     """
-    options = gdal.DEMProcessingOptions(format=dem._gdal_driver.ShortName,
+    options = gdal.DEMProcessingOptions(format=_output_driver(dem).ShortName,
                                         scale=scale)
     gdal.DEMProcessing(out_file, dem._gdal_dataset, "aspect", options=options)
+
+
+def _ellipsoid(dem):
+    """ Return DEM ellipsoid if DEM is in geographic coordinates
+
+    Returns
+    -------
+    tuple or None
+        (semi-major axis in meters, squared eccentricity),
+        or None if DEM CRS is not geographic
+    """
+    if dem.crs is None or not dem.crs.is_geographic:
+        return None
+
+    # From axes, as inverse flattening is 0 for a sphere
+    ellipsoid = dem.crs.ellipsoid
+
+    return ellipsoid.semi_major_metre, \
+        1 - (ellipsoid.semi_minor_metre / ellipsoid.semi_major_metre) ** 2
+
+
+def _pixel_sizes(geo_transform, y_offset, y_size, scale, ellipsoid=None):
+    """ Return pixel width and height of each row
+
+    Description
+    -----------
+    In geographic coordinates, pixel sizes (in meters) depend
+    on latitude: width is N(lat).cos(lat).dlon and height is
+    M(lat).dlat, with N and M the prime vertical and meridional
+    radii of curvature of the ellipsoid at row center
+
+    Parameters
+    ----------
+    geo_transform: tuple
+        DEM geo transform
+    y_offset: int
+        first row
+    y_size: int
+        number of rows
+    scale: float
+        ratio of vertical units to horizontal
+    ellipsoid: tuple, default None
+        (semi-major axis, squared eccentricity) for
+        DEM in geographic coordinates (see _ellipsoid)
+
+    Returns
+    -------
+    tuple
+        pixel width and height arrays (in vertical units)
+    """
+    if ellipsoid is None:
+        return np.full(y_size, abs(geo_transform[1]) * scale), \
+            np.full(y_size, abs(geo_transform[5]) * scale)
+
+    semi_major_axis, e2 = ellipsoid
+    latitude = np.radians(geo_transform[3] + geo_transform[5] *
+                          (np.arange(y_offset, y_offset + y_size) + 0.5))
+    w = 1 - e2 * np.sin(latitude) ** 2
+    prime_vertical_radius = semi_major_axis / np.sqrt(w)
+    meridional_radius = semi_major_axis * (1 - e2) / w ** 1.5
+
+    return prime_vertical_radius * np.cos(latitude) * np.radians(abs(geo_transform[1])) * scale, \
+        meridional_radius * np.radians(abs(geo_transform[5])) * scale
+
+
+@njit(nogil=True)
+def _terrain_kernel(z, dx, dy, codes, slope_in_degrees, azimuth, altitude, out):
+    """ Compute terrain attributes over 3x3 neighborhoods
+
+    Description
+    -----------
+    Derivatives follow Horn's method. Neighborhoods containing
+    no data (NaN) give NaN. Aspect of flat areas is NaN
+
+    Parameters
+    ----------
+    z: numpy.ndarray
+        elevation with 1-pixel halo, of shape (ny + 2, nx + 2)
+    dx: numpy.ndarray
+        pixel width of each of the ny rows (in vertical units)
+    dy: numpy.ndarray
+        pixel height of each of the ny rows (in vertical units)
+    codes: numpy.ndarray
+        indices of attributes in TERRAIN_ATTRIBUTES
+    slope_in_degrees: bool
+        if True, slope in degrees, otherwise in percent
+    azimuth: float
+        hillshade light azimuth in degrees (clockwise from north)
+    altitude: float
+        hillshade light altitude in degrees
+    out: numpy.ndarray
+        output array of shape (nb attributes, ny, nx)
+
+    """
+    zenith = np.radians(90 - altitude)
+    azimuth_math = np.radians((450 - azimuth) % 360)
+
+    for i in range(out.shape[1]):
+        for j in range(out.shape[2]):
+            a, b, c = z[i, j], z[i, j + 1], z[i, j + 2]
+            d, e, f = z[i + 1, j], z[i + 1, j + 1], z[i + 1, j + 2]
+            g, h, k = z[i + 2, j], z[i + 2, j + 1], z[i + 2, j + 2]
+
+            if np.isnan(a + b + c + d + e + f + g + h + k):
+                out[:, i, j] = np.nan
+                continue
+
+            dzdx = ((c + 2 * f + k) - (a + 2 * d + g)) / (8 * dx[i])
+            dzdy = ((g + 2 * h + k) - (a + 2 * b + c)) / (8 * dy[i])
+            gradient = np.sqrt(dzdx ** 2 + dzdy ** 2)
+
+            for n in range(codes.size):
+                if codes[n] == 0:
+                    if slope_in_degrees:
+                        out[n, i, j] = np.degrees(np.arctan(gradient))
+                    else:
+                        out[n, i, j] = 100 * gradient
+                elif codes[n] == 1:
+                    if gradient == 0:
+                        out[n, i, j] = np.nan
+                    else:
+                        aspect = np.degrees(np.arctan2(dzdy, -dzdx))
+                        aspect = 450 - aspect if aspect > 90 else 90 - aspect
+                        out[n, i, j] = aspect % 360
+                elif codes[n] == 2:
+                    slope = np.arctan(gradient)
+                    aspect = np.arctan2(dzdy, -dzdx)
+                    out[n, i, j] = max(0., 255 * (np.cos(zenith) * np.cos(slope) +
+                                                  np.sin(zenith) * np.sin(slope) *
+                                                  np.cos(azimuth_math - aspect)))
+                elif codes[n] == 3:
+                    out[n, i, j] = np.sqrt((a - e) ** 2 + (b - e) ** 2 + (c - e) ** 2 +
+                                           (d - e) ** 2 + (f - e) ** 2 + (g - e) ** 2 +
+                                           (h - e) ** 2 + (k - e) ** 2)
+                elif codes[n] == 4:
+                    out[n, i, j] = e - (a + b + c + d + f + g + h + k) / 8
+                elif codes[n] == 5:
+                    out[n, i, j] = max(a, b, c, d, e, f, g, h, k) - \
+                        min(a, b, c, d, e, f, g, h, k)
+                else:
+                    out[n, i, j] = -200 * (((d + f) / 2 - e) / dx[i] ** 2 +
+                                           ((b + h) / 2 - e) / dy[i] ** 2)
+
+
+def _terrain_tile(windows, src_file, band, codes, geo_transform, scale, ellipsoid,
+                  slope_in_degrees, azimuth, altitude, no_data):
+    """ Compute terrain attributes over one DEM tile
+
+    Parameters
+    ----------
+    windows: tuple
+        block window and window to read (with halo)
+    src_file: str
+        path to DEM file
+
+    Returns
+    -------
+    tuple
+        (window, numpy.ndarray of shape (nb attributes, y size, x size))
+    """
+    window, read_window = windows
+    gdal_band = gdal.Open(src_file).GetRasterBand(band)
+    z = _read_halo_window(gdal_band, window, read_window, TERRAIN_HALO).astype("float64")
+
+    src_no_data = gdal_band.GetNoDataValue()
+    if src_no_data is not None:
+        z[z == src_no_data] = np.nan
+
+    dx, dy = _pixel_sizes(geo_transform, window[1], window[3], scale, ellipsoid)
+    out = np.empty((codes.size, window[3], window[2]), dtype="float32")
+    _terrain_kernel(z, dx, dy, codes, slope_in_degrees, azimuth, altitude, out)
+    out[np.isnan(out)] = no_data
+
+    return window, out
+
+
+@_return_raster
+def _terrain(dem, out_file, attributes, band, slope_format, scale, azimuth,
+             altitude, no_data, window_size, nb_processes):
+    """ Compute multiple terrain attributes in one pass
+
+    Description
+    -----------
+    DEM is read tile by tile (with a 1-pixel halo) in worker
+    processes, and all attributes are computed from each tile
+    at once, so that DEM is only read once
+
+    Parameters
+    ----------
+    dem: pyrasta.raster.DigitalElevationModel
+    out_file: str
+        output file path to which new raster must be written
+    attributes: list[str]
+        terrain attributes (see TERRAIN_ATTRIBUTES)
+    band: int
+        DEM band
+    slope_format: str
+        Slope format {'percent', 'degree'}
+    scale: float or None
+        Ratio of vertical units to horizontal. If None, 1, or,
+        for DEM in geographic coordinates, pixel sizes are
+        computed in meters from latitude of each row
+    azimuth: float
+        hillshade light azimuth in degrees
+    altitude: float
+        hillshade light altitude in degrees
+    no_data: float
+        output no data value
+    window_size: int or (int, int)
+        size of tiles
+    nb_processes: int
+        number of processes for multiprocessing pool
+
+    Returns
+    -------
+
+    """
+    if isinstance(attributes, str):
+        attributes = [attributes]
+
+    attributes = [check_string(attribute, TERRAIN_ATTRIBUTES) for attribute in attributes]
+    slope_format = check_string(slope_format, ("percent", "degree"))
+
+    if not hasattr(window_size, "__getitem__"):
+        window_size = (window_size, window_size)
+
+    ellipsoid = _ellipsoid(dem) if scale is None else None
+    if scale is None:
+        scale = 1
+
+    out_ds = _gdal_temp_dataset(out_file,
+                                dem._gdal_driver,
+                                dem._gdal_dataset.GetProjection(),
+                                dem.x_size,
+                                dem.y_size,
+                                len(attributes),
+                                dem.geo_transform,
+                                gdal.GetDataTypeByName("Float32"),
+                                no_data)
+    for n, attribute in enumerate(attributes):
+        out_ds.GetRasterBand(n + 1).SetDescription(attribute)
+
+    nb_tiles = len(range(0, dem.x_size, window_size[0])) * \
+        len(range(0, dem.y_size, window_size[1]))
+
+    with mp.Pool(processes=nb_processes) as pool:
+        for window, array in tqdm(pool.imap(partial(_terrain_tile,
+                                                    src_file=dem._file,
+                                                    band=band,
+                                                    codes=np.asarray([TERRAIN_ATTRIBUTES.index(a)
+                                                                      for a in attributes]),
+                                                    geo_transform=dem.geo_transform,
+                                                    scale=scale,
+                                                    ellipsoid=ellipsoid,
+                                                    slope_in_degrees=slope_format == "degree",
+                                                    azimuth=azimuth,
+                                                    altitude=altitude,
+                                                    no_data=no_data),
+                                            get_halo_windows(window_size,
+                                                             TERRAIN_HALO,
+                                                             dem.x_size,
+                                                             dem.y_size)),
+                                  total=nb_tiles,
+                                  desc="Compute terrain attributes"):
+            for n in range(len(attributes)):
+                out_ds.GetRasterBand(n + 1).WriteArray(array[n], window[0], window[1])
+
+    # Close dataset
+    out_ds = None
+
+
+def _densify(line, spacing):
+    """ Densify (multi)line geometry at regular spacing
+
+    Parameters
+    ----------
+    line: shapely.geometry.LineString or shapely.geometry.MultiLineString
+    spacing: float
+        distance between consecutive points in line units
+
+    Returns
+    -------
+    tuple
+        (distance, x, y) arrays (empty if line is None or empty)
+    """
+    distance, x, y = [np.empty(0)], [np.empty(0)], [np.empty(0)]
+    length = 0
+
+    if line is None or line.is_empty:
+        return distance[0], x[0], y[0]
+
+    for part in getattr(line, "geoms", [line]):
+        if part.is_empty:
+            continue
+        coords = np.asarray(part.coords)
+        cum_length = np.concatenate(([0], np.cumsum(np.hypot(np.diff(coords[:, 0]),
+                                                             np.diff(coords[:, 1])))))
+        part_distance = np.append(np.arange(0, cum_length[-1], spacing), cum_length[-1])
+        distance.append(part_distance + length)
+        x.append(np.interp(part_distance, cum_length, coords[:, 0]))
+        y.append(np.interp(part_distance, cum_length, coords[:, 1]))
+        length += cum_length[-1]
+
+    return np.concatenate(distance), np.concatenate(x), np.concatenate(y)
+
+
+def _profile(dem, lines, spacing, method, crs):
+    """ Extract elevation profiles along lines
+
+    Description
+    -----------
+    Lines are densified at regular spacing and all resulting
+    points are sampled at once (block-grouped reads)
+
+    Parameters
+    ----------
+    dem: pyrasta.raster.DigitalElevationModel
+    lines: geopandas.GeoDataFrame or geopandas.GeoSeries or list
+        line geometries
+    spacing: float
+        distance between profile points in line CRS units
+    method: str
+        sampling method ("nearest" or "bilinear")
+    crs: None or int or str or pyproj.CRS
+        CRS of lines. If None, lines' CRS if defined, otherwise DEM CRS
+
+    Returns
+    -------
+    list[tuple]
+        (distance, elevation) arrays for each line
+        (empty arrays for None or empty geometries)
+    """
+    if crs is None:
+        crs = getattr(lines, "crs", None)
+
+    geometries = getattr(lines, "geometry", lines)
+    profiles = [_densify(line, spacing) for line in geometries]
+
+    if not profiles:
+        return []
+
+    values = _sample(dem,
+                     np.concatenate([profile[1] for profile in profiles]),
+                     np.concatenate([profile[2] for profile in profiles]),
+                     1,
+                     method,
+                     crs)
+    sections = np.cumsum([profile[0].size for profile in profiles])[:-1]
+
+    return [(profile[0], elevation) for profile, elevation
+            in zip(profiles, np.split(values, sections))]
+
+
+def _observer_window(dem, x, y, max_distance):
+    """ Return DEM window within max distance of observer
+
+    Returns
+    -------
+    tuple or None
+        (x offset, y offset, x size, y size) within
+        DEM, or None if observer is out of DEM
+    """
+    col, row = _xy_to_pixel(dem.geo_transform, x, y)
+
+    if not (0 <= col < dem.x_size and 0 <= row < dem.y_size):
+        return None
+
+    x_radius = max_distance / abs(dem.geo_transform[1])
+    y_radius = max_distance / abs(dem.geo_transform[5])
+    x_min = max(0, int(np.floor(col - x_radius)))
+    y_min = max(0, int(np.floor(row - y_radius)))
+    x_max = min(dem.x_size, int(np.ceil(col + x_radius)) + 1)
+    y_max = min(dem.y_size, int(np.ceil(row + y_radius)) + 1)
+
+    return x_min, y_min, x_max - x_min, y_max - y_min
+
+
+def _viewshed_window(task, src_file, band, target_height, max_distance,
+                     curvature_coefficient):
+    """ Compute viewshed of one observer within its DEM window
+
+    Parameters
+    ----------
+    task: tuple
+        (x, y, observer height, DEM window)
+
+    Returns
+    -------
+    tuple
+        (window, visibility array (1: visible, 0 otherwise))
+    """
+    x, y, height, window = task
+    crop_ds = gdal.Translate("", gdal.Open(src_file), format="MEM", srcWin=list(window))
+    viewshed_ds = gdal.ViewshedGenerate(crop_ds.GetRasterBand(band),
+                                        "MEM", "", [], x, y, height, target_height,
+                                        1, 0, 0, 0, curvature_coefficient,
+                                        gdal.GVM_Edge, max_distance)
+
+    # Viewshed may be cropped to max distance within window
+    crop_gt = crop_ds.GetGeoTransform()
+    viewshed_gt = viewshed_ds.GetGeoTransform()
+    x_offset = window[0] + int(round((viewshed_gt[0] - crop_gt[0]) / crop_gt[1]))
+    y_offset = window[1] + int(round((viewshed_gt[3] - crop_gt[3]) / crop_gt[5]))
+    visibility = viewshed_ds.GetRasterBand(1).ReadAsArray()
+
+    return (x_offset, y_offset, visibility.shape[1], visibility.shape[0]), visibility
+
+
+@_return_raster
+def _viewshed(dem, out_file, observers, height, target_height, max_distance,
+              curvature_coefficient, band, crs, nb_processes):
+    """ Compute cumulative viewshed of multiple observers
+
+    Description
+    -----------
+    Viewshed of each observer is computed by GDAL in a worker
+    process, over the DEM window within max distance of the
+    observer only. Viewsheds are summed into the output raster
+    (read-modify-write of each window), so that no full-size
+    viewshed is ever held in memory
+
+    Parameters
+    ----------
+    dem: pyrasta.raster.DigitalElevationModel
+    out_file: str
+        output file path to which new raster must be written
+    observers: geopandas.GeoDataFrame or list
+        observer points (geometries or (x, y) tuples)
+    height: float or list[float]
+        observer height(s) above DEM
+    target_height: float
+        target height above DEM
+    max_distance: float
+        maximum visibility distance (in DEM CRS units)
+    curvature_coefficient: float
+        coefficient for atmospheric refraction/earth curvature
+    band: int
+        DEM band
+    crs: None or int or str or pyproj.CRS
+        observer CRS. If None, observers' CRS if defined, otherwise DEM CRS
+    nb_processes: int
+        number of processes for multiprocessing pool
+
+    """
+    if crs is None:
+        crs = getattr(observers, "crs", None)
+
+    points = getattr(observers, "geometry", observers)
+    coords = np.array([(point.x, point.y) if hasattr(point, "x") else point
+                       for point in points], dtype="float64").reshape(-1, 2)
+    x, y = coords[:, 0], coords[:, 1]
+
+    if crs is not None:
+        x, y = transform_xy(x, y, crs, dem.projection)
+
+    height = np.broadcast_to(height, x.shape)
+    tasks = []
+    for x_obs, y_obs, h_obs in zip(x, y, height):
+        window = _observer_window(dem, x_obs, y_obs, max_distance)
+        if window is not None:
+            tasks.append((x_obs, y_obs, h_obs, window))
+
+    if len(tasks) < x.size:
+        warnings.warn("%d observer(s) out of DEM extent are ignored" % (x.size - len(tasks)))
+
+    out_ds = _gdal_temp_dataset(out_file,
+                                dem._gdal_driver,
+                                dem._gdal_dataset.GetProjection(),
+                                dem.x_size,
+                                dem.y_size,
+                                1,
+                                dem.geo_transform,
+                                gdal.GetDataTypeByName("UInt32"),
+                                None)
+    out_band = out_ds.GetRasterBand(1)
+
+    with mp.Pool(processes=nb_processes) as pool:
+        for window, visibility in tqdm(pool.imap_unordered(partial(_viewshed_window,
+                                                                   src_file=dem._file,
+                                                                   band=band,
+                                                                   target_height=target_height,
+                                                                   max_distance=max_distance,
+                                                                   curvature_coefficient=
+                                                                   curvature_coefficient),
+                                                           tasks),
+                                       total=len(tasks),
+                                       desc="Compute viewsheds"):
+            count = out_band.ReadAsArray(*window)
+            out_band.WriteArray(count + (visibility == 1), window[0], window[1])
+
+    # Close dataset
+    out_ds = None
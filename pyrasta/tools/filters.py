@@ -4,7 +4,16 @@
 
 More detailed description.
 """
-from pyrasta.tools import _clone_gdal_dataset, _return_raster
+import multiprocessing as mp
+from functools import partial
+
+import numpy as np
+from tqdm import tqdm
+
+from pyrasta import GDAL_MEM_DRIVER
+from pyrasta.tools import _clone_gdal_dataset, _return_raster, _gdal_temp_dataset
+from pyrasta.tools.labeling import _label_regions, NEIGHBORS_4, NEIGHBORS_8
+from pyrasta.tools.windows import get_halo_windows
 from pyrasta.utils import gdal_progress_bar
 
 try:
@@ -13,8 +22,168 @@ except ImportError:
     import gdal
 
 
+def _straddling_regions(array, sieved, window, read_window, threshold, connectedness):
+    """ Return small regions of tile extending into adjacent tiles
+
+    Description
+    -----------
+    Such regions are entirely within the tile window (halo
+    included) and are identified in each tile they touch by
+    their first pixel (in raster order)
+
+    Returns
+    -------
+    list
+        (region key, new value, rows, columns) for each region,
+        rows and columns (within raster) being those within tile
+    """
+    labels, nb_labels = _label_regions(array, np.ones(array.shape, dtype=bool),
+                                       NEIGHBORS_8 if connectedness == 8 else NEIGHBORS_4)
+    sizes = np.bincount(labels.ravel(), minlength=nb_labels)
+
+    # Regions cut by window (i.e. within halo, but not on raster edge)
+    is_cut = np.zeros(nb_labels, dtype=bool)
+    for side, is_raster_edge in ((labels[0, :], read_window[1] == 0),
+                                 (labels[-1, :], read_window[1] + read_window[3] ==
+                                  window[4]),
+                                 (labels[:, 0], read_window[0] == 0),
+                                 (labels[:, -1], read_window[0] + read_window[2] ==
+                                  window[5])):
+        if not is_raster_edge:
+            is_cut[side] = True
+
+    x_offset, y_offset = window[0] - read_window[0], window[1] - read_window[1]
+    in_tile = np.zeros(labels.shape, dtype=bool)
+    in_tile[y_offset:y_offset + window[3], x_offset:x_offset + window[2]] = True
+
+    is_small = (sizes < threshold) & ~is_cut
+    touches_tile = np.zeros(nb_labels, dtype=bool)
+    touches_tile[labels[in_tile]] = True
+    touches_halo = np.zeros(nb_labels, dtype=bool)
+    touches_halo[labels[~in_tile]] = True
+
+    regions = []
+    for label in np.flatnonzero(is_small & touches_tile & touches_halo):
+        rows, cols = np.nonzero(labels == label)
+        rows += read_window[1]
+        cols += read_window[0]
+        is_tile_pixel = in_tile[rows - read_window[1], cols - read_window[0]]
+        regions.append((rows[0] * window[5] + cols[0],
+                        sieved[rows[0] - read_window[1], cols[0] - read_window[0]],
+                        rows[is_tile_pixel],
+                        cols[is_tile_pixel]))
+
+    return regions
+
+
+def _sieve_tile(windows, src_file, threshold, connectedness, x_size, y_size):
+    """ Apply sieve filter to tile (all bands)
+
+    Returns
+    -------
+    tuple
+        (window, sieved tile array of shape (nb_band, y size, x size),
+        straddling small regions of each band)
+    """
+    window, read_window = windows
+    src_ds = gdal.Open(src_file)
+    array = src_ds.ReadAsArray(*read_window)
+    if array.ndim == 2:
+        array = array[np.newaxis]
+
+    mem_ds = GDAL_MEM_DRIVER.Create("", read_window[2], read_window[3], array.shape[0],
+                                    src_ds.GetRasterBand(1).DataType)
+    for band in range(array.shape[0]):
+        mem_band = mem_ds.GetRasterBand(band + 1)
+        mem_band.WriteArray(array[band])
+        gdal.SieveFilter(mem_band, None, mem_band, threshold, connectedness)
+
+    sieved = mem_ds.ReadAsArray()
+    if sieved.ndim == 2:
+        sieved = sieved[np.newaxis]
+
+    regions = [_straddling_regions(array[band], sieved[band], window + (y_size, x_size),
+                                   read_window, threshold, connectedness)
+               for band in range(array.shape[0])]
+
+    x_offset, y_offset = window[0] - read_window[0], window[1] - read_window[1]
+
+    return window, sieved[:, y_offset:y_offset + window[3],
+                          x_offset:x_offset + window[2]], regions
+
+
+def _sieve_by_tile(raster, out_file, threshold, connectedness, window_size, nb_processes):
+    """ Apply sieve filter tile by tile
+
+    Description
+    -----------
+    Tiles are read (all bands at once) with a halo of threshold
+    pixels and sieved in parallel: a region is small if and only if
+    it is small within the tile window. Small regions extending over
+    several tiles are then given the value selected by the tile
+    containing their first pixel. Only the choice of the neighbor
+    a small region is merged into may differ from the whole raster
+    filter, when neighbor regions extend beyond the tile window
+
+    """
+    if not hasattr(window_size, "__getitem__"):
+        window_size = (window_size, window_size)
+
+    out_ds = _gdal_temp_dataset(out_file,
+                                raster._gdal_driver,
+                                raster._gdal_dataset.GetProjection(),
+                                raster.x_size,
+                                raster.y_size,
+                                raster.nb_band,
+                                raster.geo_transform,
+                                raster.data_type,
+                                raster.no_data_values)
+
+    nb_tiles = len(range(0, raster.x_size, window_size[0])) * \
+        len(range(0, raster.y_size, window_size[1]))
+    values = {}
+    straddling = []
+
+    with mp.Pool(processes=nb_processes) as pool:
+        for window, sieved, regions in tqdm(pool.imap(partial(_sieve_tile,
+                                                              src_file=raster._file,
+                                                              threshold=threshold,
+                                                              connectedness=connectedness,
+                                                              x_size=raster.x_size,
+                                                              y_size=raster.y_size),
+                                                      get_halo_windows(window_size,
+                                                                       threshold,
+                                                                       raster.x_size,
+                                                                       raster.y_size)),
+                                            total=nb_tiles,
+                                            desc="Apply sieve filter"):
+            for band in range(raster.nb_band):
+                out_ds.GetRasterBand(band + 1).WriteArray(sieved[band], window[0], window[1])
+                for key, value, rows, cols in regions[band]:
+                    if window[0] <= key % raster.x_size < window[0] + window[2] and \
+                            window[1] <= key // raster.x_size < window[1] + window[3]:
+                        values[(band, key)] = value
+                    else:
+                        straddling.append((band, key, value, rows, cols))
+
+    # Reconcile small regions extending over several tiles
+    for band, key, value, rows, cols in straddling:
+        if values[(band, key)] != value:
+            out_band = out_ds.GetRasterBand(band + 1)
+            x_min, y_min = cols.min(), rows.min()
+            array = out_band.ReadAsArray(int(x_min), int(y_min),
+                                         int(cols.max() - x_min + 1),
+                                         int(rows.max() - y_min + 1))
+            array[rows - y_min, cols - x_min] = values[(band, key)]
+            out_band.WriteArray(array, int(x_min), int(y_min))
+
+    # Close dataset
+    out_ds = None
+
+
 @_return_raster
-def _sieve(raster, out_file, threshold, connectedness, progress_bar):
+def _sieve(raster, out_file, threshold, connectedness, progress_bar, window_size,
+           nb_processes):
     """ Apply sieve filter to raster
 
     Parameters
@@ -24,11 +193,19 @@ def _sieve(raster, out_file, threshold, connectedness, progress_bar):
     threshold: int
     connectedness: int
     progress_bar: bool
+    window_size: int or (int, int) or None
+        size of tiles. If None, apply filter over whole raster
+    nb_processes: int
+        number of processes for multiprocessing pool (tiled mode)
 
     Returns
     -------
 
     """
+    if window_size is not None:
+        return _sieve_by_tile(raster, out_file, threshold, connectedness,
+                              window_size, nb_processes)
+
     out_ds = _clone_gdal_dataset(raster, out_file)
 
     callback, callback_data = gdal_progress_bar(progress_bar,
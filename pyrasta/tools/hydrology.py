@@ -0,0 +1,922 @@
+# -*- coding: utf-8 -*-
+
+""" Hydrology functions
+
+Out-of-core D8 algorithms: each function processes the DEM tile by tile
+in worker processes, resolves dependencies between tiles over a graph
+of tile perimeter cells in the main process, and writes final tiles in
+a last pass, so that the whole raster never has to be held in memory.
+"""
+import heapq
+import multiprocessing as mp
+from functools import partial
+
+import numpy as np
+from numba import njit, types
+from numba.typed import Dict
+from tqdm import tqdm
+
+from pyrasta.tools import _return_raster, _gdal_temp_dataset
+from pyrasta.tools.calculator import get_xy_block_windows
+from pyrasta.tools.dem import _ellipsoid, _pixel_sizes
+from pyrasta.tools.windows import get_halo_windows, _read_halo_window
+
+try:
+    from osgeo import gdal
+except ImportError:
+    import gdal
+
+
+# D8 (ESRI) direction codes: E, SE, S, SW, W, NW, N, NE
+D8_CODES = np.array([1, 2, 4, 8, 16, 32, 64, 128], dtype="uint8")
+D8_ROW = np.array([0, 1, 1, 1, 0, -1, -1, -1])
+D8_COL = np.array([1, 1, 0, -1, -1, -1, 0, 1])
+D8_INDEX = np.full(256, -1)
+D8_INDEX[D8_CODES] = np.arange(8)
+
+FLOW_DIRECTION_HALO = 2
+FLOW_DIRECTION_NO_DATA = 255
+
+# Label of cells draining out of DEM
+OCEAN = 1
+# Downstream cell lies in another tile
+LEAVES_TILE = -2
+
+
+def _read_dem_tile(src_file, window, read_window=None, halo=0):
+    """ Read DEM tile as float64
+
+    Description
+    -----------
+    No data (and halo pixels outside raster) are set to NaN
+
+    """
+    gdal_band = gdal.Open(src_file).GetRasterBand(1)
+
+    if read_window is None:
+        z = gdal_band.ReadAsArray(*window).astype("float64")
+    else:
+        z = _read_halo_window(gdal_band, window, read_window, halo, np.nan).astype("float64")
+
+    no_data = gdal_band.GetNoDataValue()
+    if no_data is not None:
+        z[z == no_data] = np.nan
+
+    return z
+
+
+def _tiles(windows, window_size):
+    """ Return (row, column) position of tile windows in tile grid
+
+    """
+    return [(window[1] // window_size[1], window[0] // window_size[0]) for window in windows]
+
+
+def _perimeter_indices(y_size, x_size):
+    """ Return flat indices of tile perimeter cells
+
+    """
+    is_perimeter = np.zeros((y_size, x_size), dtype=bool)
+    is_perimeter[[0, -1], :] = True
+    is_perimeter[:, [0, -1]] = True
+
+    return np.flatnonzero(is_perimeter)
+
+
+###########################
+# Depression filling
+###########################
+
+@njit(nogil=True)
+def _flood_tile(z, dem_edges):
+    """ Priority-flood tile from its perimeter
+
+    Description
+    -----------
+    Each cell is labelled with the watershed of the perimeter cell it
+    drains to (OCEAN for cells draining out of DEM) and depressions
+    are filled up to the tile perimeter. Lowest spill elevation
+    between adjacent watersheds is recorded as a graph edge
+    (Barnes et al., 2016, Parallel priority-flood depression filling
+    for trillion cell digital elevation models)
+
+    Parameters
+    ----------
+    z: numpy.ndarray
+        elevation (NaN for no data)
+    dem_edges: numpy.ndarray
+        whether tile top, bottom, left and right sides lie on DEM border
+
+    Returns
+    -------
+    tuple
+        filled elevation, labels, number of labels
+        and graph edges as (label, label, spill elevation)
+    """
+    ny, nx = z.shape
+    filled = z.copy()
+    labels = np.zeros((ny, nx), dtype=np.int64)
+    queued = np.zeros((ny, nx), dtype=np.bool_)
+    heap = [(0., 0, 0)]
+    heap.pop()
+    counter = 0
+
+    for i in range(ny):
+        for j in range(nx):
+            if np.isnan(z[i, j]):
+                filled[i, j] = -np.inf
+                labels[i, j] = OCEAN
+            elif i == 0 or i == ny - 1 or j == 0 or j == nx - 1:
+                if (i == 0 and dem_edges[0]) or (i == ny - 1 and dem_edges[1]) or \
+                        (j == 0 and dem_edges[2]) or (j == nx - 1 and dem_edges[3]):
+                    labels[i, j] = OCEAN
+            else:
+                continue
+            queued[i, j] = True
+            heapq.heappush(heap, (filled[i, j], counter, i * nx + j))
+            counter += 1
+
+    edges = Dict.empty(key_type=types.int64, value_type=types.float64)
+    nb_keys = ny * nx + 2
+    next_label = 2
+
+    while heap:
+        _, _, idx = heapq.heappop(heap)
+        i, j = idx // nx, idx % nx
+        if labels[i, j] == 0:
+            labels[i, j] = next_label
+            next_label += 1
+        label = labels[i, j]
+
+        for k in range(8):
+            ni, nj = i + D8_ROW[k], j + D8_COL[k]
+            if ni < 0 or ni >= ny or nj < 0 or nj >= nx:
+                continue
+            if queued[ni, nj]:
+                other = labels[ni, nj]
+                if other == 0:
+                    # Perimeter cell not processed yet
+                    labels[ni, nj] = label
+                elif other != label:
+                    key = min(label, other) * nb_keys + max(label, other)
+                    spill = max(filled[i, j], filled[ni, nj])
+                    if spill < edges.get(key, np.inf):
+                        edges[key] = spill
+                continue
+            labels[ni, nj] = label
+            filled[ni, nj] = max(filled[ni, nj], filled[i, j])
+            queued[ni, nj] = True
+            heapq.heappush(heap, (filled[ni, nj], counter, ni * nx + nj))
+            counter += 1
+
+    u = np.empty(len(edges), dtype=np.int64)
+    v = np.empty(len(edges), dtype=np.int64)
+    w = np.empty(len(edges), dtype=np.float64)
+    n = 0
+    for key, spill in edges.items():
+        u[n], v[n], w[n] = key // nb_keys, key % nb_keys, spill
+        n += 1
+
+    return filled, labels, next_label, u, v, w
+
+
+@njit(nogil=True)
+def _minimax_flood(indptr, indices, weights, nb_labels):
+    """ Compute spill elevation of each watershed
+
+    Description
+    -----------
+    Spill elevation of a watershed is the lowest elevation at
+    which it drains out of DEM, i.e. the minimax path weight from
+    OCEAN in the watershed graph (CSR format)
+
+    """
+    spill = np.full(nb_labels, np.inf)
+    spill[OCEAN] = -np.inf
+    done = np.zeros(nb_labels, dtype=np.bool_)
+    heap = [(-np.inf, OCEAN)]
+
+    while heap:
+        level, label = heapq.heappop(heap)
+        if done[label]:
+            continue
+        done[label] = True
+        for n in range(indptr[label], indptr[label + 1]):
+            other = indices[n]
+            new_level = max(level, weights[n])
+            if new_level < spill[other]:
+                spill[other] = new_level
+                heapq.heappush(heap, (new_level, other))
+
+    # Watersheds that never drain out are not raised
+    spill[~done] = -np.inf
+
+    return spill
+
+
+def _dem_edges(window, x_size, y_size):
+    """ Return whether window sides lie on DEM border
+
+    """
+    return np.array([window[1] == 0, window[1] + window[3] == y_size,
+                     window[0] == 0, window[0] + window[2] == x_size])
+
+
+def _fill_graph_tile(window, src_file, x_size, y_size):
+    """ First pass of depression filling over one tile
+
+    Returns
+    -------
+    tuple
+        (window, perimeter filled elevations and labels
+        (top, bottom, left, right), graph edges, number of labels)
+    """
+    filled, labels, nb_labels, u, v, w = _flood_tile(_read_dem_tile(src_file, window),
+                                                     _dem_edges(window, x_size, y_size))
+
+    perimeter = tuple((array[0, :], array[-1, :], array[:, 0], array[:, -1])
+                      for array in (filled, labels))
+
+    return window, perimeter, (u, v, w), nb_labels
+
+
+def _fill_tile(task, src_file, x_size, y_size, no_data):
+    """ Second pass of depression filling over one tile
+
+    """
+    window, spill = task
+    z = _read_dem_tile(src_file, window)
+    filled, labels, _, _, _, _ = _flood_tile(z, _dem_edges(window, x_size, y_size))
+
+    filled = np.maximum(filled, spill[labels])
+    filled[np.isnan(z)] = no_data
+
+    return window, filled
+
+
+def _global_labels(labels, base):
+    """ Convert tile labels to global labels
+
+    """
+    return np.where(labels >= 2, labels + base, labels)
+
+
+def _line_edges(values1, labels1, values2, labels2):
+    """ Return graph edges between two adjacent lines of cells
+
+    """
+    size = values1.size
+    u, v, w = [], [], []
+    for shift in (-1, 0, 1):
+        idx = np.arange(max(0, -shift), min(size, size - shift))
+        u.append(labels1[idx])
+        v.append(labels2[idx + shift])
+        w.append(np.maximum(values1[idx], values2[idx + shift]))
+
+    return np.concatenate(u), np.concatenate(v), np.concatenate(w)
+
+
+def _boundary_edges(perimeters):
+    """ Yield graph edges between adjacent tiles
+
+    Parameters
+    ----------
+    perimeters: dict
+        perimeter elevations and labels of each tile
+
+    """
+    for (row, col), (values, labels) in perimeters.items():
+        if (row, col + 1) in perimeters:
+            other_values, other_labels = perimeters[(row, col + 1)]
+            yield _line_edges(values[3], labels[3], other_values[2], other_labels[2])
+        if (row + 1, col) in perimeters:
+            other_values, other_labels = perimeters[(row + 1, col)]
+            yield _line_edges(values[1], labels[1], other_values[0], other_labels[0])
+        if (row + 1, col + 1) in perimeters:
+            other_values, other_labels = perimeters[(row + 1, col + 1)]
+            yield _line_edges(values[1][-1:], labels[1][-1:],
+                              other_values[0][:1], other_labels[0][:1])
+        if (row + 1, col - 1) in perimeters:
+            other_values, other_labels = perimeters[(row + 1, col - 1)]
+            yield _line_edges(values[1][:1], labels[1][:1],
+                              other_values[0][-1:], other_labels[0][-1:])
+
+
+@_return_raster
+def _fill_depressions(dem, out_file, window_size, nb_processes):
+    """ Fill DEM depressions
+
+    Description
+    -----------
+    Tiled priority-flood: tiles are flooded independently from
+    their perimeter, the spill elevation of each tile watershed
+    is then solved over the graph of watersheds, and each cell
+    is finally raised to the spill elevation of its watershed
+
+    Parameters
+    ----------
+    dem: pyrasta.raster.DigitalElevationModel
+    out_file: str
+        output file path to which new raster must be written
+    window_size: int or (int, int)
+        size of tiles
+    nb_processes: int
+        number of processes for multiprocessing pool
+
+    """
+    if not hasattr(window_size, "__getitem__"):
+        window_size = (window_size, window_size)
+
+    windows = list(get_xy_block_windows(window_size, dem.x_size, dem.y_size))
+    tiles = _tiles(windows, window_size)
+    perimeters = {}
+    bases = []
+    tile_nb_labels = []
+    u, v, w = [], [], []
+    nb_labels = 2
+
+    with mp.Pool(processes=nb_processes) as pool:
+        for tile, (window, perimeter, edges, tile_labels) in \
+                zip(tiles, tqdm(pool.imap(partial(_fill_graph_tile,
+                                                  src_file=dem._file,
+                                                  x_size=dem.x_size,
+                                                  y_size=dem.y_size),
+                                          windows),
+                                total=len(windows),
+                                desc="Fill depressions (1/2)")):
+            base = nb_labels - 2
+            values, labels = perimeter
+            perimeters[tile] = (values, tuple(_global_labels(side, base) for side in labels))
+            u.append(_global_labels(edges[0], base))
+            v.append(_global_labels(edges[1], base))
+            w.append(edges[2])
+            bases.append(base)
+            tile_nb_labels.append(tile_labels)
+            nb_labels += tile_labels - 2
+
+        for edges in _boundary_edges(perimeters):
+            u.append(edges[0])
+            v.append(edges[1])
+            w.append(edges[2])
+
+        del perimeters
+
+        u, v, w = np.concatenate(u), np.concatenate(v), np.concatenate(w)
+        u, v, w = np.concatenate((u, v)), np.concatenate((v, u)), np.concatenate((w, w))
+        order = np.argsort(u, kind="stable")
+        indptr = np.zeros(nb_labels + 1, dtype=np.int64)
+        np.cumsum(np.bincount(u, minlength=nb_labels), out=indptr[1:])
+        spill = _minimax_flood(indptr, v[order], w[order], nb_labels)
+
+        out_ds = _gdal_temp_dataset(out_file,
+                                    dem._gdal_driver,
+                                    dem._gdal_dataset.GetProjection(),
+                                    dem.x_size,
+                                    dem.y_size,
+                                    1,
+                                    dem.geo_transform,
+                                    dem.data_type,
+                                    dem.no_data)
+
+        tasks = ((window, np.concatenate(([-np.inf, -np.inf],
+                                          spill[base + 2:base + tile_labels])))
+                 for window, base, tile_labels in zip(windows, bases, tile_nb_labels))
+
+        for window, filled in tqdm(pool.imap(partial(_fill_tile,
+                                                     src_file=dem._file,
+                                                     x_size=dem.x_size,
+                                                     y_size=dem.y_size,
+                                                     no_data=dem.no_data),
+                                             tasks),
+                                   total=len(windows),
+                                   desc="Fill depressions (2/2)"):
+            out_ds.GetRasterBand(1).WriteArray(filled, window[0], window[1])
+
+    # Close dataset
+    out_ds = None
+
+
+###########################
+# Flow direction
+###########################
+
+@njit(nogil=True)
+def _d8_tile(z, dx, dy, ring_distance):
+    """ Compute D8 flow directions over tile
+
+    Description
+    -----------
+    Each cell flows to its steepest downslope neighbor. Cells
+    next to no data or DEM border flow out of DEM. Cells of flats
+    flow to the equal-elevation neighbor nearest (in cells, within
+    the flat) to the flat's outlet
+
+    Parameters
+    ----------
+    z: numpy.ndarray
+        elevation with 2-pixel halo (NaN for no data/out of DEM)
+    dx: numpy.ndarray
+        pixel width of each tile row, with 1-pixel halo
+    dy: numpy.ndarray
+        pixel height of each tile row, with 1-pixel halo
+    ring_distance: numpy.ndarray
+        distance to outlet of flat cells in the 1-pixel halo,
+        as computed in adjacent tiles (inf if unknown)
+
+    Returns
+    -------
+    tuple
+        flow directions of tile cells (ESRI codes) and distance
+        to outlet of flat cells with 1-pixel halo (inf elsewhere)
+    """
+    ny, nx = z.shape[0] - 2, z.shape[1] - 2
+    steepest = np.full((ny, nx), -1, dtype=np.int64)
+    distance = np.full((ny, nx), np.inf)
+
+    for i in range(ny):
+        diagonal = np.sqrt(dx[i] ** 2 + dy[i] ** 2)
+        for j in range(nx):
+            e = z[i + 1, j + 1]
+            if np.isnan(e):
+                steepest[i, j] = -2
+                continue
+            best_gradient, best = 0., -1
+            outlet = -1
+            for k in range(8):
+                n = z[i + 1 + D8_ROW[k], j + 1 + D8_COL[k]]
+                if np.isnan(n):
+                    # Prefer orthogonal outlets
+                    if outlet < 0 or (outlet % 2 == 1 and k % 2 == 0):
+                        outlet = k
+                elif e > n:
+                    if D8_ROW[k] == 0:
+                        gradient = (e - n) / dx[i]
+                    elif D8_COL[k] == 0:
+                        gradient = (e - n) / dy[i]
+                    else:
+                        gradient = (e - n) / diagonal
+                    if gradient > best_gradient:
+                        best_gradient, best = gradient, k
+            steepest[i, j] = outlet if outlet >= 0 else best
+            if steepest[i, j] >= 0:
+                distance[i, j] = 0
+            elif i == 0 or i == ny - 1 or j == 0 or j == nx - 1:
+                distance[i, j] = ring_distance[i, j]
+
+    # Distance to outlet within flats (multi-source Dijkstra)
+    heap = [(0., 0)]
+    heap.pop()
+    for i in range(1, ny - 1):
+        for j in range(1, nx - 1):
+            if steepest[i, j] != -1:
+                continue
+            for k in range(8):
+                ni, nj = i + D8_ROW[k], j + D8_COL[k]
+                if z[ni + 1, nj + 1] == z[i + 1, j + 1] and distance[ni, nj] + 1 < distance[i, j]:
+                    distance[i, j] = distance[ni, nj] + 1
+            if distance[i, j] < np.inf:
+                heapq.heappush(heap, (distance[i, j], i * nx + j))
+
+    while heap:
+        d, idx = heapq.heappop(heap)
+        i, j = idx // nx, idx % nx
+        if d > distance[i, j]:
+            continue
+        for k in range(8):
+            ni, nj = i + D8_ROW[k], j + D8_COL[k]
+            if 1 <= ni < ny - 1 and 1 <= nj < nx - 1 and steepest[ni, nj] == -1 \
+                    and z[ni + 1, nj + 1] == z[i + 1, j + 1] and d + 1 < distance[ni, nj]:
+                distance[ni, nj] = d + 1
+                heapq.heappush(heap, (d + 1, ni * nx + nj))
+
+    directions = np.zeros((ny - 2, nx - 2), dtype=np.uint8)
+    for i in range(1, ny - 1):
+        for j in range(1, nx - 1):
+            if steepest[i, j] == -2:
+                directions[i - 1, j - 1] = FLOW_DIRECTION_NO_DATA
+            elif steepest[i, j] >= 0:
+                directions[i - 1, j - 1] = D8_CODES[steepest[i, j]]
+            elif distance[i, j] < np.inf:
+                best = -1
+                for k in range(8):
+                    ni, nj = i + D8_ROW[k], j + D8_COL[k]
+                    if z[ni + 1, nj + 1] == z[i + 1, j + 1] and distance[ni, nj] < distance[i, j]:
+                        if best < 0 or distance[ni, nj] < distance[i + D8_ROW[best],
+                                                                  j + D8_COL[best]]:
+                            best = k
+                directions[i - 1, j - 1] = D8_CODES[best]
+
+    for i in range(ny):
+        for j in range(nx):
+            if steepest[i, j] != -1:
+                distance[i, j] = np.inf
+
+    return directions, distance
+
+
+def _ring_distance(perimeters, tile, window):
+    """ Return distances of flat cells around tile from adjacent tiles
+
+    Returns
+    -------
+    tuple or None
+        ring rows (top, bottom, with corners) and columns (left, right)
+    """
+    row, col = tile
+    neighbors = [perimeters.get((row + dr, col + dc)) for dr, dc in
+                 ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))]
+
+    if all(neighbor is None for neighbor in neighbors):
+        return None
+
+    nw, n, ne, w, e, sw, s, se = neighbors
+    unknown = [np.full(1, np.inf), np.full(window[2], np.inf), np.full(window[3], np.inf)]
+
+    return (np.concatenate((unknown[0] if nw is None else nw[1][-1:],
+                            unknown[1] if n is None else n[1],
+                            unknown[0] if ne is None else ne[1][:1])),
+            np.concatenate((unknown[0] if sw is None else sw[0][-1:],
+                            unknown[1] if s is None else s[0],
+                            unknown[0] if se is None else se[0][:1])),
+            unknown[2] if w is None else w[3],
+            unknown[2] if e is None else e[2])
+
+
+def _flow_direction_tile(task, src_file, geo_transform, ellipsoid):
+    """ Compute flow directions over one tile
+
+    Returns
+    -------
+    tuple
+        (window, directions, distance to outlet of flat
+        perimeter cells (top, bottom, left, right) or None)
+    """
+    (window, read_window), ring = task
+    z = _read_dem_tile(src_file, window, read_window, FLOW_DIRECTION_HALO)
+    dx, dy = _pixel_sizes(geo_transform, window[1] - 1, window[3] + 2, 1, ellipsoid)
+
+    ring_distance = np.full((window[3] + 2, window[2] + 2), np.inf)
+    if ring is not None:
+        ring_distance[0, :], ring_distance[-1, :] = ring[0], ring[1]
+        ring_distance[1:-1, 0], ring_distance[1:-1, -1] = ring[2], ring[3]
+
+    directions, distance = _d8_tile(z, dx, dy, ring_distance)
+    perimeter = (distance[1, 1:-1], distance[-2, 1:-1], distance[1:-1, 1], distance[1:-1, -2])
+
+    if not any(np.isfinite(side).any() for side in perimeter):
+        perimeter = None
+
+    return window, directions, perimeter
+
+
+@_return_raster
+def _flow_direction(dem, out_file, window_size, nb_processes):
+    """ Compute D8 flow directions
+
+    Description
+    -----------
+    Tiles are read with a 2-pixel halo. Distances to outlet of
+    flats crossing tile borders are exchanged between adjacent
+    tiles, which are recomputed until distances are stable
+
+    Parameters
+    ----------
+    dem: pyrasta.raster.DigitalElevationModel
+    out_file: str
+        output file path to which new raster must be written
+    window_size: int or (int, int)
+        size of tiles
+    nb_processes: int
+        number of processes for multiprocessing pool
+
+    """
+    if not hasattr(window_size, "__getitem__"):
+        window_size = (window_size, window_size)
+
+    windows = list(get_halo_windows(window_size, FLOW_DIRECTION_HALO, dem.x_size, dem.y_size))
+    tiles = _tiles([window[0] for window in windows], window_size)
+    index = {tile: n for n, tile in enumerate(tiles)}
+
+    out_ds = _gdal_temp_dataset(out_file,
+                                dem._gdal_driver,
+                                dem._gdal_dataset.GetProjection(),
+                                dem.x_size,
+                                dem.y_size,
+                                1,
+                                dem.geo_transform,
+                                gdal.GetDataTypeByName("Byte"),
+                                FLOW_DIRECTION_NO_DATA)
+
+    perimeters = {}
+    pending = list(range(len(windows)))
+    iteration = 1
+
+    with mp.Pool(processes=nb_processes) as pool:
+        while pending:
+            tasks = [(windows[n], _ring_distance(perimeters, tiles[n], windows[n][0])) for n in pending]
+            changed = []
+            for n, (window, directions, perimeter) in \
+                    zip(pending, tqdm(pool.imap(partial(_flow_direction_tile,
+                                                        src_file=dem._file,
+                                                        geo_transform=dem.geo_transform,
+                                                        ellipsoid=_ellipsoid(dem)),
+                                                tasks),
+                                      total=len(tasks),
+                                      desc="Compute flow direction (pass %d)" % iteration)):
+                out_ds.GetRasterBand(1).WriteArray(directions, window[0], window[1])
+                old_perimeter = perimeters.get(tiles[n])
+                if (old_perimeter is None) != (perimeter is None) or perimeter is not None and \
+                        not all(np.array_equal(old, new)
+                                for old, new in zip(old_perimeter, perimeter)):
+                    changed.append(tiles[n])
+                if perimeter is None:
+                    perimeters.pop(tiles[n], None)
+                else:
+                    perimeters[tiles[n]] = perimeter
+
+            # Recompute tiles next to flats whose distances changed
+            pending = sorted({index[(row + dr, col + dc)] for row, col in changed
+                              for dr in (-1, 0, 1) for dc in (-1, 0, 1)
+                              if (dr or dc) and (row + dr, col + dc) in index})
+            iteration += 1
+
+    # Close dataset
+    out_ds = None
+
+
+###########################
+# Flow accumulation
+###########################
+
+@njit(nogil=True)
+def _downstream(directions):
+    """ Return downstream cell of each tile cell
+
+    Returns
+    -------
+    numpy.ndarray
+        flat index of downstream cell, -1 if cell does
+        not flow and LEAVES_TILE if it flows out of tile
+    """
+    ny, nx = directions.shape
+    down = np.full(ny * nx, -1, dtype=np.int64)
+
+    for i in range(ny):
+        for j in range(nx):
+            k = D8_INDEX[directions[i, j]]
+            if k < 0:
+                continue
+            ni, nj = i + D8_ROW[k], j + D8_COL[k]
+            if 0 <= ni < ny and 0 <= nj < nx:
+                down[i * nx + j] = ni * nx + nj
+            else:
+                down[i * nx + j] = LEAVES_TILE
+
+    return down
+
+
+@njit(nogil=True)
+def _topological_order(down):
+    """ Return cells from upstream to downstream (Kahn's algorithm)
+
+    Description
+    -----------
+    Cells within cycles are not returned
+
+    """
+    indegree = np.zeros(down.size, dtype=np.int64)
+    for c in range(down.size):
+        if down[c] >= 0:
+            indegree[down[c]] += 1
+
+    order = np.empty(down.size, dtype=np.int64)
+    size = 0
+    for c in range(down.size):
+        if indegree[c] == 0:
+            order[size] = c
+            size += 1
+
+    k = 0
+    while k < size:
+        d = down[order[k]]
+        k += 1
+        if d >= 0:
+            indegree[d] -= 1
+            if indegree[d] == 0:
+                order[size] = d
+                size += 1
+
+    return order[:size]
+
+
+@njit(nogil=True)
+def _accumulate(down, order, is_valid, is_perimeter, extra):
+    """ Accumulate flow within tile
+
+    Description
+    -----------
+    Extra flow (entering tile) of perimeter cells is fixed,
+    and propagated downstream to other tile cells
+
+    Returns
+    -------
+    tuple
+        local accumulation (including cell itself) and extra flow
+    """
+    accumulation = is_valid.astype(np.float64)
+
+    for c in order:
+        d = down[c]
+        if d >= 0:
+            accumulation[d] += accumulation[c]
+            if not is_perimeter[d]:
+                extra[d] += extra[c]
+
+    return accumulation, extra
+
+
+@njit(nogil=True)
+def _next_perimeter_cell(down, order, is_perimeter):
+    """ Return first perimeter cell downstream of each cell
+
+    Returns
+    -------
+    numpy.ndarray
+        flat index of perimeter cell, -1 if flow stops within
+        tile and LEAVES_TILE if cell flows out of tile
+    """
+    next_cell = np.full(down.size, -1, dtype=np.int64)
+
+    for c in order[::-1]:
+        d = down[c]
+        if d == LEAVES_TILE or (d >= 0 and is_perimeter[d]):
+            next_cell[c] = d
+        elif d >= 0:
+            next_cell[c] = next_cell[d]
+
+    return next_cell
+
+
+def _read_flow_direction_tile(src_file, window):
+    """ Read flow directions and compute tile flow graph
+
+    """
+    directions = gdal.Open(src_file).GetRasterBand(1).ReadAsArray(*window)
+    down = _downstream(directions)
+    perimeter = _perimeter_indices(window[3], window[2])
+    is_perimeter = np.zeros(down.size, dtype=bool)
+    is_perimeter[perimeter] = True
+
+    return directions, down, _topological_order(down), perimeter, is_perimeter
+
+
+def _accumulation_graph_tile(window, src_file, x_size, y_size):
+    """ First pass of flow accumulation over one tile
+
+    Returns
+    -------
+    tuple
+        perimeter cells as DEM flat indices, their local accumulation,
+        DEM flat index of their downstream perimeter cell (-1 if none)
+        and whether this cell lies in another tile
+    """
+    directions, down, order, perimeter, is_perimeter = _read_flow_direction_tile(src_file,
+                                                                                 window)
+    accumulation, _ = _accumulate(down, order, directions.ravel() != FLOW_DIRECTION_NO_DATA,
+                                  is_perimeter, np.zeros(down.size))
+    next_cell = _next_perimeter_cell(down, order, is_perimeter)[perimeter]
+
+    rows, cols = np.divmod(perimeter, window[2])
+    rows += window[1]
+    cols += window[0]
+    node_ids = rows * x_size + cols
+
+    leaves = next_cell == LEAVES_TILE
+    k = D8_INDEX[directions.ravel()[perimeter[leaves]]]
+    next_rows, next_cols = rows[leaves] + D8_ROW[k], cols[leaves] + D8_COL[k]
+    in_dem = (next_rows >= 0) & (next_rows < y_size) & (next_cols >= 0) & (next_cols < x_size)
+
+    next_ids = np.full(perimeter.size, -1, dtype=np.int64)
+    internal = next_cell >= 0
+    next_rows_internal, next_cols_internal = np.divmod(next_cell[internal], window[2])
+    next_ids[internal] = (next_rows_internal + window[1]) * x_size + \
+        next_cols_internal + window[0]
+    next_ids[leaves] = np.where(in_dem, next_rows * x_size + next_cols, -1)
+
+    return node_ids, accumulation[perimeter], next_ids, leaves
+
+
+@njit(nogil=True)
+def _propagate_extra_flow(next_node, leaves, accumulation):
+    """ Propagate flow entering each tile over perimeter cell graph
+
+    """
+    extra = np.zeros(next_node.size)
+
+    for u in _topological_order(next_node):
+        v = next_node[u]
+        if v >= 0:
+            if leaves[u]:
+                extra[v] += accumulation[u] + extra[u]
+            else:
+                extra[v] += extra[u]
+
+    return extra
+
+
+def _accumulation_tile(task, src_file, no_data):
+    """ Second pass of flow accumulation over one tile
+
+    """
+    window, perimeter_extra = task
+    directions, down, order, perimeter, is_perimeter = _read_flow_direction_tile(src_file,
+                                                                                 window)
+    is_valid = directions.ravel() != FLOW_DIRECTION_NO_DATA
+    extra = np.zeros(down.size)
+    extra[perimeter] = perimeter_extra
+    accumulation, extra = _accumulate(down, order, is_valid, is_perimeter, extra)
+
+    # Upstream cells only (cell itself excluded)
+    accumulation += extra - 1
+    accumulation[~is_valid] = no_data
+
+    return window, accumulation.reshape(window[3], window[2])
+
+
+@_return_raster
+def _flow_accumulation(flow_direction, out_file, no_data, window_size, nb_processes):
+    """ Compute D8 flow accumulation
+
+    Description
+    -----------
+    Flow is accumulated within each tile, flow crossing tiles is
+    propagated over the graph of tile perimeter cells and added
+    to local accumulation in a second pass
+
+    Parameters
+    ----------
+    flow_direction: RasterBase
+        D8 flow directions (ESRI codes)
+    out_file: str
+        output file path to which new raster must be written
+    no_data: int or float
+        output no data value
+    window_size: int or (int, int)
+        size of tiles
+    nb_processes: int
+        number of processes for multiprocessing pool
+
+    """
+    if not hasattr(window_size, "__getitem__"):
+        window_size = (window_size, window_size)
+
+    windows = list(get_xy_block_windows(window_size, flow_direction.x_size,
+                                        flow_direction.y_size))
+    node_ids, accumulation, next_ids, leaves = [], [], [], []
+
+    with mp.Pool(processes=nb_processes) as pool:
+        for nodes in tqdm(pool.imap(partial(_accumulation_graph_tile,
+                                            src_file=flow_direction._file,
+                                            x_size=flow_direction.x_size,
+                                            y_size=flow_direction.y_size),
+                                    windows),
+                          total=len(windows),
+                          desc="Compute flow accumulation (1/2)"):
+            node_ids.append(nodes[0])
+            accumulation.append(nodes[1])
+            next_ids.append(nodes[2])
+            leaves.append(nodes[3])
+
+        sections = np.cumsum([ids.size for ids in node_ids])[:-1]
+        node_ids, next_ids = np.concatenate(node_ids), np.concatenate(next_ids)
+
+        sorter = np.argsort(node_ids)
+        position = np.clip(np.searchsorted(node_ids, next_ids, sorter=sorter),
+                           0, node_ids.size - 1)
+        next_node = np.where((next_ids >= 0) & (node_ids[sorter[position]] == next_ids),
+                             sorter[position], -1)
+        extra = np.split(_propagate_extra_flow(next_node,
+                                               np.concatenate(leaves),
+                                               np.concatenate(accumulation)),
+                         sections)
+
+        out_ds = _gdal_temp_dataset(out_file,
+                                    flow_direction._gdal_driver,
+                                    flow_direction._gdal_dataset.GetProjection(),
+                                    flow_direction.x_size,
+                                    flow_direction.y_size,
+                                    1,
+                                    flow_direction.geo_transform,
+                                    gdal.GetDataTypeByName("Float64"),
+                                    no_data)
+
+        for window, array in tqdm(pool.imap(partial(_accumulation_tile,
+                                                    src_file=flow_direction._file,
+                                                    no_data=no_data),
+                                            zip(windows, extra)),
+                                  total=len(windows),
+                                  desc="Compute flow accumulation (2/2)"):
+            out_ds.GetRasterBand(1).WriteArray(array, window[0], window[1])
+
+    # Close dataset
+    out_ds = None
@@ -0,0 +1,451 @@
+# -*- coding: utf-8 -*-
+
+""" Connected region labeling functions
+
+More detailed description.
+"""
+import multiprocessing as mp
+from functools import partial
+
+import numpy as np
+from numba import njit
+from tqdm import tqdm
+
+from pyrasta.tools import _return_raster, _gdal_temp_dataset
+from pyrasta.tools.windows import get_halo_windows
+
+try:
+    from osgeo import gdal
+except ImportError:
+    import gdal
+
+
+NEIGHBORS_4 = np.array([[0, 1], [1, 0], [0, -1], [-1, 0]])
+NEIGHBORS_8 = np.array([[0, 1], [1, 1], [1, 0], [1, -1], [0, -1], [-1, -1], [-1, 0], [-1, 1]])
+
+
+@njit(nogil=True)
+def _label_regions(array, is_valid, neighbors):
+    """ Label connected regions of equal value
+
+    Parameters
+    ----------
+    array: numpy.ndarray
+        2D array
+    is_valid: numpy.ndarray
+        2D boolean array of pixels to be labeled
+    neighbors: numpy.ndarray
+        neighbor offsets (NEIGHBORS_4 or NEIGHBORS_8)
+
+    Returns
+    -------
+    tuple
+        labels (from 0, -1 for invalid pixels) and number of regions
+    """
+    ny, nx = array.shape
+    labels = np.full((ny, nx), -1, dtype=np.int64)
+    stack = np.empty(ny * nx, dtype=np.int64)
+    nb_labels = 0
+
+    for i in range(ny):
+        for j in range(nx):
+            if labels[i, j] >= 0 or not is_valid[i, j]:
+                continue
+            labels[i, j] = nb_labels
+            stack[0] = i * nx + j
+            size = 1
+            while size > 0:
+                size -= 1
+                ci, cj = stack[size] // nx, stack[size] % nx
+                for k in range(neighbors.shape[0]):
+                    ni, nj = ci + neighbors[k, 0], cj + neighbors[k, 1]
+                    if 0 <= ni < ny and 0 <= nj < nx and labels[ni, nj] < 0 \
+                            and is_valid[ni, nj] and array[ni, nj] == array[ci, cj]:
+                        labels[ni, nj] = nb_labels
+                        stack[size] = ni * nx + nj
+                        size += 1
+            nb_labels += 1
+
+    return labels, nb_labels
+
+
+@njit(nogil=True)
+def _find(parent, node):
+    """ Find root of node (with path halving)
+
+    """
+    while parent[node] != node:
+        parent[node] = parent[parent[node]]
+        node = parent[node]
+
+    return node
+
+
+@njit(nogil=True)
+def _union_find(nb_nodes, first, second):
+    """ Merge pairs of nodes into connected sets
+
+    Parameters
+    ----------
+    nb_nodes: int
+    first: numpy.ndarray
+        first node of each pair
+    second: numpy.ndarray
+        second node of each pair
+
+    Returns
+    -------
+    numpy.ndarray
+        root node of each node
+    """
+    parent = np.arange(nb_nodes)
+    for n in range(first.size):
+        root_1, root_2 = _find(parent, first[n]), _find(parent, second[n])
+        if root_1 < root_2:
+            parent[root_2] = root_1
+        elif root_2 < root_1:
+            parent[root_1] = root_2
+
+    for node in range(nb_nodes):
+        parent[node] = _find(parent, node)
+
+    return parent
+
+
+def _tile_seams(window_size, x_size, y_size):
+    """ Return empty vertical and horizontal tile seams
+
+    Description
+    -----------
+    Each seam is stored as [region keys before seam, region keys
+    after seam, values before seam, values after seam], over the
+    whole raster height (vertical) or width (horizontal)
+
+    """
+    x_seams = {x: [np.full(y_size, -1, dtype="int64") for _ in range(2)] +
+               [np.zeros(y_size) for _ in range(2)]
+               for x in range(window_size[0], x_size, window_size[0])}
+    y_seams = {y: [np.full(x_size, -1, dtype="int64") for _ in range(2)] +
+               [np.zeros(x_size) for _ in range(2)]
+               for y in range(window_size[1], y_size, window_size[1])}
+
+    return x_seams, y_seams
+
+
+def _set_seams(x_seams, y_seams, window, edges, offset):
+    """ Store tile edges into seams
+
+    Parameters
+    ----------
+    x_seams: dict
+    y_seams: dict
+    window: tuple
+        tile window
+    edges: dict
+        (labels, values) of tile edges ("top", "bottom", "left" and "right")
+    offset: int
+        offset of tile labels (key = label + offset)
+
+    """
+    keys = {side: np.where(edge >= 0, edge + offset, -1) for side, (edge, _) in edges.items()}
+    x_min, y_min = window[0], window[1]
+    x_max, y_max = window[0] + window[2], window[1] + window[3]
+
+    if x_min in x_seams:
+        x_seams[x_min][1][y_min:y_max] = keys["left"]
+        x_seams[x_min][3][y_min:y_max] = edges["left"][1]
+    if x_max in x_seams:
+        x_seams[x_max][0][y_min:y_max] = keys["right"]
+        x_seams[x_max][2][y_min:y_max] = edges["right"][1]
+    if y_min in y_seams:
+        y_seams[y_min][1][x_min:x_max] = keys["top"]
+        y_seams[y_min][3][x_min:x_max] = edges["top"][1]
+    if y_max in y_seams:
+        y_seams[y_max][0][x_min:x_max] = keys["bottom"]
+        y_seams[y_max][2][x_min:x_max] = edges["bottom"][1]
+
+
+def _seam_pairs(first_keys, first_values, second_keys, second_values, is_8_connected):
+    """ Return pairs of region keys to be merged across a seam
+
+    """
+    shifts = [(0, 0)]
+    if is_8_connected:
+        shifts += [(1, 0), (0, 1)]
+
+    first, second = [], []
+    for shift_1, shift_2 in shifts:
+        length = first_keys.size - max(shift_1, shift_2)
+        keys_1 = first_keys[shift_1:shift_1 + length]
+        keys_2 = second_keys[shift_2:shift_2 + length]
+        is_merged = (keys_1 >= 0) & (keys_2 >= 0) & \
+            (first_values[shift_1:shift_1 + length] ==
+             second_values[shift_2:shift_2 + length])
+        first.append(keys_1[is_merged])
+        second.append(keys_2[is_merged])
+
+    return np.concatenate(first), np.concatenate(second)
+
+
+def _connect_seams(x_seams, y_seams, is_8_connected):
+    """ Connect regions of adjacent tiles through seams
+
+    Returns
+    -------
+    tuple
+        keys of regions along seams (sorted) and
+        key of the region each one belongs to
+    """
+    seams = list(x_seams.values()) + list(y_seams.values())
+    if not seams:
+        return np.empty(0, dtype="int64"), np.empty(0, dtype="int64")
+
+    keys = np.unique(np.concatenate([seam[0] for seam in seams] + [seam[1] for seam in seams]))
+    keys = keys[keys >= 0]
+
+    pairs = [_seam_pairs(keys_1, values_1, keys_2, values_2, is_8_connected)
+             for keys_1, keys_2, values_1, values_2 in seams]
+    roots = _union_find(keys.size,
+                        np.searchsorted(keys, np.concatenate([pair[0] for pair in pairs])),
+                        np.searchsorted(keys, np.concatenate([pair[1] for pair in pairs])))
+
+    return keys, keys[roots]
+
+
+def _read_tile(src_file, band, window, read_window):
+    """ Read tile values and valid pixels, padded with 1 pixel
+
+    Description
+    -----------
+    Padding pixels outside raster are not valid
+
+    """
+    src_band = gdal.Open(src_file).GetRasterBand(band)
+    array = src_band.ReadAsArray(*read_window)
+    is_valid = src_band.GetMaskBand().ReadAsArray(*read_window) > 0
+
+    pad = ((1 - window[1] + read_window[1],
+            1 - read_window[1] - read_window[3] + window[1] + window[3]),
+           (1 - window[0] + read_window[0],
+            1 - read_window[0] - read_window[2] + window[0] + window[2]))
+
+    return np.pad(array, pad), np.pad(is_valid, pad)
+
+
+def _label_tile(windows, src_file, band, neighbors, values_file, values_no_data):
+    """ Label tile regions and compute their statistics
+
+    Returns
+    -------
+    tuple
+        (window, number of labels, statistics of each label
+        as dict, labels and values of tile edges as dict)
+    """
+    window, read_window = windows
+    array, is_valid = _read_tile(src_file, band, window, read_window)
+    center, is_center_valid = array[1:-1, 1:-1], is_valid[1:-1, 1:-1]
+    labels, nb_labels = _label_regions(center, is_center_valid, neighbors)
+
+    def is_boundary(rows, cols):
+        return ~is_valid[rows, cols] | (array[rows, cols] != center)
+
+    inner = slice(1, -1)
+    x_edges = is_boundary(inner, slice(0, -2)).astype("int64") + is_boundary(inner, slice(2, None))
+    y_edges = is_boundary(slice(0, -2), inner).astype("int64") + is_boundary(slice(2, None), inner)
+
+    if values_file is None:
+        values = center
+        is_value = is_center_valid
+    else:
+        values = gdal.Open(values_file).GetRasterBand(1).ReadAsArray(*window)
+        is_value = is_center_valid & (values != values_no_data) & ~np.isnan(values)
+
+    valid_labels = labels[is_center_valid]
+    statistics = dict(value=np.zeros(nb_labels + 1, dtype=array.dtype),
+                      count=np.bincount(valid_labels, minlength=nb_labels),
+                      x_edges=np.bincount(valid_labels, x_edges[is_center_valid],
+                                          minlength=nb_labels),
+                      y_edges=np.bincount(valid_labels, y_edges[is_center_valid],
+                                          minlength=nb_labels),
+                      sum=np.bincount(labels[is_value], values[is_value].astype("float64"),
+                                      minlength=nb_labels),
+                      value_count=np.bincount(labels[is_value], minlength=nb_labels))
+    statistics["value"][valid_labels] = center[is_center_valid]
+
+    edges = dict(top=labels[0, :], bottom=labels[-1, :], left=labels[:, 0],
+                 right=labels[:, -1])
+    edges = {side: (edge, statistics["value"][edge]) for side, edge in edges.items()}
+    statistics["value"] = statistics["value"][:-1]
+
+    return window, nb_labels, statistics, edges
+
+
+def _relabel_tile(tile, src_file, band, neighbors):
+    """ Write final labels of tile regions
+
+    Parameters
+    ----------
+    tile: tuple
+        (window, offset of tile labels, first final label of tile,
+        tile labels of regions merged with other tiles, final
+        label of those regions, tile labels of regions merged
+        into a region of a previous label)
+
+    Returns
+    -------
+    tuple
+        (window, labels as numpy.ndarray), labels
+        starting from 1 (0 for no data)
+    """
+    window, start, border_labels, border_final_labels, merged_labels = tile
+    array, is_valid = _read_tile(src_file, band, window, window)
+    labels, nb_labels = _label_regions(array[1:-1, 1:-1], is_valid[1:-1, 1:-1], neighbors)
+
+    look_up = np.arange(nb_labels + 1, dtype="int64")
+    look_up = start + look_up - np.searchsorted(merged_labels, look_up)
+    look_up[border_labels] = border_final_labels
+    look_up[-1] = 0
+
+    return window, look_up[labels].astype("uint32")
+
+
+def _region_statistics(raster, band, connectivity, values, window_size, nb_processes):
+    """ Compute statistics of connected regions of raster
+
+    Description
+    -----------
+    Regions are labeled tile by tile in parallel (with a numba
+    flood fill), while their statistics are accumulated. Regions
+    crossing tile seams are then connected with a union-find
+
+    Parameters
+    ----------
+    raster: RasterBase
+    band: int
+    connectivity: int
+        4 or 8
+    values: RasterBase or None
+        raster (of same size) from which mean of each region
+        is computed. If None, raster itself
+    window_size: int or (int, int)
+    nb_processes: int
+
+    Returns
+    -------
+    tuple
+        region statistics as dict and tiles to be
+        labeled with final labels (see _relabel_tile)
+    """
+    if connectivity not in (4, 8):
+        raise ValueError("connectivity must be 4 or 8")
+
+    if values is not None and (values.x_size, values.y_size) != (raster.x_size,
+                                                                  raster.y_size):
+        raise ValueError("values raster must have the same size as raster")
+
+    if not hasattr(window_size, "__getitem__"):
+        window_size = (window_size, window_size)
+
+    x_seams, y_seams = _tile_seams(window_size, raster.x_size, raster.y_size)
+
+    nb_tiles = len(range(0, raster.x_size, window_size[0])) * \
+        len(range(0, raster.y_size, window_size[1]))
+    tiles = []
+    tile_statistics = []
+    offset = 0
+
+    with mp.Pool(processes=nb_processes) as pool:
+        for window, nb_labels, stats, edges in tqdm(pool.imap(partial(
+                _label_tile,
+                src_file=raster._file,
+                band=band,
+                neighbors=NEIGHBORS_8 if connectivity == 8 else NEIGHBORS_4,
+                values_file=None if values is None else values._file,
+                values_no_data=None if values is None else values.no_data_values[0]),
+                get_halo_windows(window_size, 1, raster.x_size, raster.y_size)),
+                total=nb_tiles, desc="Label regions"):
+            _set_seams(x_seams, y_seams, window, edges, offset)
+            tiles.append((window, offset, nb_labels))
+            tile_statistics.append(stats)
+            offset += nb_labels
+
+    # Regions crossing seams are merged into the region of their smallest key
+    keys, roots = _connect_seams(x_seams, y_seams, connectivity == 8)
+    merged = keys[keys != roots]
+    final_roots = roots + 1 - np.searchsorted(merged, roots)
+
+    stats = {name: np.concatenate([tile_stats[name] for tile_stats in tile_statistics])
+             for name in tile_statistics[0].keys()}
+    is_root = np.ones(offset, dtype=bool)
+    is_root[merged] = False
+    for name in ("count", "x_edges", "y_edges", "sum", "value_count"):
+        np.add.at(stats[name], roots[keys != roots], stats[name][merged])
+        stats[name] = stats[name][is_root]
+
+    geo_transform = raster.geo_transform
+    with np.errstate(divide="ignore", invalid="ignore"):
+        statistics = dict(label=np.arange(1, is_root.sum() + 1),
+                          value=stats["value"][is_root],
+                          count=stats["count"],
+                          area=stats["count"] * abs(geo_transform[1] * geo_transform[5] -
+                                                    geo_transform[2] * geo_transform[4]),
+                          perimeter=stats["x_edges"] * abs(geo_transform[5]) +
+                          stats["y_edges"] * abs(geo_transform[1]),
+                          mean=stats["sum"] / stats["value_count"])
+
+    final_tiles = []
+    for window, tile_offset, nb_labels in tiles:
+        first, last = np.searchsorted(keys, [tile_offset, tile_offset + nb_labels])
+        final_tiles.append((window,
+                            tile_offset + 1 - np.searchsorted(merged, tile_offset),
+                            keys[first:last] - tile_offset,
+                            final_roots[first:last],
+                            merged[(merged >= tile_offset) &
+                                   (merged < tile_offset + nb_labels)] - tile_offset))
+
+    return statistics, final_tiles
+
+
+@_return_raster
+def _label(raster, out_file, band, connectivity, tiles, nb_processes):
+    """ Write labels of connected regions of raster
+
+    Description
+    -----------
+    Tiles are labeled again in parallel and tile
+    labels are replaced by final region labels
+
+    Parameters
+    ----------
+    raster: RasterBase
+    out_file: str
+    band: int
+    connectivity: int
+        4 or 8
+    tiles: list
+        tiles with their final labels (see _region_statistics)
+    nb_processes: int
+
+    """
+    out_ds = _gdal_temp_dataset(out_file,
+                                raster._gdal_driver,
+                                raster._gdal_dataset.GetProjection(),
+                                raster.x_size,
+                                raster.y_size,
+                                1,
+                                raster.geo_transform,
+                                gdal.GetDataTypeByName("UInt32"),
+                                0)
+
+    with mp.Pool(processes=nb_processes) as pool:
+        for window, labels in tqdm(pool.imap(partial(_relabel_tile,
+                                                     src_file=raster._file,
+                                                     band=band,
+                                                     neighbors=NEIGHBORS_8 if connectivity == 8
+                                                     else NEIGHBORS_4),
+                                             tiles),
+                                   total=len(tiles), desc="Write labels"):
+            out_ds.GetRasterBand(1).WriteArray(labels, window[0], window[1])
+
+    # Close dataset
+    out_ds = None
@@ -33,3 +33,12 @@ GDAL_TO_OGR = {1: 0,
                5: 0,
                6: 2,
                7: 2}
+
+RESAMPLING_TO_GRIORA = {"nearest": 0,
+                        "bilinear": 1,
+                        "cubic": 2,
+                        "cubicspline": 3,
+                        "lanczos": 4,
+                        "average": 5,
+                        "mode": 6,
+                        "gauss": 7}
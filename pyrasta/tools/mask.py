@@ -4,36 +4,202 @@
 
 More detailed description.
 """
+import multiprocessing as mp
 from functools import partial
 
+import numpy as np
+from tqdm import tqdm
 
-def _mask(arrays, no_data):
-    src = arrays[0]
-    mask = arrays[1]
-    src[mask == 1] = no_data
+from pyrasta.io_.layers import projection_of
+from pyrasta.tools import _return_raster, _gdal_temp_dataset, _window_geo_transform
+from pyrasta.tools.mapping import GDAL_TO_NUMPY
+from pyrasta.tools.rasterize import _block_geometries, _rasterize_block
 
-    return src
+try:
+    from osgeo import gdal
+except ImportError:
+    import gdal
+
+
+def _numpy_type(data_type):
+    """ Return numpy type corresponding to GDAL data type
+
+    """
+    if data_type == gdal.GetDataTypeByName("Byte"):
+        return np.dtype("uint8")
+    else:
+        return np.dtype(GDAL_TO_NUMPY[data_type])
+
+
+def _check_no_data(no_data, data_type):
+    """ Check that no data value can be stored with GDAL data type
+
+    """
+    dtype = _numpy_type(data_type)
+    if np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        if np.isnan(no_data) or not info.min <= no_data <= info.max or \
+                no_data != int(no_data):
+            raise ValueError("No data value %s cannot be stored as %s" %
+                             (no_data, gdal.GetDataTypeName(data_type)))
+
+
+def _mask_block(block, src_file, x_offset, y_offset, layer_projection, projection,
+                geo_transform, inside, data_type, no_data, all_touched):
+    """ Read source block and mask it with geometries
+
+    Parameters
+    ----------
+    block: tuple
+        (window, geometries as WKB, None)
+    src_file: str
+        path to source raster
+    x_offset: int
+        x offset of the output grid within source raster
+    y_offset: int
+        y offset of the output grid within source raster
+    inside: bool
+        if True, pixels inside geometries are set to no data,
+        otherwise pixels outside geometries are
+
+    Returns
+    -------
+    tuple
+        (window, numpy.ndarray)
+    """
+    window = block[0]
+    src_ds = gdal.Open(src_file)
+    array = src_ds.ReadAsArray(window[0] + x_offset,
+                               window[1] + y_offset,
+                               window[2],
+                               window[3]).astype(_numpy_type(data_type))
+
+    _, mask = _rasterize_block(block,
+                               layer_projection,
+                               projection,
+                               geo_transform,
+                               1,
+                               [1],
+                               None,
+                               gdal.GetDataTypeByName("Byte"),
+                               0,
+                               all_touched)
+
+    if inside:
+        array[..., mask == 1] = no_data
+    else:
+        array[..., mask != 1] = no_data
+
+    return window, array
+
+
+@_return_raster
+def _mask_by_layer(raster_class, out_file, gdal_driver, raster, geodataframe,
+                   window, inside, data_type, no_data, all_touched, window_size,
+                   nb_processes, description):
+    """ Mask raster with geographic layer in one streaming pass
+
+    Description
+    -----------
+    Geometries are rasterized (as uint8) block by block and applied
+    to the corresponding source block within the same worker, so that
+    no full-size mask raster is ever written.
+
+    Parameters
+    ----------
+    raster_class: RasterBase
+        Raster class to return
+    out_file: str
+        Output file to which raster is written
+    gdal_driver: gdal.Driver
+        GDAL driver
+    raster: RasterBase
+        Source raster
+    geodataframe: geopandas.GeoDataFrame or gistools.layer.GeoLayer
+        Mask layer
+    window: tuple
+        output grid within source raster as (x offset, y offset, x size, y size)
+    inside: bool
+        if True, pixels inside geometries are set to no data,
+        otherwise pixels outside geometries are
+    data_type: int
+        GDAL output data type
+    no_data: int or float
+        No data value
+    all_touched: bool
+    window_size: int or (int, int)
+        Size of blocks
+    nb_processes: int
+        number of processes for multiprocessing pool
+    description: str
+        Progress bar description. If None, no progress bar is displayed
+
+    """
+    if not hasattr(window_size, "__getitem__"):
+        window_size = (window_size, window_size)
+
+    geo_transform = _window_geo_transform(raster.geo_transform, window)
+    out_ds = _gdal_temp_dataset(out_file,
+                                gdal_driver,
+                                raster._gdal_dataset.GetProjection(),
+                                window[2],
+                                window[3],
+                                raster.nb_band,
+                                geo_transform,
+                                data_type,
+                                no_data)
+
+    blocks = _block_geometries(geodataframe, None, geo_transform,
+                               window_size, window[2], window[3],
+                               raster._gdal_dataset.GetProjection())
+    nb_blocks = len(range(0, window[2], window_size[0])) * \
+        len(range(0, window[3], window_size[1]))
+
+    with mp.Pool(processes=nb_processes) as pool:
+        iterator = pool.imap(partial(_mask_block,
+                                     src_file=raster._file,
+                                     x_offset=window[0],
+                                     y_offset=window[1],
+                                     layer_projection=projection_of(geodataframe),
+                                     projection=raster._gdal_dataset.GetProjection(),
+                                     geo_transform=geo_transform,
+                                     inside=inside,
+                                     data_type=data_type,
+                                     no_data=no_data,
+                                     all_touched=all_touched),
+                             blocks)
+        if description:
+            iterator = tqdm(iterator, total=nb_blocks, desc=description)
+
+        for block_window, array in iterator:
+            if raster.nb_band == 1:
+                out_ds.GetRasterBand(1).WriteArray(array, block_window[0], block_window[1])
+            else:
+                for band in range(raster.nb_band):
+                    out_ds.GetRasterBand(band + 1).WriteArray(array[band, :, :],
+                                                              block_window[0],
+                                                              block_window[1])
+
+    # Close dataset
+    out_ds = None
 
 
 def _raster_mask(raster, geodataframe, driver, output_type, no_data, all_touched,
-                 window_size):
+                 window_size, nb_processes):
     """ Apply mask into raster
 
     """
-    mask = raster.__class__.rasterize(geodataframe,
-                                      raster.crs.to_wkt(),
-                                      raster.x_size,
-                                      raster.y_size,
-                                      raster.geo_transform,
-                                      burn_values=[1],
-                                      all_touched=all_touched)
-
-    return raster.__class__.raster_calculation([raster, mask],
-                                               partial(_mask, no_data=no_data),
-                                               gdal_driver=driver,
-                                               output_type=output_type,
-                                               no_data=no_data,
-                                               description="Compute mask",
-                                               window_size=window_size,
-                                               nb_processes=1,
-                                               chunksize=1)
+    _check_no_data(no_data, output_type)
+
+    return _mask_by_layer(raster.__class__,
+                          driver,
+                          raster,
+                          geodataframe,
+                          (0, 0, raster.x_size, raster.y_size),
+                          True,
+                          output_type,
+                          no_data,
+                          all_touched,
+                          window_size,
+                          nb_processes,
+                          "Compute mask")
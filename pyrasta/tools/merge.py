@@ -4,7 +4,15 @@
 
 More detailed description.
 """
-from pyrasta.tools import _return_raster
+import multiprocessing as mp
+from functools import partial
+
+import numpy as np
+from tqdm import tqdm
+
+from pyrasta.crs import is_equal_proj
+from pyrasta.tools import _return_raster, _warp_options, _gdal_temp_dataset
+from pyrasta.tools.calculator import get_xy_block_windows
 
 try:
     from osgeo import gdal
@@ -12,10 +20,13 @@ except ImportError:
     import gdal
 
 
+GDAL_VRT_DRIVER = gdal.GetDriverByName("VRT")
+
+
 @_return_raster
 def _merge(raster_class, out_file, gdal_driver,
            sources, bounds, data_type, input_no_data,
-           output_no_data, resampling_mode):
+           output_no_data, resampling_mode, nb_threads, warp_memory):
     """ Merge multiple raster sources
 
     """
@@ -35,4 +46,92 @@ def _merge(raster_class, out_file, gdal_driver,
               srcNodata=input_no_data,
               dstNodata=output_no_data,
               outputType=data_type,
-              resampleAlg=resampling_mode)
+              resampleAlg=resampling_mode,
+              **_warp_options(nb_threads, warp_memory))
+
+
+@_return_raster
+def _merge_vrt(raster_class, out_file, gdal_driver, sources, bounds,
+               input_no_data, output_no_data, resampling_mode):
+    """ Merge multiple raster sources as a VRT mosaic
+
+    Description
+    -----------
+    No pixel is processed: the returned raster is a virtual
+    mosaic of all sources, which must share the same CRS
+
+    """
+    if not all(is_equal_proj(src.crs, sources[0].crs) for src in sources[1:]):
+        raise ValueError("Lazy merge requires all rasters to share the same CRS")
+
+    # Only one source no data value may be set
+    # in VRT, otherwise keep each source's one
+    input_no_data = np.unique(input_no_data)
+    if input_no_data.size == 1 and not np.isnan(input_no_data[0]):
+        src_no_data = input_no_data[0]
+    else:
+        src_no_data = None
+
+    vrt_ds = gdal.BuildVRT(out_file, [src._gdal_dataset for src in sources],
+                           outputBounds=bounds,
+                           srcNodata=src_no_data,
+                           VRTNodata=output_no_data,
+                           resampleAlg=resampling_mode)
+
+    # Close dataset
+    vrt_ds = None
+
+
+def _read_tile(window, src_file):
+    """ Read raster window (all bands)
+
+    """
+    return window, gdal.Open(src_file).ReadAsArray(*window)
+
+
+@_return_raster
+def _materialize(raster_class, out_file, gdal_driver, raster, data_type,
+                 window_size, nb_processes):
+    """ Write raster (e.g. virtual mosaic) to new dataset tile by tile
+
+    Description
+    -----------
+    Tiles are read (and thus computed, for virtual rasters)
+    concurrently in worker processes and written by the main process
+
+    """
+    if not hasattr(window_size, "__getitem__"):
+        window_size = (window_size, window_size)
+
+    if data_type is None:
+        data_type = raster.data_type
+
+    out_ds = _gdal_temp_dataset(out_file,
+                                gdal_driver,
+                                raster._gdal_dataset.GetProjection(),
+                                raster.x_size,
+                                raster.y_size,
+                                raster.nb_band,
+                                raster.geo_transform,
+                                data_type,
+                                raster.no_data_values)
+
+    nb_tiles = len(range(0, raster.x_size, window_size[0])) * \
+        len(range(0, raster.y_size, window_size[1]))
+
+    with mp.Pool(processes=nb_processes) as pool:
+        for window, array in tqdm(pool.imap(partial(_read_tile, src_file=raster._file),
+                                            get_xy_block_windows(window_size,
+                                                                 raster.x_size,
+                                                                 raster.y_size)),
+                                  total=nb_tiles,
+                                  desc="Materialize raster"):
+            if raster.nb_band == 1:
+                out_ds.GetRasterBand(1).WriteArray(array, window[0], window[1])
+            else:
+                for band in range(raster.nb_band):
+                    out_ds.GetRasterBand(band + 1).WriteArray(array[band, :, :],
+                                                              window[0], window[1])
+
+    # Close dataset
+    out_ds = None
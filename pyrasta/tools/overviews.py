@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+""" Overview (pyramid) functions
+
+More detailed description.
+"""
+from pyrasta.utils import gdal_progress_bar
+
+try:
+    from osgeo import gdal
+except ImportError:
+    import gdal
+
+
+OVERVIEW_MIN_SIZE = 256
+OVERVIEW_RESAMPLING = ("nearest", "average", "gauss", "cubic", "cubicspline",
+                       "lanczos", "average_magphase", "mode", "rms", "bilinear")
+
+
+def _overview_levels(raster, min_size=OVERVIEW_MIN_SIZE):
+    """ Return overview decimation factors
+
+    Description
+    -----------
+    Powers of 2 until the smallest raster
+    dimension falls below min_size
+
+    """
+    levels = []
+    factor = 2
+    while min(raster.x_size, raster.y_size) // factor >= min_size:
+        levels.append(factor)
+        factor *= 2
+
+    return levels
+
+
+def _has_overviews(raster):
+    """ Return True if raster has overviews
+
+    """
+    return raster._gdal_dataset.GetRasterBand(1).GetOverviewCount() > 0
+
+
+def _build_overviews(raster, levels, resampling, nb_threads, progress_bar):
+    """ Build raster overviews
+
+    Parameters
+    ----------
+    raster: RasterBase
+    levels: list[int] or None
+        overview decimation factors. If None, powers
+        of 2 down to OVERVIEW_MIN_SIZE pixels
+    resampling: str
+        resampling algorithm (see OVERVIEW_RESAMPLING)
+    nb_threads: int
+        number of threads used by GDAL to compute overviews
+    progress_bar: bool
+
+    Returns
+    -------
+
+    """
+    if resampling.lower() not in OVERVIEW_RESAMPLING:
+        raise ValueError("resampling must be one of those: {}".format(OVERVIEW_RESAMPLING))
+
+    if levels is None:
+        levels = _overview_levels(raster)
+
+    if not levels:
+        return
+
+    callback, callback_data = gdal_progress_bar(progress_bar,
+                                                description="Build overviews")
+
+    num_threads = gdal.GetConfigOption("GDAL_NUM_THREADS")
+    gdal.SetConfigOption("GDAL_NUM_THREADS", str(nb_threads))
+    try:
+        raster._gdal_dataset.BuildOverviews(resampling.upper(),
+                                            list(levels),
+                                            callback=callback,
+                                            callback_data=callback_data)
+    finally:
+        gdal.SetConfigOption("GDAL_NUM_THREADS", num_threads)
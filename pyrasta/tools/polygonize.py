@@ -4,7 +4,20 @@
 
 More detailed description.
 """
+import multiprocessing as mp
+from functools import partial
+
+import numpy as np
+from shapely import wkb
+from shapely.affinity import affine_transform
+from shapely.ops import unary_union
+from tqdm import tqdm
+
+from pyrasta import GDAL_MEM_DRIVER
 from pyrasta.crs import srs_from
+from pyrasta.io_.layers import _memory_driver
+from pyrasta.tools.labeling import _label_regions, _tile_seams, _set_seams, _connect_seams, \
+    NEIGHBORS_4, NEIGHBORS_8
 from pyrasta.utils import gdal_progress_bar
 
 try:
@@ -14,49 +27,290 @@ except ImportError:
     import ogr
 
 
+def _affine(geo_transform):
+    """ Return shapely affine matrix from pixel to map coordinates
+
+    """
+    return [geo_transform[1], geo_transform[2], geo_transform[4],
+            geo_transform[5], geo_transform[0], geo_transform[3]]
+
+
+def _layer_polygons(layer):
+    """ Return polygons of OGR layer as (WKB, value) pairs
+
+    """
+    return [(bytes(feature.GetGeometryRef().ExportToWkb()), feature.GetField(0))
+            for feature in layer]
+
+
+def _polygonize_tile(window, src_file, band, is_8_connected, geo_transform, x_size, y_size):
+    """ Polygonize raster tile
+
+    Description
+    -----------
+    Regions of the tile are labeled and the label array is
+    polygonized in pixel coordinates, so that polygons of
+    adjacent tiles share the exact same border vertices
+
+    Returns
+    -------
+    tuple
+        (window, number of labels, polygons not touching inner tile borders as
+        (WKB in map coordinates, value), polygons touching
+        inner tile borders as (label, value, WKB in pixel coordinates),
+        labels and values of tile edges as dict)
+    """
+    src_band = gdal.Open(src_file).GetRasterBand(band)
+    # Read as Int32 like gdal.Polygonize with an integer field, so
+    # that regions are grouped by the same (rounded) pixel values
+    array = src_band.ReadAsArray(*window, buf_type=gdal.GDT_Int32)
+    is_valid = src_band.GetMaskBand().ReadAsArray(*window) > 0
+
+    labels, nb_labels = _label_regions(array, is_valid,
+                                       NEIGHBORS_8 if is_8_connected else NEIGHBORS_4)
+    values = np.zeros(nb_labels + 1, dtype=array.dtype)
+    values[labels[is_valid]] = array[is_valid]
+
+    label_ds = GDAL_MEM_DRIVER.Create("", window[2], window[3], 1, gdal.GDT_Int32)
+    label_ds.SetGeoTransform((window[0], 1, 0, window[1], 0, 1))
+    label_ds.GetRasterBand(1).WriteArray(labels.astype("int32"))
+    mask_ds = GDAL_MEM_DRIVER.Create("", window[2], window[3], 1, gdal.GDT_Byte)
+    mask_ds.GetRasterBand(1).WriteArray(is_valid.astype("uint8"))
+
+    layer_ds = _memory_driver().Create("", 0, 0, 0, gdal.GDT_Unknown)
+    layer = layer_ds.CreateLayer("layer", geom_type=ogr.wkbPolygon)
+    layer.CreateField(ogr.FieldDefn("label", ogr.OFTInteger))
+    gdal.Polygonize(label_ds.GetRasterBand(1),
+                    mask_ds.GetRasterBand(1),
+                    layer,
+                    0,
+                    ["8CONNECTED=8"] if is_8_connected else [])
+
+    edges = dict(top=labels[0, :], bottom=labels[-1, :], left=labels[:, 0],
+                 right=labels[:, -1])
+    is_on_border = np.zeros(nb_labels + 1, dtype=bool)
+    for side, is_inner in (("top", window[1] > 0),
+                           ("bottom", window[1] + window[3] < y_size),
+                           ("left", window[0] > 0),
+                           ("right", window[0] + window[2] < x_size)):
+        if is_inner:
+            is_on_border[edges[side]] = True
+
+    matrix = _affine(geo_transform)
+    polygons, border_polygons = [], []
+    for geometry, label in _layer_polygons(layer):
+        if is_on_border[label]:
+            border_polygons.append((label, values[label], geometry))
+        else:
+            polygons.append((affine_transform(wkb.loads(geometry), matrix).wkb,
+                             values[label]))
+
+    edges = {side: (edge, values[edge]) for side, edge in edges.items()}
+
+    return window, nb_labels, polygons, border_polygons, edges
+
+
+def _polygonize_by_tile(raster, band, is_8_connected, window_size, nb_processes,
+                        progress_bar):
+    """ Polygonize raster tile by tile
+
+    Description
+    -----------
+    Tiles are polygonized in parallel. Polygons which do not touch
+    inner tile borders are yielded as soon as their tile is done,
+    while polygons touching them are merged across tiles (regions
+    are connected through tile seams with a union-find) and yielded
+    at the end. Unlike gdal.Polygonize, 8-connected regions whose
+    parts only touch diagonally across a tile border are
+    multipolygons
+
+    Yields
+    ------
+    tuple
+        (geometry as WKB, value)
+    """
+    if not hasattr(window_size, "__getitem__"):
+        window_size = (window_size, window_size)
+
+    x_seams, y_seams = _tile_seams(window_size, raster.x_size, raster.y_size)
+
+    windows = [(x, y, min(window_size[0], raster.x_size - x),
+                min(window_size[1], raster.y_size - y))
+               for y in range(0, raster.y_size, window_size[1])
+               for x in range(0, raster.x_size, window_size[0])]
+
+    offset = 0
+    border_keys, border_values, border_geometries = [], [], []
+
+    with mp.Pool(processes=nb_processes) as pool:
+        iterator = pool.imap(partial(_polygonize_tile,
+                                     src_file=raster._file,
+                                     band=band,
+                                     is_8_connected=is_8_connected,
+                                     geo_transform=raster.geo_transform,
+                                     x_size=raster.x_size,
+                                     y_size=raster.y_size),
+                             windows)
+        if progress_bar:
+            iterator = tqdm(iterator, total=len(windows), desc="Polygonize raster")
+
+        for window, nb_labels, polygons, border_polygons, edges in iterator:
+            yield from polygons
+
+            _set_seams(x_seams, y_seams, window, edges, offset)
+
+            for label, value, geometry in border_polygons:
+                border_keys.append(label + offset)
+                border_values.append(value)
+                border_geometries.append(geometry)
+
+            offset += nb_labels
+
+    if not border_keys:
+        return
+
+    # Connect regions through tile seams
+    keys, roots = _connect_seams(x_seams, y_seams, is_8_connected)
+    roots = roots[np.searchsorted(keys, border_keys)]
+
+    # Merge polygons of each region
+    matrix = _affine(raster.geo_transform)
+    order = np.argsort(roots, kind="stable")
+    _, starts = np.unique(roots[order], return_index=True)
+    for group in np.split(order, starts[1:]):
+        if group.size == 1:
+            geometry = wkb.loads(border_geometries[group[0]])
+        else:
+            geometry = unary_union([wkb.loads(border_geometries[idx]) for idx in group])
+        yield affine_transform(geometry, matrix).wkb, border_values[group[0]]
+
+
+def _polygonize_band(raster, band, is_8_connected, progress_bar):
+    """ Polygonize whole raster band into memory
+
+    Returns
+    -------
+    list
+        (geometry as WKB, value) of each polygon
+    """
+    layer_ds = _memory_driver().Create("", 0, 0, 0, gdal.GDT_Unknown)
+    layer = layer_ds.CreateLayer("layer", geom_type=ogr.wkbPolygon)
+    layer.CreateField(ogr.FieldDefn("value", ogr.OFTInteger))
+
+    callback, callback_data = gdal_progress_bar(progress_bar,
+                                                description="Polygonize raster")
+
+    srcband = raster._gdal_dataset.GetRasterBand(band)
+
+    gdal.Polygonize(srcband,
+                    srcband.GetMaskBand(),
+                    layer,
+                    0,
+                    ["8CONNECTED=8"] if is_8_connected else [],
+                    callback=callback,
+                    callback_data=callback_data)
+
+    return _layer_polygons(layer)
+
+
 def _polygonize(raster, filename, band, layer_name,
                 field_name, ogr_driver, is_8_connected,
-                progress_bar):
+                progress_bar, window_size, nb_processes,
+                as_geodataframe):
     """ Polygonize raster
 
     Parameters
     ----------
     raster
-    filename
+    filename: str or None
+        output file. If None, polygons are returned
     band
     layer_name
     field_name
     ogr_driver
     is_8_connected
     progress_bar
+    window_size: int or (int, int) or None
+        size of tiles. If None, polygonize whole band at once
+    nb_processes: int
+        number of processes for multiprocessing pool (tiled mode)
+    as_geodataframe: bool
+        if True (and filename is None), return a GeoDataFrame
 
     Returns
     -------
 
     """
-    connectivity = "8CONNECTED=%d" % (8 if is_8_connected else 4)
-    dst_ds = ogr_driver.CreateDataSource(filename)
-    dst_layer = dst_ds.CreateLayer(layer_name,
-                                   geom_type=ogr.wkbPolygon,
-                                   srs=srs_from(raster.crs))
+    if filename is not None and window_size is None:
+        connectivity = "8CONNECTED=%d" % (8 if is_8_connected else 4)
+        dst_ds = ogr_driver.CreateDataSource(filename)
+        dst_layer = dst_ds.CreateLayer(layer_name,
+                                       geom_type=ogr.wkbPolygon,
+                                       srs=srs_from(raster.crs))
 
-    fd = ogr.FieldDefn(field_name, ogr.OFTInteger)
-    dst_layer.CreateField(fd)
+        fd = ogr.FieldDefn(field_name, ogr.OFTInteger)
+        dst_layer.CreateField(fd)
 
-    callback, callback_data = gdal_progress_bar(progress_bar,
-                                                description="Polygonize raster")
+        callback, callback_data = gdal_progress_bar(progress_bar,
+                                                    description="Polygonize raster")
 
-    srcband = raster._gdal_dataset.GetRasterBand(band)
-    maskband = srcband.GetMaskBand()
+        srcband = raster._gdal_dataset.GetRasterBand(band)
+        maskband = srcband.GetMaskBand()
 
-    gdal.Polygonize(srcband,
-                    maskband,
-                    dst_layer,
-                    0,
-                    [connectivity],
-                    callback=callback,
-                    callback_data=callback_data)
+        gdal.Polygonize(srcband,
+                        maskband,
+                        dst_layer,
+                        0,
+                        [connectivity],
+                        callback=callback,
+                        callback_data=callback_data)
+
+        dst_ds = None
+
+        return 0
+
+    if window_size is None:
+        polygons = _polygonize_band(raster, band, is_8_connected, progress_bar)
+    else:
+        polygons = _polygonize_by_tile(raster, band, is_8_connected, window_size,
+                                       nb_processes, progress_bar)
+
+    # In tiled mode, 8-connected regions whose parts only touch
+    # diagonally across a tile border are multipolygons: all
+    # geometries are then written as multipolygons
+    is_multi = window_size is not None and is_8_connected
+
+    if filename is not None:
+        dst_ds = ogr_driver.CreateDataSource(filename)
+        dst_layer = dst_ds.CreateLayer(layer_name,
+                                       geom_type=ogr.wkbMultiPolygon if is_multi
+                                       else ogr.wkbPolygon,
+                                       srs=srs_from(raster.crs))
+        dst_layer.CreateField(ogr.FieldDefn(field_name, ogr.OFTInteger))
+        definition = dst_layer.GetLayerDefn()
+
+        for geometry, value in polygons:
+            geometry = ogr.CreateGeometryFromWkb(geometry)
+            if is_multi:
+                geometry = ogr.ForceToMultiPolygon(geometry)
+            feature = ogr.Feature(definition)
+            feature.SetGeometryDirectly(geometry)
+            feature.SetField(field_name, int(value))
+            dst_layer.CreateFeature(feature)
+
+        dst_ds = None
+
+        return 0
 
-    dst_ds = None
+    polygons = list(polygons)
+    geometries = np.empty(len(polygons), dtype=object)
+    geometries[:] = [geometry for geometry, _ in polygons]
+    values = np.asarray([value for _, value in polygons])
 
-    return 0
+    if as_geodataframe:
+        import geopandas as gpd
+        return gpd.GeoDataFrame({field_name: values},
+                                geometry=[wkb.loads(geometry) for geometry in geometries],
+                                crs=raster.crs)
+    else:
+        return geometries, values
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+
+""" Proximity (distance to target pixels) functions
+
+Tiles are processed in parallel with a halo of max distance, so that
+every target pixel within max distance of a tile is seen by the tile.
+"""
+import multiprocessing as mp
+from functools import partial
+
+import numpy as np
+from numba import njit
+from tqdm import tqdm
+
+from pyrasta import GDAL_MEM_DRIVER
+from pyrasta.tools import _return_raster, _gdal_temp_dataset, _window_geo_transform
+from pyrasta.tools.windows import get_halo_windows
+from pyrasta.utils import check_string
+
+try:
+    from osgeo import gdal
+except ImportError:
+    import gdal
+
+
+PROXIMITY_METHODS = ("gdal", "exact")
+
+
+@njit(nogil=True)
+def _distance_transform_1d(f, spacing, out, vertices, bounds):
+    """ One-dimensional squared Euclidean distance transform
+
+    Description
+    -----------
+    Lower envelope of parabolas (Felzenszwalb & Huttenlocher, 2012,
+    Distance transforms of sampled functions)
+
+    Parameters
+    ----------
+    f: numpy.ndarray
+        squared distances (0 for targets, inf elsewhere)
+    spacing: float
+        distance between consecutive pixels
+    out: numpy.ndarray
+        output squared distances
+    vertices: numpy.ndarray
+        buffer of size f.size
+    bounds: numpy.ndarray
+        buffer of size f.size + 1
+
+    """
+    k = -1
+    for q in range(f.size):
+        if np.isinf(f[q]):
+            continue
+        xq = q * spacing
+        s = -np.inf
+        while k >= 0:
+            xp = vertices[k] * spacing
+            s = ((f[q] + xq * xq) - (f[vertices[k]] + xp * xp)) / (2 * (xq - xp))
+            if s <= bounds[k]:
+                k -= 1
+                s = -np.inf
+            else:
+                break
+        k += 1
+        vertices[k] = q
+        bounds[k] = s
+
+    if k < 0:
+        out[:] = np.inf
+        return
+
+    bounds[k + 1] = np.inf
+    j = 0
+    for q in range(f.size):
+        xq = q * spacing
+        while bounds[j + 1] < xq:
+            j += 1
+        out[q] = (xq - vertices[j] * spacing) ** 2 + f[vertices[j]]
+
+
+@njit(nogil=True)
+def _distance_transform(is_target, dx, dy):
+    """ Exact Euclidean distance transform
+
+    Parameters
+    ----------
+    is_target: numpy.ndarray
+        target pixel mask
+    dx: float
+        pixel width
+    dy: float
+        pixel height
+
+    Returns
+    -------
+    numpy.ndarray
+        distance to the nearest target pixel (inf if none)
+    """
+    ny, nx = is_target.shape
+    squared = np.empty((ny, nx))
+    out = np.empty((ny, nx))
+    vertices = np.empty(max(ny, nx), dtype=np.int64)
+    bounds = np.empty(max(ny, nx) + 1)
+    line = np.empty(ny)
+    result = np.empty(ny)
+
+    for j in range(nx):
+        for i in range(ny):
+            line[i] = 0. if is_target[i, j] else np.inf
+        _distance_transform_1d(line, dy, result, vertices, bounds)
+        squared[:, j] = result
+
+    for i in range(ny):
+        _distance_transform_1d(squared[i], dx, out[i], vertices, bounds)
+
+    return np.sqrt(out)
+
+
+def _proximity_tile(windows, src_file, band, target_values, max_distance, method,
+                    geo_transform, no_data):
+    """ Compute proximity over one tile
+
+    Parameters
+    ----------
+    windows: tuple
+        tile window and window to read (with halo)
+
+    Returns
+    -------
+    tuple
+        (window, distance array)
+    """
+    window, read_window = windows
+    src_band = gdal.Open(src_file).GetRasterBand(band)
+    array = src_band.ReadAsArray(*read_window)
+
+    if method == "exact":
+        if target_values is None:
+            is_target = array != 0
+        else:
+            is_target = np.isin(array, target_values)
+        distance = _distance_transform(is_target, abs(geo_transform[1]), abs(geo_transform[5]))
+        if max_distance is not None:
+            distance[distance > max_distance] = np.inf
+        distance[np.isinf(distance)] = no_data
+    else:
+        src_ds = GDAL_MEM_DRIVER.Create("", read_window[2], read_window[3], 1, src_band.DataType)
+        src_ds.SetGeoTransform(_window_geo_transform(geo_transform, read_window))
+        src_ds.GetRasterBand(1).WriteArray(array)
+        dst_ds = GDAL_MEM_DRIVER.Create("", read_window[2], read_window[3], 1,
+                                        gdal.GetDataTypeByName("Float32"))
+
+        options = ["DISTUNITS=GEO", "NODATA=%s" % no_data]
+        if target_values is not None:
+            options.append("VALUES=%s" % ",".join(str(value) for value in target_values))
+        if max_distance is not None:
+            options.append("MAXDIST=%s" % max_distance)
+
+        gdal.ComputeProximity(src_ds.GetRasterBand(1), dst_ds.GetRasterBand(1), options)
+        distance = dst_ds.ReadAsArray()
+
+    x_offset, y_offset = window[0] - read_window[0], window[1] - read_window[1]
+
+    return window, distance[y_offset:y_offset + window[3], x_offset:x_offset + window[2]]
+
+
+@_return_raster
+def _proximity(raster, out_file, band, target_values, max_distance, method, no_data,
+               window_size, nb_processes):
+    """ Compute distance to target pixels
+
+    Parameters
+    ----------
+    raster: RasterBase
+    out_file: str
+        output file path to which new raster must be written
+    band: int
+        raster band
+    target_values: list or None
+        target pixel values. If None, non-zero pixels are targets
+    max_distance: float or None
+        maximum distance (in CRS units). If None, raster is
+        processed as one single tile
+    method: str
+        'gdal' (gdal.ComputeProximity) or 'exact' (Euclidean distance transform)
+    no_data: int or float
+        value of pixels farther than max distance from any target
+    window_size: int or (int, int)
+        size of tiles
+    nb_processes: int
+        number of processes for multiprocessing pool
+
+    """
+    method = check_string(method, PROXIMITY_METHODS)
+
+    if target_values is not None:
+        target_values = list(np.atleast_1d(target_values))
+
+    if max_distance is None:
+        window_size, halo = (raster.x_size, raster.y_size), 0
+    else:
+        halo = int(np.ceil(max_distance / min(abs(raster.geo_transform[1]),
+                                              abs(raster.geo_transform[5]))))
+
+    if not hasattr(window_size, "__getitem__"):
+        window_size = (window_size, window_size)
+
+    out_ds = _gdal_temp_dataset(out_file,
+                                raster._gdal_driver,
+                                raster._gdal_dataset.GetProjection(),
+                                raster.x_size,
+                                raster.y_size,
+                                1,
+                                raster.geo_transform,
+                                gdal.GetDataTypeByName("Float32"),
+                                no_data)
+
+    nb_tiles = len(range(0, raster.x_size, window_size[0])) * \
+        len(range(0, raster.y_size, window_size[1]))
+
+    with mp.Pool(processes=nb_processes) as pool:
+        for window, distance in tqdm(pool.imap(partial(_proximity_tile,
+                                                       src_file=raster._file,
+                                                       band=band,
+                                                       target_values=target_values,
+                                                       max_distance=max_distance,
+                                                       method=method,
+                                                       geo_transform=raster.geo_transform,
+                                                       no_data=no_data),
+                                               get_halo_windows(window_size,
+                                                                halo,
+                                                                raster.x_size,
+                                                                raster.y_size)),
+                                     total=nb_tiles,
+                                     desc="Compute proximity"):
+            out_ds.GetRasterBand(1).WriteArray(distance, window[0], window[1])
+
+    # Close dataset
+    out_ds = None
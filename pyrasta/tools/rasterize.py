@@ -4,9 +4,20 @@
 
 More detailed description.
 """
-from pyrasta.io_ import ESRI_DRIVER
-from pyrasta.io_.files import ShapeTempFile
-from pyrasta.tools import _gdal_temp_dataset, _return_raster
+import multiprocessing as mp
+from functools import partial
+
+import numpy as np
+import pyproj
+from shapely.geometry import box
+from tqdm import tqdm
+
+from pyrasta import GDAL_MEM_DRIVER
+from pyrasta.crs import transform_bounds
+from pyrasta.io_.layers import MemoryLayer, geometries_to_wkb, projection_of
+from pyrasta.tools import _gdal_temp_dataset, _return_raster, _window_bounds, \
+    _window_geo_transform
+from pyrasta.tools.calculator import get_xy_block_windows
 
 from pyrasta.utils import gdal_progress_bar
 
@@ -16,11 +27,88 @@ except ImportError:
     import gdal
 
 
+def _block_geometries(geodataframe, attribute, geo_transform, window_size, x_size, y_size,
+                      projection):
+    """ Yield windows together with the geometries intersecting them
+
+    Description
+    -----------
+    Window bounds are transformed into the layer CRS (if
+    it differs from projection) before querying the layer
+    spatial index
+
+    """
+    geometries = np.asarray(geometries_to_wkb(geodataframe), dtype=object)
+    if attribute is not None:
+        values = geodataframe[attribute].to_numpy()
+    else:
+        values = None
+
+    layer_projection = projection_of(geodataframe)
+    if layer_projection and projection and \
+            pyproj.CRS(layer_projection) != pyproj.CRS(projection):
+        def window_box(window):
+            return box(*transform_bounds(_window_bounds(geo_transform, window),
+                                         projection, layer_projection))
+    else:
+        def window_box(window):
+            return box(*_window_bounds(geo_transform, window))
+
+    for window in get_xy_block_windows(window_size, x_size, y_size):
+        idx = geodataframe.sindex.query(window_box(window))
+        if values is not None:
+            yield window, geometries[idx].tolist(), values[idx]
+        else:
+            yield window, geometries[idx].tolist(), None
+
+
+def _rasterize_block(block, layer_projection, projection, geo_transform,
+                     nb_band, burn_values, attribute, data_type, no_data,
+                     all_touched):
+    """ Rasterize geometries within block window
+
+    Parameters
+    ----------
+    block: tuple
+        (window, geometries as WKB, attribute values)
+
+    Returns
+    -------
+    tuple
+        (window, numpy.ndarray)
+    """
+    window, geometries, values = block
+
+    out_ds = _gdal_temp_dataset("",
+                                GDAL_MEM_DRIVER,
+                                projection,
+                                window[2],
+                                window[3],
+                                nb_band,
+                                _window_geo_transform(geo_transform, window),
+                                data_type,
+                                no_data)
+
+    for band in range(nb_band):
+        out_ds.GetRasterBand(band + 1).Fill(no_data)
+
+    if geometries:
+        with MemoryLayer(geometries, layer_projection, values, attribute) as memory_layer:
+            gdal.Rasterize(out_ds,
+                           memory_layer.dataset,
+                           bands=[bd + 1 for bd in range(nb_band)],
+                           burnValues=burn_values,
+                           attribute=attribute,
+                           allTouched=all_touched)
+
+    return window, out_ds.ReadAsArray()
+
+
 @_return_raster
 def _rasterize(raster_class, out_file, gdal_driver, geodataframe,
                burn_values, attribute, projection, x_size, y_size,
                nb_band, geo_transform, data_type, no_data, all_touched,
-               progress_bar):
+               progress_bar, window_size, nb_processes):
     """ Rasterize geographic layer
 
     Parameters
@@ -46,15 +134,22 @@ def _rasterize(raster_class, out_file, gdal_driver, geodataframe,
     no_data
     all_touched: bool
     progress_bar: bool
+    window_size: None or int or (int, int)
+        if not None, size of the blocks rasterized in parallel
+    nb_processes: int
+        number of processes for multiprocessing pool (tiled mode)
 
     Returns
     -------
 
     """
+    if window_size is not None:
+        return _rasterize_by_block(out_file, gdal_driver, geodataframe, burn_values,
+                                   attribute, projection, x_size, y_size, nb_band,
+                                   geo_transform, data_type, no_data, all_touched,
+                                   progress_bar, window_size, nb_processes)
 
-    with ShapeTempFile() as shp_file:
-
-        geodataframe.to_file(shp_file.path, driver=ESRI_DRIVER)
+    with MemoryLayer.from_geodataframe(geodataframe, attribute) as memory_layer:
 
         out_ds = _gdal_temp_dataset(out_file,
                                     gdal_driver,
@@ -70,7 +165,7 @@ def _rasterize(raster_class, out_file, gdal_driver, geodataframe,
                                                     description="Rasterize layer")
 
         gdal.Rasterize(out_ds,
-                       shp_file.path,
+                       memory_layer.dataset,
                        bands=[bd + 1 for bd in range(nb_band)],
                        burnValues=burn_values,
                        attribute=attribute,
@@ -86,3 +181,61 @@ def _rasterize(raster_class, out_file, gdal_driver, geodataframe,
     # raster._temp_file = out_file
     #
     # return raster
+
+
+def _rasterize_by_block(out_file, gdal_driver, geodataframe, burn_values,
+                        attribute, projection, x_size, y_size, nb_band,
+                        geo_transform, data_type, no_data, all_touched,
+                        progress_bar, window_size, nb_processes):
+    """ Rasterize geographic layer block by block in parallel
+
+    Description
+    -----------
+    Output grid is split into blocks and the features intersecting
+    each block (retrieved through the layer's spatial index) are
+    rasterized in worker processes. Blocks are then written to the
+    output dataset by the main process.
+
+    """
+    if not hasattr(window_size, "__getitem__"):
+        window_size = (window_size, window_size)
+
+    out_ds = _gdal_temp_dataset(out_file,
+                                gdal_driver,
+                                projection,
+                                x_size,
+                                y_size,
+                                nb_band,
+                                geo_transform,
+                                data_type,
+                                no_data)
+
+    blocks = _block_geometries(geodataframe, attribute, geo_transform,
+                               window_size, x_size, y_size, projection)
+    nb_blocks = len(range(0, x_size, window_size[0])) * len(range(0, y_size, window_size[1]))
+
+    with mp.Pool(processes=nb_processes) as pool:
+        iterator = pool.imap(partial(_rasterize_block,
+                                     layer_projection=projection_of(geodataframe),
+                                     projection=projection,
+                                     geo_transform=geo_transform,
+                                     nb_band=nb_band,
+                                     burn_values=burn_values,
+                                     attribute=attribute,
+                                     data_type=data_type,
+                                     no_data=no_data,
+                                     all_touched=all_touched),
+                             blocks)
+        if progress_bar:
+            iterator = tqdm(iterator, total=nb_blocks, desc="Rasterize layer")
+
+        for window, array in iterator:
+            if nb_band == 1:
+                out_ds.GetRasterBand(1).WriteArray(array, window[0], window[1])
+            else:
+                for band in range(nb_band):
+                    out_ds.GetRasterBand(band + 1).WriteArray(array[band, :, :],
+                                                              window[0], window[1])
+
+    # Close dataset
+    out_ds = None
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+""" Point sampling functions
+
+Values are read at many points at once: coordinates are converted
+with a vectorized affine inverse and points are grouped by native
+raster block, so that each block is read only once.
+"""
+import numpy as np
+
+from pyrasta.crs import transform_xy
+from pyrasta.tools.conversion import _xy_to_pixel
+from pyrasta.utils import check_string
+
+
+SAMPLING_METHODS = ("nearest", "bilinear")
+
+
+def _read_neighborhoods(raster, bands, col, row, size):
+    """ Read (size x size) pixel neighborhoods grouped by raster block
+
+    Parameters
+    ----------
+    raster: RasterBase
+    bands: list[int]
+        band numbers
+    col: numpy.ndarray
+        column index of the upper left pixel of each neighborhood
+        (must lie within raster)
+    row: numpy.ndarray
+        row index of the upper left pixel of each neighborhood
+        (must lie within raster)
+    size: int
+        neighborhood size (1 for single pixels)
+
+    Returns
+    -------
+    numpy.ndarray
+        array of shape (nb_bands, nb_points, size, size). Neighbors
+        outside raster are replaced by the nearest pixel within raster
+    """
+    output = np.empty((len(bands), col.size, size, size), dtype="float64")
+
+    if col.size == 0:
+        return output
+
+    block_x, block_y = raster.metadata.bands[bands[0] - 1].block_size
+    nb_block_x = (raster.x_size + block_x - 1) // block_x
+    block_id = (row // block_y) * nb_block_x + col // block_x
+
+    order = np.argsort(block_id, kind="stable")
+    block_ids, starts = np.unique(block_id[order], return_index=True)
+    ends = np.append(starts[1:], order.size)
+
+    offsets = np.arange(size)
+
+    for b_id, start, end in zip(block_ids, starts, ends):
+        idx = order[start:end]
+        x_off = (b_id % nb_block_x) * block_x
+        y_off = (b_id // nb_block_x) * block_y
+        x_size = min(block_x + size - 1, raster.x_size - x_off)
+        y_size = min(block_y + size - 1, raster.y_size - y_off)
+
+        local_col = np.minimum(col[idx, None] - x_off + offsets, x_size - 1)
+        local_row = np.minimum(row[idx, None] - y_off + offsets, y_size - 1)
+
+        for n, band in enumerate(bands):
+            block = raster._gdal_dataset.GetRasterBand(band).ReadAsArray(x_off,
+                                                                         y_off,
+                                                                         x_size,
+                                                                         y_size)
+            output[n, idx] = block[local_row[:, :, None], local_col[:, None, :]]
+
+    return output
+
+
+def _sample(raster, x, y, bands, method, crs):
+    """ Sample raster values at x/y map coordinates
+
+    Parameters
+    ----------
+    raster: RasterBase
+    x: numpy.ndarray
+        x coordinates in map units
+    y: numpy.ndarray
+        y coordinates in map units
+    bands: None or int or list[int]
+        band number(s). If None, sample all bands
+    method: str
+        sampling method ("nearest" or "bilinear")
+    crs: None or int or str or pyproj.CRS
+        CRS of x/y coordinates. If None, raster CRS
+
+    Returns
+    -------
+    numpy.ndarray
+        array of shape (nb_bands, nb_points), or (nb_points,)
+        if bands is an integer. Points out of raster get no data
+    """
+    method = check_string(method, SAMPLING_METHODS)
+
+    if bands is None:
+        band_list = list(range(1, raster.nb_band + 1))
+    elif np.isscalar(bands):
+        band_list = [bands]
+    else:
+        band_list = list(bands)
+
+    if crs is not None:
+        x, y = transform_xy(x, y, crs, raster.projection)
+
+    px, py = _xy_to_pixel(raster.geo_transform, np.ravel(x), np.ravel(y))
+    is_valid = (px >= 0) & (px < raster.x_size) & (py >= 0) & (py < raster.y_size)
+
+    no_data = np.asarray([raster.no_data_values[band - 1] for band in band_list])
+    values = np.repeat(no_data[:, None], px.size, axis=1).astype("float64")
+
+    if method == "nearest":
+        col = np.floor(px[is_valid]).astype("int64")
+        row = np.floor(py[is_valid]).astype("int64")
+        values[:, is_valid] = _read_neighborhoods(raster, band_list, col, row, 1)[:, :, 0, 0]
+    else:
+        fx = np.clip(px[is_valid] - 0.5, 0, raster.x_size - 1)
+        fy = np.clip(py[is_valid] - 0.5, 0, raster.y_size - 1)
+        col = np.floor(fx).astype("int64")
+        row = np.floor(fy).astype("int64")
+        wx = fx - col
+        wy = fy - row
+
+        neighbors = _read_neighborhoods(raster, band_list, col, row, 2)
+        interpolated = neighbors[:, :, 0, 0] * (1 - wx) * (1 - wy) + \
+            neighbors[:, :, 0, 1] * wx * (1 - wy) + \
+            neighbors[:, :, 1, 0] * (1 - wx) * wy + \
+            neighbors[:, :, 1, 1] * wx * wy
+
+        is_no_data = (neighbors == no_data[:, None, None, None]).any(axis=(2, 3))
+        interpolated[is_no_data] = np.broadcast_to(no_data[:, None], interpolated.shape)[is_no_data]
+
+        values[:, is_valid] = interpolated
+
+    if np.isscalar(bands):
+        return values[0]
+    else:
+        return values
@@ -4,16 +4,9 @@
 
 More detailed description.
 """
-from zipfile import ZipFile
-from urllib.error import URLError
-from urllib.request import urlretrieve
-import tempfile
-import os
-
-from tqdm import tqdm
-
+from pyrasta.io_.cache import TileCache, TILE_CACHE_SIZE, TILE_CACHE_THREADS
 from pyrasta.raster import DigitalElevationModel
-from pyrasta.utils import digitize, TqdmUpTo
+from pyrasta.utils import digitize
 
 
 CGIAR_ARCHIVE_FORMAT = "zip"
@@ -22,42 +15,25 @@ CGIAR_NO_DATA = -32768
 CGIAR_DATA_TYPE = 3
 
 
-def _download_srtm_tile(tile_name):
-    """ Download and extract SRTM tile archive
+def _srtm_tile_path(archive_path, tile_name):
+    """ Return GDAL path to SRTM tile within archive
 
     Description
     -----------
+    Tile is read through GDAL's /vsizip/ virtual
+    file system, without extracting the archive
 
     Parameters
     ----------
+    archive_path: str
+        path to SRTM tile archive
     tile_name: str
         SRTM tile name
     """
-    zip_name, tif_name = tile_name + "." + CGIAR_ARCHIVE_FORMAT, tile_name + '.tif'
-    url = os.path.join(CGIAR_URL, zip_name)
-    temp_srtm_zip = os.path.join(tempfile.gettempdir(), zip_name)
-    temp_srtm_dir = os.path.join(tempfile.gettempdir(), tile_name)
-
-    # Download tile
-    try:
-        with TqdmUpTo(unit='B', unit_scale=True, unit_divisor=1024, miniters=1,
-                      desc=zip_name) as t:
-            urlretrieve(url, temp_srtm_zip, reporthook=t.update_to)
-            t.total = t.n
-    except URLError as e:
-        raise RuntimeError("Unable to fetch data at '%s': %s" % (url, e))
-
-    # Extract GeoTiff
-    # In order to avoid conflict with the archive extraction,
-    # the "gdal import" is located at the end of all the imports
-    # See https://github.com/conda-forge/gdal-feedstock/issues/365
-    with ZipFile(temp_srtm_zip, 'r') as archive:
-        archive.extractall(temp_srtm_dir)
-
-    return os.path.join(temp_srtm_dir, tif_name)
-
-
-def _retrieve_cgiar_srtm_tiles(bounds):
+    return "/vsizip/" + archive_path + "/" + tile_name + ".tif"
+
+
+def _retrieve_cgiar_srtm_tiles(bounds, cache, base_url, nb_threads):
     """ Import DEM tile from CGIAR-CSI SRTM3 database (V4.1)
 
     Description
@@ -67,11 +43,18 @@ def _retrieve_cgiar_srtm_tiles(bounds):
     ----------
     bounds: tuple or list
         output DEM bounds as (x_min, y_min, x_max, y_max)
+    cache: pyrasta.io_.cache.TileCache
+        tile cache
+    base_url: str
+        URL of the directory containing tile archives
+    nb_threads: int
+        number of concurrent downloads
 
     Returns
     -------
-    list:
-        list of SRTM tile file names
+    tuple:
+        list of archive paths and list of SRTM
+        tile paths (within archives)
 
     """
     srtm_lon = range(-180, 185, 5)
@@ -81,28 +64,45 @@ def _retrieve_cgiar_srtm_tiles(bounds):
     y_min = digitize(bounds[3], srtm_lat, right=True, ascend=False)
     y_max = digitize(bounds[1], srtm_lat, right=False, ascend=False)
 
-    list_of_tiles = []
+    tile_names = ["srtm_%02d_%02d" % (x, y) for x in range(int(x_min), int(x_max) + 1)
+                  for y in range(int(y_min), int(y_max) + 1)]
+    archives = cache.fetch([base_url.rstrip("/") + "/" + tile_name + "." + CGIAR_ARCHIVE_FORMAT
+                            for tile_name in tile_names], nb_threads)
 
-    coords = [(x, y) for x in range(int(x_min), int(x_max) + 1)
-              for y in range(int(y_min), int(y_max) + 1)]
+    return archives, [_srtm_tile_path(archive, tile_name)
+                      for archive, tile_name in zip(archives, tile_names)]
 
-    for (x, y) in tqdm(coords, desc="Downloading SRTM tile(s)"):
-        tile = _download_srtm_tile("srtm_%02d_%02d" % (x, y))
-        list_of_tiles.append(tile)
 
-    return list_of_tiles
-
-
-def from_cgiar_online_database(bounds):
+def from_cgiar_online_database(bounds, base_url=CGIAR_URL, cache_dir=None,
+                               max_cache_size=TILE_CACHE_SIZE,
+                               nb_threads=TILE_CACHE_THREADS, lazy=False):
     """ Build DEM tile from CGIAR-CSI SRTM3 database (V4.1)
 
     Description
     -----------
+    Tile archives are kept in a persistent cache
+    directory and only downloaded once. Tiles are
+    read within archives and assembled as a virtual
+    (VRT) mosaic, which is then written to a new
+    raster unless lazy is True
 
     Parameters
     ----------
     bounds: tuple or list
         output DEM bounds
+    base_url: str
+        URL of the directory containing tile archives
+        (e.g. local mirror)
+    cache_dir: str, default None
+        tile cache directory. If None, use default
+        cache directory (see pyrasta.io_.cache)
+    max_cache_size: int
+        maximum cache size in bytes (None for no limit)
+    nb_threads: int
+        number of concurrent downloads
+    lazy: bool, default False
+        if True, return the virtual mosaic (reading archives
+        of the cache, which are kept while it is in use)
 
     Returns
     -------
@@ -110,9 +110,17 @@ def from_cgiar_online_database(bounds):
         new instance
 
     """
-    tiles = [DigitalElevationModel(tile) for tile in _retrieve_cgiar_srtm_tiles(bounds)]
-
-    return DigitalElevationModel.merge(tiles,
-                                       bounds,
-                                       data_type=CGIAR_DATA_TYPE,
-                                       output_no_data=CGIAR_NO_DATA)
+    cache = TileCache(cache_dir, max_cache_size)
+    archives, tile_paths = _retrieve_cgiar_srtm_tiles(bounds, cache, base_url, nb_threads)
+    tiles = [DigitalElevationModel(tile) for tile in tile_paths]
+
+    mosaic = DigitalElevationModel.merge(tiles,
+                                         bounds,
+                                         output_no_data=CGIAR_NO_DATA,
+                                         lazy=True)
+
+    if lazy:
+        cache.pin(archives, mosaic)
+        return mosaic
+    else:
+        return mosaic.materialize()
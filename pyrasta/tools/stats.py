@@ -43,6 +43,19 @@ def _histogram(raster, nb_bins, normalized):
     return histogram
 
 
+def _statistics(raster, approximate):
+    """ Compute statistics of each raster band
+
+    Description
+    -----------
+    If approximate, statistics may be computed
+    from overviews or a subset of all tiles
+
+    """
+    return [list(raster._gdal_dataset.GetRasterBand(band + 1).ComputeStatistics(approximate))
+            for band in range(raster.nb_band)]
+
+
 def _zonal_stats(raster, layer, band, stats, customized_stat,
                  all_touched, show_progressbar, nb_processes):
     """ Retrieve zonal statistics from raster corresponding to features in layer
@@ -81,14 +94,7 @@ def _zonal_stats(raster, layer, band, stats, customized_stat,
     """
     def zone_gen(ras, bds, bd=1):
         for boundary in bds:
-            try:
-                valid_bounds = (max(boundary[0], ras.bounds[0]),
-                                max(boundary[1], ras.bounds[1]),
-                                min(boundary[2], ras.bounds[2]),
-                                min(boundary[3], ras.bounds[3]))
-                yield ras.read_array(band=bd, bounds=valid_bounds)
-            except (ValueError, RuntimeError):
-                yield None
+            yield ras.read_array(band=bd, bounds=boundary, boundless=True)
 
     try:
         stats_calc = {name: STATISTIC_FUNC[name] for name in stats}
@@ -112,13 +118,14 @@ def _zonal_stats(raster, layer, band, stats, customized_stat,
     multi_gen = tee(zip(copy_layer.index, zone, zone_id), len(stats_calc))
 
     iterator = zip(multi_gen, stats_calc.keys())
+    no_data = raster.no_data_values[band - 1]
 
     output = dict()
     with mp.Pool(processes=nb_processes) as pool:
         if show_progressbar:
             for generator, name in iterator:
                 output[name] = list(tqdm(pool.starmap(partial(_compute_stat_in_feature,
-                                                              no_data=raster.no_data,
+                                                              no_data=no_data,
                                                               stat_function=stats_calc[name]),
                                                       generator),
                                          total=len(copy_layer),
@@ -127,7 +134,7 @@ def _zonal_stats(raster, layer, band, stats, customized_stat,
         else:
             for generator, name in iterator:
                 output[name] = list(pool.starmap(partial(_compute_stat_in_feature,
-                                                         no_data=raster.no_data,
+                                                         no_data=no_data,
                                                          stat_function=stats_calc[name]),
                                                  generator))
 
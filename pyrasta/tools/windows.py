@@ -57,7 +57,7 @@ def _windowing(raster, out_file, function, band, window_size,
         with mp.Pool(processes=nb_processes) as pool:
             output = np.asarray(list(pool.imap(partial(_set_nan,
                                                        function=function,
-                                                       no_data=raster.no_data),
+                                                       no_data=raster.no_data_values[band - 1]),
                                                win_gen,
                                                chunksize=MP_CHUNK_SIZE)))
 
@@ -303,3 +303,85 @@ def get_moving_windows(window_size, raster_x_size, raster_y_size, step=1):
             xsize = (x2 - x1) + 1
 
             yield x1, y1, xsize, ysize
+
+
+@jit(nopython=True, nogil=True)
+def get_halo_windows(window_size, halo, raster_x_size, raster_y_size):
+    """ Get block window coordinates with surrounding halo
+
+    Description
+    -----------
+    Get block windows covering the whole raster, together
+    with the enlarged windows (block window plus halo pixels
+    on each side, within raster) that must be read to compute
+    neighborhood operations over each block
+
+    Parameters
+    ----------
+    window_size: (int, int)
+        size of block window as (width, height)
+    halo: int
+        number of halo pixels around each block
+    raster_x_size: int
+        raster's width
+    raster_y_size: int
+        raster's height
+
+    Yields
+    -------
+    Window coordinates: tuple
+        block window and window to read (with halo), both
+        as 4-element tuples (x offset, y offset, x size, y size)
+    """
+    for y in range(0, raster_y_size, window_size[1]):
+        ysize = min(window_size[1], raster_y_size - y)
+        y1 = max(0, y - halo)
+        y2 = min(raster_y_size, y + ysize + halo)
+        for x in range(0, raster_x_size, window_size[0]):
+            xsize = min(window_size[0], raster_x_size - x)
+            x1 = max(0, x - halo)
+            x2 = min(raster_x_size, x + xsize + halo)
+
+            yield (x, y, xsize, ysize), (x1, y1, x2 - x1, y2 - y1)
+
+
+def _read_halo_window(gdal_band, window, read_window, halo, fill=None):
+    """ Read block window with halo
+
+    Description
+    -----------
+    Halo pixels falling outside raster are filled
+    by replicating the nearest raster edge pixels,
+    or with a constant value
+
+    Parameters
+    ----------
+    gdal_band: gdal.Band
+    window: tuple
+        block window
+    read_window: tuple
+        window to read (block with halo, within raster)
+    halo: int
+        number of halo pixels
+    fill: int or float, default None
+        value of halo pixels outside raster. If None,
+        replicate raster edge pixels
+
+    Returns
+    -------
+    numpy.ndarray
+        array of shape (window height + 2 * halo, window width + 2 * halo)
+    """
+    array = gdal_band.ReadAsArray(*read_window)
+    if fill is not None:
+        array = array.astype(np.result_type(array, fill))
+
+    pad_width = ((halo - window[1] + read_window[1],
+                  halo - read_window[1] - read_window[3] + window[1] + window[3]),
+                 (halo - window[0] + read_window[0],
+                  halo - read_window[0] - read_window[2] + window[0] + window[2]))
+
+    if fill is None:
+        return np.pad(array, pad_width, mode="edge")
+    else:
+        return np.pad(array, pad_width, mode="constant", constant_values=fill)
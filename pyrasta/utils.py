@@ -13,6 +13,7 @@ from tqdm import tqdm
 
 
 MP_CHUNK_SIZE = 1000
+WARP_MEMORY_LIMIT = 512
 
 
 class TqdmUpTo(tqdm):
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+""" Tests of raster base class
+
+"""
+import numpy as np
+import pyproj
+import pytest
+
+pytest.importorskip("osgeo")
+
+from pyrasta.raster import Raster  # noqa: E402
+
+
+@pytest.fixture
+def raster():
+    return Raster.from_array(np.arange(100, dtype="float32").reshape(10, 10),
+                             pyproj.CRS(4326), (0, 0, 1, 1))
+
+
+@pytest.fixture
+def reference():
+    return Raster.from_array(np.zeros((20, 20), dtype="float32"),
+                             pyproj.CRS(3857), (0, 0, 100000, 100000))
+
+
+def test_to_crs_on_raster(raster, reference):
+    for crs in (None, 3857):
+        projected = raster.to_crs(crs, on_raster=reference)
+
+        assert projected.crs == reference.crs
+        assert projected.bounds == pytest.approx(reference.bounds)
+        assert (projected.x_size, projected.y_size) == (20, 20)
+
+
+@pytest.mark.parametrize("kwargs", [dict(crs=32631),
+                                    dict(resolution=1000),
+                                    dict(bounds=(0, 0, 50000, 50000)),
+                                    dict(resolution=1000, target_aligned_pixels=True)])
+def test_to_crs_on_raster_with_conflicting_grid(raster, reference, kwargs):
+    with pytest.raises(ValueError):
+        raster.to_crs(on_raster=reference, **kwargs)
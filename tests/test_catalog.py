@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+""" Tests of raster catalog
+
+"""
+import numpy as np
+import pyproj
+import pytest
+
+gdal = pytest.importorskip("osgeo.gdal")
+
+from pyrasta.catalog import RasterCatalog  # noqa: E402
+from pyrasta.crs import transform_bounds  # noqa: E402
+
+
+# More tiles than the default SQLite limit of host parameters (999)
+NB_TILES = 1200
+TILE_SIZE = 0.01
+WGS84 = pyproj.CRS(4326)
+
+
+def _create_tiles(directory, nb_tiles):
+    """ Create 1x1 pixel GeoTIFF tiles laid out in a row
+
+    """
+    driver = gdal.GetDriverByName("GTiff")
+    paths = []
+    for tile in range(nb_tiles):
+        path = str(directory / ("tile_%04d.tif" % tile))
+        dataset = driver.Create(path, 1, 1, 1, gdal.GDT_Int16)
+        dataset.SetGeoTransform((tile * TILE_SIZE, TILE_SIZE, 0, TILE_SIZE, 0, -TILE_SIZE))
+        dataset.SetProjection(WGS84.to_wkt())
+        dataset.GetRasterBand(1).WriteArray(np.full((1, 1), tile, dtype="int16"))
+        dataset = None
+        paths.append(path)
+
+    return paths
+
+
+def test_query_more_tiles_than_sqlite_parameter_limit(tmp_path):
+    paths = _create_tiles(tmp_path, NB_TILES)
+    bounds = transform_bounds((0, 0, NB_TILES * TILE_SIZE, TILE_SIZE), WGS84, 3857)
+
+    with RasterCatalog(str(tmp_path / "index.sqlite")) as catalog:
+        assert catalog.add(paths, nb_processes=2, progress_bar=False) == NB_TILES
+        assert len(catalog.query_paths(bounds, 3857)) == NB_TILES
+
+        mosaic = catalog.query(bounds, 3857, mosaic=True)
+
+        assert mosaic.bounds == pytest.approx((0, 0, NB_TILES * TILE_SIZE, TILE_SIZE),
+                                              abs=TILE_SIZE / 2)
+        np.testing.assert_array_equal(np.unique(mosaic.read_array()), np.arange(NB_TILES))
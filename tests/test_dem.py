@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+""" Tests of DEM tools
+
+"""
+import numpy as np
+import pyproj
+import pytest
+
+pytest.importorskip("osgeo")
+
+from pyrasta.raster import DigitalElevationModel  # noqa: E402
+from pyrasta.tools.dem import _ellipsoid, _pixel_sizes  # noqa: E402
+
+SPHERE = pyproj.CRS("+proj=longlat +R=6371000 +no_defs")
+
+
+class _Dem:
+
+    def __init__(self, crs):
+        self.crs = crs
+
+
+def test_ellipsoid_of_sphere():
+    semi_major_axis, e2 = _ellipsoid(_Dem(SPHERE))
+
+    assert semi_major_axis == 6371000
+    assert e2 == 0
+
+
+def test_ellipsoid_of_wgs84():
+    _, e2 = _ellipsoid(_Dem(pyproj.CRS(4326)))
+
+    assert e2 == pytest.approx(0.00669438, rel=1e-6)
+
+
+def test_pixel_sizes_on_sphere():
+    geo_transform = (0, 0.01, 0, 45.005, 0, -0.01)
+    dx, dy = _pixel_sizes(geo_transform, 0, 1, 1, _ellipsoid(_Dem(SPHERE)))
+
+    assert dx[0] == pytest.approx(6371000 * np.cos(np.radians(45)) * np.radians(0.01))
+    assert dy[0] == pytest.approx(6371000 * np.radians(0.01))
+
+
+def test_slope_of_spherical_geographic_dem():
+    elevation = np.tile(np.arange(50, dtype="float32") * 10, (50, 1))
+    dem = DigitalElevationModel.from_array(elevation, SPHERE, (0, 0, 0.05, 0.05))
+
+    slope = dem.slope("degree").read_array()
+
+    assert np.isfinite(slope).all()
+    assert slope[25, 25] == pytest.approx(np.degrees(np.arctan(10 / (6371000 * np.radians(0.001)))),
+                                          rel=1e-3)
+
+
+def test_viewshed_warns_of_observers_out_of_dem():
+    dem = DigitalElevationModel.from_array(np.zeros((50, 50)), pyproj.CRS(32631),
+                                           (500000, 0, 500500, 500))
+
+    with pytest.warns(UserWarning, match="1 observer"):
+        viewshed = dem.viewshed([(500250, 250), (600000, 250)], 2, 100, nb_processes=1)
+
+    visibility = viewshed.read_array()
+    assert visibility.max() == 1
+    assert visibility[25, 25] == 1
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+""" Tests of raster polygonization
+
+"""
+import numpy as np
+import pyproj
+import pytest
+
+pytest.importorskip("osgeo")
+
+from shapely import wkb  # noqa: E402
+from shapely.ops import unary_union  # noqa: E402
+
+from pyrasta.raster import Raster  # noqa: E402
+
+
+def _polygons_by_value(geometries, values):
+    """ Return union of polygons of each value
+
+    """
+    return {int(value): unary_union([wkb.loads(geometry) for geometry, val
+                                     in zip(geometries, values) if val == value])
+            for value in np.unique(values)}
+
+
+@pytest.mark.parametrize("is_8_connected", [False, True])
+def test_tiled_polygonize_of_float_raster(is_8_connected):
+    # Values round to 1 on the left half and 2 on the right half,
+    # although no two adjacent pixels are exactly equal
+    rng = np.random.default_rng(0)
+    array = rng.uniform(0.6, 1.4, (40, 60))
+    array[:, 30:] += 1
+    raster = Raster.from_array(array, pyproj.CRS(4326), (0, 0, 6, 4))
+
+    geometries, values = raster.polygonize(is_8_connected=is_8_connected)
+    tiled_geometries, tiled_values = raster.polygonize(is_8_connected=is_8_connected,
+                                                       window_size=16,
+                                                       nb_processes=2)
+
+    assert sorted(values) == sorted(tiled_values) == [1, 2]
+
+    polygons = _polygons_by_value(geometries, values)
+    tiled_polygons = _polygons_by_value(tiled_geometries, tiled_values)
+    for value, polygon in polygons.items():
+        assert polygon.symmetric_difference(tiled_polygons[value]).area == pytest.approx(0)